@@ -0,0 +1,489 @@
+"""Times reading, converting and exporting a large Matchmover file.
+
+The files in 'testFiles' are too small to show how long each step
+takes on a real shot, so a Matchmover file is generated with any number
+of cameras, shots and frames, with animated fovx and distortion. Each
+step is timed on its own, in a new process so the peak memory of the
+step is not hidden by an earlier step. The results can be written to a
+JSON file, and compared with a JSON file written by an earlier version
+to find steps that have become slower or use more memory.
+
+Usage:
+    python2 benchmark.py [options]
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import os
+import os.path as p
+import math
+import time
+import json
+import shutil
+import platform
+import tempfile
+import traceback
+import optparse
+import multiprocessing as mp
+import xml.dom.minidom as xdm
+
+# Only available on Unix.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import commonDataObjects as cdo
+import converter
+import mmFileReader
+import mmDistortionConverter as mdc
+
+readStage = 'readRZML'
+streamReadStage = 'readRZMLStream'
+parallelReadStage = 'readRZMLParallel'
+windowReadStage = 'readTimeWindow'
+cacheReadStage = 'readSceneCache'
+convertStage = 'convertCamera'
+
+# The frames read by the windowReadStage step.
+windowTime = '100-109'
+
+# Reading the attributes of every CFRM tag, with getKey() as the
+# reader once did, and with the schema the reader uses now.
+frameKeysStage = 'frameAttrsGetKey'
+frameSchemaStage = 'frameAttrsSchema'
+
+# The export types benchmarked, ST-maps are left out because they
+# take far longer than every other export, see mmUndistortBenchmark.py.
+exportTypes = ['nukeDistNode',
+               'rawText',
+               'tdeLens',
+               'warpBatch',
+               'distoBatch']
+
+
+class Options(object):
+    """Options that can be passed to the benchmark."""
+    def __init__(self):
+        # Size of the generated Matchmover file.
+        self.cameras = 2
+        self.shots = 2
+        self.frames = 1000
+
+        # Export types to time, see exportTypes.
+        self.exports = list(exportTypes)
+
+        # Number of times each step is run, the fastest is reported.
+        self.repeat = 3
+
+        # Run each step in a new process, so the peak memory is
+        # measured for that step alone.
+        self.isolate = True
+
+        # Write the results to this JSON file, if not None.
+        self.outputPath = None
+
+        # Compare the results with this JSON file, if not None.
+        self.baselinePath = None
+
+        # How much slower (or larger) a step can be than the baseline,
+        # before it is reported, 0.25 is 25%.
+        self.tolerance = 0.25
+
+
+class StageResult(object):
+    """The time and memory used by a single step."""
+    def __init__(self):
+        self.stage = None
+        self.seconds = None
+
+        # The peak memory of the process, in kilobytes,
+        # None if it is unknown.
+        self.peakMemory = None
+        self.message = None
+
+
+def getStages(options):
+    """Get the names of every step to time."""
+    stages = [readStage, streamReadStage, parallelReadStage,
+              windowReadStage, cacheReadStage, frameKeysStage,
+              frameSchemaStage, convertStage]
+    for exportType in options.exports:
+        assert exportType in exportTypes
+        stages.append(exportType)
+    return stages
+
+
+def writeRZML(filePath, numCameras, numShots, numFrames, imagePath=None):
+    """Write a Matchmover file with animated fovx and distortion.
+
+    Shots are linked to the cameras in turn, every shot has numFrames
+    frames, starting at frame 0.
+
+    imagePath - The image sequence of every shot, or None."""
+    assert numCameras > 0
+    assert numShots > 0
+    assert numFrames > 1
+    f = open(filePath, 'w')
+    try:
+        f.write('<?xml version="1.0" encoding="ISO-8859-1" '
+                'standalone="yes"?>\n')
+        f.write('<RZML v="1.3.2" app="benchmark.py">\n')
+        f.write('\t<TRNG t="0" d="%d" f="24"/>\n' % numFrames)
+        for i in range(numCameras):
+            f.write('\t<CINF i="%d" n="Camera %02d" sw="1920" sh="1080" '
+                    'fbw="36" fbh="20.25" fovx="54.4"/>\n' % (i+1, i+1))
+        for i in range(numShots):
+            camIndex = (i % numCameras)+1
+            f.write('\t<SHOT i="%d" n="Sequence %02d" ci="%d" '
+                    'w="1920" h="1080">\n' % (i+1, i+1, camIndex))
+            f.write('\t\t<TRNG t="0" d="%d" f="24"/>\n' % numFrames)
+            lines = list()
+            for frame in range(numFrames):
+                fovx = 54.4+2.0*math.sin(frame*0.01+i)
+                rd = 0.03+0.01*math.sin(frame*0.02+i)
+                lines.append('\t\t<CFRM t="%d" cf="1" fovx="%.10g" '
+                             'rd="%.10g">\n' % (frame, fovx, rd))
+                lines.append('\t\t\t<T x="%.10g" y="0.5" z="%.10g"/>\n' %
+                             (frame*0.01, frame*0.02))
+                lines.append('\t\t\t<R x="-179.9" y="%.10g" z="0.1"/>\n' %
+                             (frame*0.05))
+                lines.append('\t\t</CFRM>\n')
+            f.write(''.join(lines))
+            if imagePath != None:
+                f.write('\t\t<IPLN img="%s" b="0" e="%d"/>\n' %
+                        (imagePath, numFrames-1))
+            f.write('\t</SHOT>\n')
+        f.write('</RZML>\n')
+    finally:
+        f.close()
+    return True
+
+
+def writeImageFiles(imageDir, numFrames):
+    """Write empty image files, so the exporters that look for the
+    images on disk find a whole image sequence.
+
+    Returns the image sequence path."""
+    for frame in range(numFrames):
+        imgPath = p.join(imageDir, 'plate.%04d.png' % frame)
+        open(imgPath, 'w').close()
+    return p.join(imageDir, 'plate.####.png')
+
+
+def getPeakMemory():
+    """Get the peak memory of this process, in kilobytes,
+    or None if it is unknown."""
+    if resource == None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Mac OS gives the size in bytes, Linux in kilobytes.
+    if str(platform.system()).lower() == 'darwin':
+        peak = peak/1024
+    return int(peak)
+
+
+def readFile(filePath, streaming, cacheDir=None, processes=1, time=None):
+    readOptions = mmFileReader.Options()
+    readOptions.filePath = filePath
+    readOptions.streaming = streaming
+    readOptions.processes = processes
+    readOptions.time = time
+    readOptions.timeWindow = time != None
+    readOptions.cache = cacheDir != None
+    readOptions.cacheDir = cacheDir
+    return mmFileReader.readRZML(readOptions)
+
+
+def readFrameKeys(nodes):
+    getKey = mmFileReader.getKey
+    for node in nodes:
+        attrs = mmFileReader.getAttrs(node)
+        getKey(attrs, 't', 'int')
+        getKey(attrs, 'fovx', 'float')
+        getKey(attrs, 'pr', 'float', default=float(1))
+        getKey(attrs, 'rd', 'float', default=0.0)
+
+
+def readFrameSchema(nodes):
+    schema = mmFileReader.frameSchema
+    for node in nodes:
+        mmFileReader.readNodeAttrs(schema, node)
+
+
+def getStageFunc(stage, filePath, outDir):
+    """Get a function that runs the step once.
+
+    Everything the step needs (such as the cameras for an
+    export) is prepared first, and is not part of the step."""
+    if stage == readStage:
+        return lambda: readFile(filePath, False)
+    elif stage == streamReadStage:
+        return lambda: readFile(filePath, True)
+    elif stage == parallelReadStage:
+        return lambda: readFile(filePath, False, processes=None)
+    elif stage == windowReadStage:
+        # A few frames of each shot, as when exporting part of a shot.
+        return lambda: readFile(filePath, True, time=windowTime)
+    elif stage == cacheReadStage:
+        # Write the cache file first, so only reading it is timed.
+        cacheDir = p.join(outDir, 'cache')
+        readFile(filePath, True, cacheDir)
+        return lambda: readFile(filePath, True, cacheDir)
+    elif stage in [frameKeysStage, frameSchemaStage]:
+        nodes = xdm.parse(filePath).getElementsByTagName('CFRM')
+        if stage == frameKeysStage:
+            return lambda: readFrameKeys(nodes)
+        return lambda: readFrameSchema(nodes)
+
+    projData = readFile(filePath, True)
+    if stage == convertStage:
+        def func():
+            for cam in projData.cameras:
+                converter.convertCamera(cam, cdo.softwareType.tde)
+        return func
+
+    options = mdc.ConverterOptions()
+    options.inputFile = filePath
+    options.outputDir = outDir
+    mdc.setExportFlags(options, {stage: True})
+    jobs = mdc.getExportJobs(options)
+    assert len(jobs) == 1
+    exportType, writer, writerOptions = jobs[0]
+    camJobs = list()
+    for cam in projData.cameras:
+        writerCam = cam
+        if exportType not in mdc.mmCameraExports:
+            writerCam = converter.convertCamera(cam, cdo.softwareType.tde)
+            writerCam.focalLength.simplifyData()
+        cam.focalLength.simplifyData()
+        camJobs.append((writerCam, writerOptions))
+    def func():
+        for writerCam, writerOptions in camJobs:
+            writer.main(writerCam, writerOptions)
+    return func
+
+
+def timeStage(stage, filePath, outDir, repeat):
+    """Run a step, repeat times.
+
+    Returns a StageResult, with the fastest time."""
+    result = StageResult()
+    result.stage = stage
+    func = getStageFunc(stage, filePath, outDir)
+    for i in range(max(repeat, 1)):
+        startTime = time.time()
+        func()
+        seconds = time.time()-startTime
+        if result.seconds == None or seconds < result.seconds:
+            result.seconds = seconds
+    result.peakMemory = getPeakMemory()
+    return result
+
+
+def timeStageProcess(stage, filePath, outDir, repeat, queue):
+    """Time a step, used by each new process."""
+    try:
+        result = timeStage(stage, filePath, outDir, repeat)
+    except Exception:
+        result = StageResult()
+        result.stage = stage
+        result.message = traceback.format_exc()
+    queue.put(result)
+
+
+def runStage(stage, filePath, outDir, options):
+    """Time a step, in a new process if options.isolate is True.
+
+    Returns a StageResult."""
+    if not options.isolate:
+        return timeStage(stage, filePath, outDir, options.repeat)
+    queue = mp.Queue()
+    proc = mp.Process(target=timeStageProcess,
+                      args=(stage, filePath, outDir,
+                            options.repeat, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def getResultsData(results, options):
+    """Get the results as a dict, as written to the JSON file."""
+    stages = dict()
+    for result in results:
+        if result.seconds == None:
+            continue
+        stages[result.stage] = {'seconds': result.seconds,
+                                'peakMemory': result.peakMemory}
+    data = {
+        'toolVersion': cdo.projectVersion,
+        'pythonVersion': platform.python_version(),
+        'platform': platform.platform(),
+        'cameras': options.cameras,
+        'shots': options.shots,
+        'frames': options.frames,
+        'repeat': options.repeat,
+        'stages': stages,
+    }
+    return data
+
+
+def readResults(filePath):
+    f = open(filePath, 'r')
+    try:
+        data = json.load(f)
+    finally:
+        f.close()
+    return data
+
+
+def writeResults(filePath, data):
+    f = open(filePath, 'w')
+    try:
+        json.dump(data, f, indent=1, sort_keys=True)
+    finally:
+        f.close()
+    return True
+
+
+def compareResults(data, baseline, tolerance):
+    """Find the steps that are slower, or use more memory,
+    than in the baseline.
+
+    Returns a list of (stage, name, baseline value, value) tuples."""
+    regressions = list()
+    for key in ['cameras', 'shots', 'frames']:
+        if data.get(key) != baseline.get(key):
+            msg = ("Warning: Baseline has %s=%r, not %r, "
+                   "the results may not be comparable.")
+            print(msg % (key, baseline.get(key), data.get(key)))
+    baseStages = baseline.get('stages', dict())
+    for stage in sorted(data['stages'].keys()):
+        if not baseStages.has_key(stage):
+            continue
+        for name in ['seconds', 'peakMemory']:
+            value = data['stages'][stage].get(name)
+            baseValue = baseStages[stage].get(name)
+            if value == None or baseValue == None:
+                continue
+            if value > baseValue*(1.0+tolerance):
+                regressions.append((stage, name, baseValue, value))
+    return regressions
+
+
+def printResults(results, options):
+    print('Matchmover file with %d cameras, %d shots, %d frames per shot' %
+          (options.cameras, options.shots, options.frames))
+    print('%-16s %10s %16s' % ('Step', 'Seconds', 'Peak Memory (KB)'))
+    for result in results:
+        if result.seconds == None:
+            print('%-16s FAILED' % result.stage)
+            print(result.message)
+            continue
+        peak = '-'
+        if result.peakMemory != None:
+            peak = str(result.peakMemory)
+        print('%-16s %10.4f %16s' % (result.stage, result.seconds, peak))
+    return True
+
+
+def printRegressions(regressions):
+    for stage, name, baseValue, value in regressions:
+        msg = 'Regression: %s %s was %r, now %r (%.1f%% more).'
+        percent = 100.0*(value-baseValue)/max(baseValue, 1e-9)
+        print(msg % (stage, name, baseValue, value, percent))
+    return True
+
+
+def main(options):
+    """Time every step, compare with and write the JSON results.
+
+    Returns a tuple of (list of StageResult objects, list of
+    regressions, as given by compareResults())."""
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    try:
+        imagePath = writeImageFiles(tmpDir, options.frames)
+        filePath = p.join(tmpDir, 'benchmark.rzml')
+        writeRZML(filePath, options.cameras, options.shots,
+                  options.frames, imagePath=imagePath)
+
+        results = list()
+        for stage in getStages(options):
+            result = runStage(stage, filePath, tmpDir, options)
+            results.append(result)
+    finally:
+        shutil.rmtree(tmpDir)
+    printResults(results, options)
+
+    data = getResultsData(results, options)
+    regressions = list()
+    if options.baselinePath != None:
+        baseline = readResults(options.baselinePath)
+        regressions = compareResults(data, baseline, options.tolerance)
+        printRegressions(regressions)
+    if options.outputPath != None:
+        writeResults(options.outputPath, data)
+    return results, regressions
+
+
+def parseArguments(args):
+    """Parse the command line arguments into an Options object."""
+    usage = 'usage: %prog [options]'
+    parser = optparse.OptionParser(usage=usage, version=cdo.projectVersion)
+    defaults = Options()
+    parser.add_option('-c', '--cameras', dest='cameras', type='int',
+                      default=defaults.cameras, help='number of cameras')
+    parser.add_option('-s', '--shots', dest='shots', type='int',
+                      default=defaults.shots, help='number of shots')
+    parser.add_option('-n', '--frames', dest='frames', type='int',
+                      default=defaults.frames,
+                      help='number of frames in each shot')
+    parser.add_option('-e', '--export', dest='exports',
+                      default=','.join(defaults.exports),
+                      help=('comma separated export types, any of %s' %
+                            ', '.join(exportTypes)))
+    parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                      default=defaults.repeat,
+                      help='number of runs of each step')
+    parser.add_option('-o', '--output', dest='outputPath', default=None,
+                      help='write the results to a JSON file')
+    parser.add_option('-b', '--baseline', dest='baselinePath',
+                      default=None,
+                      help='compare the results with a JSON file')
+    parser.add_option('--tolerance', dest='tolerance', type='float',
+                      default=defaults.tolerance,
+                      help=('how much slower a step can be than the '
+                            'baseline, 0.25 is 25%%'))
+    parser.add_option('--no-isolate', dest='isolate', action='store_false',
+                      default=True,
+                      help='run every step in this process')
+    opts, args = parser.parse_args(args)
+    options = Options()
+    options.cameras = opts.cameras
+    options.shots = opts.shots
+    options.frames = opts.frames
+    options.exports = list()
+    for name in opts.exports.split(','):
+        name = name.strip()
+        if len(name) == 0:
+            continue
+        if name not in exportTypes:
+            parser.error('unknown export type %s' % repr(name))
+        options.exports.append(name)
+    options.repeat = opts.repeat
+    options.outputPath = opts.outputPath
+    options.baselinePath = opts.baselinePath
+    options.tolerance = opts.tolerance
+    options.isolate = opts.isolate
+    return options
+
+
+if __name__ == '__main__':
+    results, regressions = main(parseArguments(sys.argv[1:]))
+    failed = [x for x in results if x.seconds == None]
+    if len(failed) > 0 or len(regressions) > 0:
+        sys.exit(1)
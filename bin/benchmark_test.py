@@ -0,0 +1,69 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os.path as p
+import tempfile
+
+import mmFileReader as mfr
+import benchmark
+
+
+def main(filePath):
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+
+    # The generated file has the cameras, shots and frames asked for.
+    rzmlPath = p.join(tmpDir, 'generated.rzml')
+    imagePath = benchmark.writeImageFiles(tmpDir, 10)
+    benchmark.writeRZML(rzmlPath, 2, 3, 10, imagePath=imagePath)
+    for streaming in [False, True]:
+        readOptions = mfr.Options()
+        readOptions.filePath = rzmlPath
+        readOptions.streaming = streaming
+        projData = mfr.readRZML(readOptions)
+        assert len(projData.cameras) == 2
+        assert len(projData.sequences) == 3
+        assert projData.frameRange == (0, 9, 24)
+        for cam in projData.cameras:
+            assert cam.distortion.static == False
+            assert cam.focalLength.static == False
+            assert cam.distortion.length == 10
+            assert cam.sequences[0].imagePath == imagePath
+
+    # Every step is timed, and written to the JSON file.
+    options = benchmark.Options()
+    options.cameras = 1
+    options.shots = 1
+    options.frames = 10
+    options.repeat = 1
+    options.isolate = False
+    options.outputPath = p.join(tmpDir, 'results.json')
+    results, regressions = benchmark.main(options)
+    stages = benchmark.getStages(options)
+    assert [x.stage for x in results] == stages
+    for result in results:
+        assert result.seconds != None
+    assert len(regressions) == 0
+    data = benchmark.readResults(options.outputPath)
+    assert sorted(data['stages'].keys()) == sorted(stages)
+
+    # A step is a regression once it is slower than the tolerance allows.
+    baseline = {'cameras': 1, 'shots': 1, 'frames': 10,
+                'stages': {'rawText': {'seconds': 1.0, 'peakMemory': 100}}}
+    data = {'cameras': 1, 'shots': 1, 'frames': 10,
+            'stages': {'rawText': {'seconds': 1.2, 'peakMemory': 200},
+                       'tdeLens': {'seconds': 9.0, 'peakMemory': None}}}
+    regressions = benchmark.compareResults(data, baseline, 0.25)
+    assert regressions == [('rawText', 'peakMemory', 100, 200)]
+
+    # Steps can run in their own process.
+    options.exports = ['rawText']
+    options.outputPath = None
+    options.isolate = True
+    results, regressions = benchmark.main(options)
+    assert len(results) == 9
+    for result in results:
+        assert result.seconds != None
+    return True
@@ -10,8 +10,10 @@ and converted when being read."""
 import sys
 import os
 import os.path as p
-import glob
 import platform
+import re
+import array
+import bisect
 
 projectName = 'MatchMover Distortion Tool'
 projectVersion = 'v0.3.2'
@@ -70,9 +72,28 @@ class ExportFileDescription(object):
         self.mmUndistortScript = 'mmUndistortScript_!CPU!'
         self.tdeDistortScript = 'tdeDistortScript_!CPU!'
         self.tdeUndistortScript = 'tdeUndistortScript_!CPU!'
+        self.tdeStMap = 'stMap'
 exportDesc = ExportFileDescription()
 
 
+def getOutputDirectory(inFile, outDir):
+    """Get the directory to write the output files of inFile into.
+
+    outDir - '<same>' (the directory of inFile) or any path.
+    """
+    inFile = p.abspath(str(inFile))
+    inSplit = p.split(inFile)
+    if outDir == '<same>' or outDir == 'same':
+        outDir = inSplit[0]
+    else:
+        outDir = p.abspath(outDir)
+        if not p.isdir(outDir):
+            msg = "Warning: Custom output directory is not valid, '%s'."
+            print(msg % outDir)
+            outDir = inSplit[0]
+    return outDir
+
+
 def createOutFileName(inFile,
                       cameraName, suffix,
                       outExt, outDir):
@@ -93,14 +114,7 @@ def createOutFileName(inFile,
     outFileName = inSplit[1]
     
     # Get Output directory.
-    if outDir == '<same>' or outDir == 'same':
-        outDir = inSplit[0]
-    else:
-        outDir = p.abspath(outDir)
-        if not p.isdir(outDir):
-            msg = "Warning: Custom output directory is not valid, '%s'."
-            print(msg % outDir)
-            outDir = inSplit[0]
+    outDir = getOutputDirectory(inFile, outDir)
     
     extSplit = p.splitext(outFileName)
     outFileName = extSplit[0]
@@ -123,12 +137,84 @@ def vaildInputFile(path):
     return extOk
 
 
+class TimeSelection(object):
+    """A selection of frames, stored as sorted and merged ranges.
+
+    Checking a frame is in the selection uses a precomputed set of
+    frames for small selections, or a binary search of the ranges,
+    rather than a list of every frame.
+    """
+    # Selections with more frames than this do not keep a set of frames.
+    maxFrameSetSize = 100000
+
+    def __init__(self, ranges=None):
+        """ranges - A list of (start, end) frame ranges, inclusive."""
+        # sorted start and end frames of each range, ranges never overlap.
+        self.starts = list()
+        self.ends = list()
+        self.frameSet = None
+        self.length = 0
+        if ranges != None:
+            self.setRanges(ranges)
+
+    def setRanges(self, ranges):
+        """Set the (start, end) frame ranges, merging any that overlap
+        or touch."""
+        self.starts = list()
+        self.ends = list()
+        for start, end in sorted(ranges):
+            if start > end:
+                continue
+            if len(self.ends) > 0 and start <= self.ends[-1]+1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self.length = 0
+        for i in range(len(self.starts)):
+            self.length += self.ends[i]-self.starts[i]+1
+        self.frameSet = None
+        if self.length <= self.maxFrameSetSize:
+            self.frameSet = frozenset(self)
+        return True
+
+    def getRanges(self):
+        """Returns a list of (start, end) frame ranges, inclusive."""
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, frame):
+        if self.frameSet != None:
+            return frame in self.frameSet
+        if int(frame) != frame:
+            return False
+        i = bisect.bisect_right(self.starts, frame)-1
+        return i >= 0 and frame <= self.ends[i]
+
+    def __iter__(self):
+        for i in range(len(self.starts)):
+            for frame in xrange(self.starts[i], self.ends[i]+1):
+                yield frame
+
+    def getFrames(self, start, end):
+        """Iterate over the selected frames from start to end, inclusive."""
+        i = max(bisect.bisect_right(self.starts, start)-1, 0)
+        while i < len(self.starts) and self.starts[i] <= end:
+            rangeStart = max(self.starts[i], start)
+            rangeEnd = min(self.ends[i], end)
+            for frame in xrange(rangeStart, rangeEnd+1):
+                yield frame
+            i += 1
+
+
 def parseTimeString(timeString):
-    """Converts a time string into a list of numbers.
+    """Converts a time string into a selection of frames.
 
     An example of the timeString would be '1-36' or '2,34,24'.
     
-    Returns a list of integer numbers, representing time. """
+    Returns a TimeSelection, or None if all frames are selected."""
     if (timeString == '<all>' or
         timeString == 'all' or
         timeString == 'full' or
@@ -136,7 +222,7 @@ def parseTimeString(timeString):
         timeString == '' or
         timeString == None):
         return None
-    timeList = list()
+    ranges = list()
     segs = timeString.split(',')
     for seg in segs:
         hasRangeChar = seg.find('-') != -1
@@ -151,18 +237,16 @@ def parseTimeString(timeString):
             # Range of Numbers
             rangeSplit = seg.split('-')
             rangeStart = int(rangeSplit[0])
-            rangeEnd = int(rangeSplit[1])+1
-            rangeList = list(range(rangeStart, rangeEnd))
-            for rangeValue in rangeList:
-                timeList.append(rangeValue)
+            rangeEnd = int(rangeSplit[1])
+            ranges.append((rangeStart, rangeEnd))
         elif hasRangeChar and rangeCharLen != 1:
             msg = "time string cannot be parsed, it has too many range characters ('-'): %s"
             raise ValueError, msg%repr(timeString)
         else:
             # A Single Number
             timeValue = int(seg)
-            timeList.append(timeValue)
-    return timeList
+            ranges.append((timeValue, timeValue))
+    return TimeSelection(ranges)
 
 
 def isFrameInTimeList(frame, timeList):
@@ -178,35 +262,175 @@ def isFrameInTimeList(frame, timeList):
     return False
 
 
+def getFramesInTimeList(start, end, timeList):
+    """Iterate over the frames from start to end (inclusive) that are
+    inside the time list, see isFrameInTimeList()."""
+    if timeList == None:
+        return iter(xrange(start, end+1))
+    if isinstance(timeList, TimeSelection):
+        return timeList.getFrames(start, end)
+    return iter([x for x in xrange(start, end+1) if x in timeList])
+
+
+# Directory listings, maps a directory path to (mtime, file names).
+imageDirectoryCache = dict()
+
+# Image sequence indexes, maps a sequence path to (mtime, index).
+imageSequenceCache = dict()
+
+
+def listImageDirectory(dirPath):
+    """List the file names in a directory, with a single pass over the
+    directory, only listing it again once the directory has changed.
+
+    Returns a tuple of (mtime, file names) or (None, []) if the
+    directory cannot be read."""
+    try:
+        mtime = os.stat(dirPath).st_mtime
+    except OSError:
+        return (None, list())
+    cached = imageDirectoryCache.get(dirPath)
+    if cached != None and cached[0] == mtime:
+        return cached
+    try:
+        names = os.listdir(dirPath)
+    except OSError:
+        return (None, list())
+    cached = (mtime, names)
+    imageDirectoryCache[dirPath] = cached
+    return cached
+
+
+def getImageSequenceRegex(fileName):
+    """Get a compiled regular expression matching the file names of an
+    image sequence, with the frame number as the first group.
+
+    fileName - The file name of the sequence, with '#' (one digit)
+    or '@' (four digits) in place of the frame number. If the name has
+    both, '#' is the frame number and '@' is part of the name.
+
+    Returns None if fileName has no frame number characters."""
+    padChar = None
+    if fileName.find('#') != -1:
+        padChar = '#'
+    elif fileName.find('@') != -1:
+        padChar = '@'
+    if padChar == None:
+        return None
+    first = fileName.find(padChar)
+    last = fileName.rfind(padChar)
+    middle = str()
+    for char in fileName[first:last+1]:
+        if char == '#' and padChar == '#':
+            middle += '[0-9]'
+        elif char == '@' and padChar == '@':
+            middle += '[0-9][0-9][0-9][0-9]'
+        else:
+            middle += re.escape(char)
+    pattern = ('^'+re.escape(fileName[:first])+'('+middle+')'+
+               re.escape(fileName[last+1:])+'$')
+    return re.compile(pattern)
+
+
+class ImageSequenceIndex(object):
+    """The image files found for an image sequence path.
+
+    Use getImageSequenceIndex() to get an index, rather than
+    creating it directly."""
+    def __init__(self, imagePath):
+        self.imagePath = imagePath
+        self.padding = None
+        self.startFrame = None
+        self.endFrame = None
+
+        # sorted list of frame numbers found.
+        self.frames = list()
+
+        # maps a frame number to the image path.
+        self.paths = dict()
+
+        # sorted list of image paths found.
+        self.images = list()
+
+    def getMissingFrames(self):
+        """The frames between the start and end frame with no image."""
+        missing = list()
+        if self.startFrame == None:
+            return missing
+        for frame in range(self.startFrame, self.endFrame+1):
+            if frame not in self.paths:
+                missing.append(frame)
+        return missing
+
+
+def getImageSequenceIndex(cameraImagePath):
+    """Get the index of an image sequence path, the directory is only
+    read again once it has changed.
+
+    Returns an ImageSequenceIndex or None if the sequence path cannot
+    be parsed."""
+    imagePath = p.abspath(str(cameraImagePath))
+    dirPath, fileName = p.split(imagePath)
+    regex = getImageSequenceRegex(fileName)
+    if regex == None:
+        return None
+
+    mtime, names = listImageDirectory(dirPath)
+    cached = imageSequenceCache.get(imagePath)
+    if cached != None and mtime != None and cached[0] == mtime:
+        return cached[1]
+
+    index = ImageSequenceIndex(imagePath)
+    index.padding = getImageSequencePadding(fileName)
+    images = list()
+    for name in names:
+        match = regex.match(name)
+        if match == None:
+            continue
+        path = p.join(dirPath, name)
+        frameStr = match.group(1)
+        images.append(path)
+        if frameStr.isdigit():
+            index.paths[int(frameStr)] = path
+    images.sort()
+    index.images = images
+    index.frames = sorted(index.paths.keys())
+    if len(index.frames) > 0:
+        index.startFrame = index.frames[0]
+        index.endFrame = index.frames[-1]
+    if mtime != None:
+        imageSequenceCache[imagePath] = (mtime, index)
+    return index
+
+
 def getAllImageSequence(cameraImagePath):
     """Try to get all image files from an image sequence path."""
     images = list()
 
-    imagePath = p.abspath(str(cameraImagePath))
-    globPath = str()
-    if imagePath.find('#') != -1:
-        globPath = imagePath.replace('#', '[0-9]')
-    elif imagePath.find('@') != -1:
-        globPath = imagePath.replace('@', '[0-9][0-9][0-9][0-9]')
-
-    if globPath == str():
+    index = getImageSequenceIndex(cameraImagePath)
+    if index == None:
         msg = "Warning: Could not parse image sequence path, '%s'."
         print(msg % repr(cameraImagePath))
         return images
 
-    images = glob.glob(globPath)
+    images = list(index.images)
     
     if len(images) == 0:
         msg = "Warning: Could not get image paths from sequence path, '%s'."
         print(msg % repr(cameraImagePath))
         return images
 
-    images.sort()
     return images
 
 
-def getImageSequenceStartFrame(cameraImagePath):
-    images = getAllImageSequence(cameraImagePath)
+def getImageSequenceStartFrame(cameraImagePath, images=None):
+    """Get the frame number before the first image of the sequence.
+
+    images - The image files of the sequence, see getAllImageSequence(),
+    if None the sequence path is searched.
+    """
+    if images == None:
+        images = getAllImageSequence(cameraImagePath)
     frameNum = int()
     if len(images) > 0:
         frameNum = getImagePathFrameNumber(cameraImagePath, images[0])
@@ -251,6 +475,32 @@ def getImagePathFrameNumber(seqPath, imagePath):
     return frameNum
 
 
+def getOutputImagePath(seqStart, seqEnd, suffix, frameNum, seqPad, ext=None):
+    """Get the output image path for a frame of an image sequence.
+
+    The suffix is added to the sequence name, before the frame number,
+    keeping the separator character ('.', '_' or '-') in place.
+
+    seqStart, seqEnd - The image sequence, see splitImageSequencePath().
+    ext - The output image extension, if None the input extension is used.
+    """
+    outImgPath = str()
+    frameStr = str(frameNum).zfill(seqPad)
+    if seqStart.endswith('.'):
+        outImgPath = seqStart[:-1]+suffix+'.'
+    elif seqStart.endswith('_'):
+        outImgPath = seqStart[:-1]+suffix+'_'
+    elif seqStart.endswith('-'):
+        outImgPath = seqStart[:-1]+suffix+'-'
+    else:
+        outImgPath = seqStart+suffix
+    if ext == None:
+        outImgPath = outImgPath+frameStr+seqEnd
+    else:
+        outImgPath = outImgPath+frameStr+'.'+ext
+    return outImgPath
+
+
 def getImageSequencePadding(cameraImagePath):
     """Returns the padding of the image sequence path."""
     pad = None
@@ -282,6 +532,146 @@ def convertUnixToWinePath(filePath):
     return winePath
 
 
+def getUpToDateCommand(cmd, inImgPath, outImgPath, opsys=None):
+    """Wrap a frame command so it is only run when the output image is
+    older than the input image, so a script that was stopped can be run
+    again to finish the frames that are left.
+
+    Windows batch files can not compare file times, so on Windows
+    the command is only run if the output image does not exist."""
+    if opsys == None:
+        opsys = str(platform.system()).lower()
+    cmd = cmd.rstrip()
+    upToDateCmd = ('if [ ! "%s" -nt "%s" ]; then' % (outImgPath, inImgPath)+
+                   os.linesep+'    '+cmd+os.linesep+'fi'+os.linesep)
+    if opsys == 'windows':
+        upToDateCmd = 'IF NOT EXIST "%s" %s' % (outImgPath, cmd)+os.linesep
+    return upToDateCmd
+
+
+def getClosestIndex(frame, frames):
+    """Get the index of the closest frame in the sorted sequence frames.
+
+    frame - An int for the frame to look up.
+    frames - A sequence of frame numbers, sorted from lowest to highest.
+
+    When two frames are equally close, the lower frame is used.
+
+    Returns the index into frames, or None if frames is empty."""
+    num = len(frames)
+    if num == 0:
+        return None
+    index = bisect.bisect_left(frames, frame)
+    if index == 0:
+        return 0
+    if index == num:
+        return num-1
+    if frames[index] == frame:
+        return index
+    if (frames[index]-frame) < (frame-frames[index-1]):
+        return index
+    return index-1
+
+
+def reduceKeyRuns(frames, values, tolerance=0.0):
+    """Find the keys needed to recreate a curve with linear interpolation,
+    dropping keys inside constant or linear runs.
+
+    Every key dropped is within tolerance of the line between the keys
+    kept either side of it. Runs are found in one pass, by keeping the
+    range of slopes from the last key kept that pass within tolerance of
+    every key since.
+
+    frames - A sorted list of frame numbers.
+    values - A list of the values at each frame.
+    tolerance - The largest difference allowed for a dropped key.
+
+    Returns a list of the indices of the keys kept."""
+    num = len(frames)
+    if num <= 2:
+        return list(range(num))
+    limit = tolerance+(sys.float_info.epsilon*100.0)
+    kept = [0]
+    anchor = 0
+    lo = float('-inf')
+    hi = float('inf')
+    for i in range(1, num):
+        df = float(frames[i]-frames[anchor])
+        slope = (values[i]-values[anchor])/df
+        if not (lo <= slope <= hi):
+            # The previous key ends the run.
+            anchor = i-1
+            kept.append(anchor)
+            df = float(frames[i]-frames[anchor])
+            lo = float('-inf')
+            hi = float('inf')
+        lo = max(lo, (values[i]-limit-values[anchor])/df)
+        hi = min(hi, (values[i]+limit-values[anchor])/df)
+    if kept[-1] != num-1:
+        kept.append(num-1)
+    return kept
+
+
+def reduceKeysRdp(frames, values, tolerance=0.0):
+    """Find the keys needed to recreate a curve with linear interpolation,
+    using the Ramer-Douglas-Peucker algorithm.
+
+    The distance of a key from a line is measured in values (not
+    perpendicular to the line), so tolerance has the same units as
+    values, as in reduceKeyRuns().
+
+    Returns a list of the indices of the keys kept."""
+    num = len(frames)
+    if num <= 2:
+        return list(range(num))
+    limit = tolerance+(sys.float_info.epsilon*100.0)
+    keep = [False]*num
+    keep[0] = True
+    keep[num-1] = True
+    stack = [(0, num-1)]
+    while len(stack) > 0:
+        start, end = stack.pop()
+        if end-start < 2:
+            continue
+        df = float(frames[end]-frames[start])
+        slope = (values[end]-values[start])/df
+        maxError = -1.0
+        maxIndex = None
+        for i in range(start+1, end):
+            line = values[start]+(slope*(frames[i]-frames[start]))
+            error = abs(values[i]-line)
+            if error > maxError:
+                maxError = error
+                maxIndex = i
+        if maxError > limit:
+            keep[maxIndex] = True
+            stack.append((start, maxIndex))
+            stack.append((maxIndex, end))
+    return [i for i in range(num) if keep[i]]
+
+
+def reduceKeys(frames, values, tolerance=0.0, useRdp=False):
+    """Drop the keys of a curve that can be recreated, within tolerance,
+    by linear interpolation of the keys kept.
+
+    Constant and linear runs are removed first, see reduceKeyRuns(),
+    with tolerance, or exactly when useRdp is True, then the
+    Ramer-Douglas-Peucker algorithm drops more keys, see reduceKeysRdp().
+
+    Returns a tuple of the (frames, values) lists kept."""
+    runTolerance = tolerance
+    if useRdp:
+        runTolerance = 0.0
+    indices = reduceKeyRuns(frames, values, tolerance=runTolerance)
+    frames = [frames[i] for i in indices]
+    values = [values[i] for i in indices]
+    if useRdp:
+        indices = reduceKeysRdp(frames, values, tolerance=tolerance)
+        frames = [frames[i] for i in indices]
+        values = [values[i] for i in indices]
+    return (frames, values)
+
+
 def getClosestFrame(frame, value):
     """Get the closest frame in the dictionary value.
 
@@ -289,90 +679,68 @@ def getClosestFrame(frame, value):
     value - A dict with keys as the frames to look up.
 
     Returns the closest frame in the dict value."""
-    # TODO: This function is quite slow, it should be improved.
-    keys = value.keys()
-    intKeys = list()
-    for key in keys:
-        intKeys.append(int(key))
-    keys = sorted(intKeys)
-    diff = int()
-    closestFrame = None
-    for key in keys:
-        if closestFrame == None:
-            closestFrame = key
-            diff = frame-closestFrame
-        if (key <= frame) and (key > closestFrame):
-            closestFrame = key
-        # if (key >= frame) and (key < closestFrame):
-        #     closestFrame = key
-        diff = closestFrame-frame
-    keys.reverse()
-    closestFrameRev = None
-    for key in keys:
-        if closestFrameRev == None:
-            closestFrameRev = key
-            diff = frame-closestFrameRev
-        # if (key <= frame) and (key > closestFrameRev):
-        #     closestFrameRev = key
-        if (key >= frame) and (key < closestFrameRev):
-            closestFrameRev = key
-        diff = closestFrameRev-frame    
-    diffRef = abs(closestFrameRev-frame)
-    diff = abs(closestFrame-frame)
-    if diffRef < diff:
-        closestFrame = closestFrameRev
-    return closestFrame
+    keys = sorted([int(key) for key in value.keys()])
+    index = getClosestIndex(frame, keys)
+    if index == None:
+        return None
+    return keys[index]
 
 
 class KeyframeData(object):
-    """Keyframe data, used to store animated (or static) data."""
+    """Keyframe data, used to store animated (or static) data.
+
+    Animated data is stored as two parallel arrays, the frame numbers
+    and the values, both sorted by frame number."""
     def __init__(self, static=False, initialValue=None):
         self.static = static
         self.startFrame = 0
         self.endFrame = 0
         self.length = 0
         self.value = None
+        self.frames = array.array('i')
+        self.values = array.array('d')
         if initialValue != None:
             self.setValue(initialValue, 0)
 
+    def isContiguous(self):
+        """Returns True if there is a key on every frame
+        between the start and end frames."""
+        return (self.endFrame-self.startFrame+1) == self.length
+
+    def getIndex(self, frame):
+        """Get the index of the key closest to frame, or None if
+        there are no keys."""
+        if self.length == 0:
+            return None
+        if self.isContiguous():
+            # No need to search, the index is the offset from the start.
+            if frame <= self.startFrame:
+                return 0
+            if frame >= self.endFrame:
+                return self.length-1
+            return frame-self.startFrame
+        return getClosestIndex(frame, self.frames)
+
     def getValue(self, frame):
-        "Get the key value at frame. frame is an integer."
-        # TODO: Should we get the closest frame, 
-        #  if the frame does not not exist?
+        """Get the key value at frame. frame is an integer.
+
+        If there is no key on the frame, the value of the closest
+        key is returned."""
         value = None
-        # lookupFrame = frame - self.startFrame
         if self.static == True:
             value = self.value
         elif self.static == False:
-            assert isinstance(self.value, dict)
-            if isinstance(self.value, dict):
-                key = str(frame)
-                if self.value.has_key(key):
-                    value = self.value[key]
-                else:
-                    # there is no key on the frame, find the closest frame.
-                    frame = getClosestFrame(frame, self.value)
-                    key = str(frame)
-                    if self.value.has_key(key):
-                        value = self.value[key]
-
+            index = self.getIndex(frame)
+            if index != None:
+                value = self.values[index]
         return value
 
     def getKeyValues(self):
         keyValues = list()
-        if isinstance(self.value, dict):
-            # Sort keys, based on int values, not string.
-            keys = self.value.keys()            
-            intKeys = list()
-            for key in keys:
-                intKeys.append(int(key))
-            keys = sorted(intKeys)
-
+        if self.static == False:
             # Create key/value pairs.
-            for key in keys:
-                keyValue = [int(key),
-                            self.getValue(int(key))]
-                keyValues.append(keyValue)
+            for key, value in zip(self.frames, self.values):
+                keyValues.append([key, value])
         else:
             assert isinstance(self.startFrame, int)
             keyValue = [self.startFrame, self.getValue(0)]
@@ -381,42 +749,84 @@ class KeyframeData(object):
 
     def getTimeValues(self):
         """Get all times, should be first half of getKeyValues."""
-        timeValues = list()
-        keyValues = self.getKeyValues()
-        for kv in keyValues:
-            timeValues.append(kv[0])
-        return timeValues
+        if self.static == False:
+            return list(self.frames)
+        return [self.startFrame]
 
     def getValues(self):
         """Get all values, should be second half of getKeyValues."""
+        if self.static == False:
+            return list(self.values)
+        return [self.getValue(0)]
+
+    def sampleValues(self, frames):
+        """Get the key values at each of the frames given.
+
+        frames - A list of integer frame numbers.
+
+        Returns a list of values, the same as calling getValue()
+        for every frame."""
+        if self.static == True:
+            return [self.value]*len(frames)
+        num = len(frames)
+        if (num > 0 and self.length > 0 and self.isContiguous() and
+            frames[0] >= self.startFrame and frames[-1] <= self.endFrame and
+            (frames[-1]-frames[0]+1) == num):
+            # A contiguous range inside the keys, slice the values.
+            startIndex = frames[0]-self.startFrame
+            return self.values[startIndex:startIndex+num].tolist()
         values = list()
-        keyValues = self.getKeyValues()
-        for kv in keyValues:
-            values.append(kv[1])
+        for frame in frames:
+            values.append(self.getValue(frame))
         return values
 
+    def setKeyValues(self, frames, values):
+        """Set many values at once, at the frames given.
+
+        frames - A list of integer frame numbers.
+        values - A list of values, one for each frame.
+        """
+        assert len(frames) == len(values)
+        isSorted = True
+        for i in range(1, len(frames)):
+            if frames[i-1] >= frames[i]:
+                isSorted = False
+                break
+        if (self.static == True or self.length > 0 or not isSorted or
+            len(frames) == 0):
+            for frame, value in zip(frames, values):
+                self.setValue(value, frame)
+            return True
+
+        # No keys yet and the frames are in order, copy straight in.
+        self.frames = array.array('i', frames)
+        self.values = array.array('d', values)
+        self.length = len(self.frames)
+        self.startFrame = self.frames[0]
+        self.endFrame = self.frames[-1]
+        return True
+
     def setValue(self, x, f):
         """Set the value x, at frame f."""
 
         if self.static == False:
-            # Initialise the value to a dict
-            if self.value == None:
-                self.value = dict()
-
-            if self.value.has_key(str(f)) and \
-               self.value[str(f)] == x:
-                return True
-
-            # Set the value.
-            self.value[str(f)] = x
+            if self.length == 0 or f > self.endFrame:
+                # Keys are usually set in order, so add to the end.
+                self.frames.append(f)
+                self.values.append(x)
+            else:
+                index = bisect.bisect_left(self.frames, f)
+                if self.frames[index] == f:
+                    # Overwrite the existing key.
+                    self.values[index] = x
+                    return True
+                self.frames.insert(index, f)
+                self.values.insert(index, x)
 
             # set start and end frame and length
-            if self.value[str(f)] == x:
-                self.length = self.length + 1
-                if self.startFrame > f:
-                    self.startFrame = f
-                if self.endFrame < f:
-                    self.endFrame = f
+            self.length = len(self.frames)
+            self.startFrame = self.frames[0]
+            self.endFrame = self.frames[-1]
         else:
             # Set the value, overwrites values without checking.
             self.value = x
@@ -434,19 +844,19 @@ class KeyframeData(object):
         static if all values are the same."""
 
         if self.static == False:
-            assert isinstance(self.value, dict)
-            initial = None
-            total = float() # assume it's a float?
-            totalNum = int()
-            for key in iter(self.value):
-                if initial == None:
-                    initial = self.value[key]
-                total = total+self.value[key]
-                totalNum = totalNum + 1
-            average = total/totalNum
-            if floatIsEqual(average, initial):
+            assert self.length > 0
+            initial = self.values[0]
+            isStatic = True
+            for value in self.values:
+                if not floatIsEqual(value, initial):
+                    isStatic = False
+                    break
+            if isStatic:
+                average = sum(self.values)/self.length
                 self.value = average
                 self.static = True
+                self.frames = array.array('i')
+                self.values = array.array('d')
                 self.length = 1
                 self.startFrame = 0
                 self.endFrame = 0
@@ -457,6 +867,66 @@ class KeyframeData(object):
         return True
 
 
+class CurveSamples(object):
+    """The values of a KeyframeData object, looked up once for the
+    frames exported.
+
+    keyframes - The KeyframeData object.
+    timeList - The frames to export, see parseTimeString().
+    frames - A list of every frame exported, sorted.
+    """
+    def __init__(self, keyframes, timeList, frames):
+        self.static = keyframes.static
+
+        # The static value, or the value of the first key.
+        self.value = keyframes.getValue(0)
+
+        # Number of keys, before filtering with the time list.
+        self.length = keyframes.length
+
+        # The keys inside the time list, and their values.
+        self.keyFrames = list()
+        self.keyValues = list()
+
+        # The value at each of the frames exported.
+        self.frameValues = [self.value]*len(frames)
+
+        if not self.static:
+            if timeList == None:
+                self.keyFrames = list(keyframes.frames)
+                self.keyValues = list(keyframes.values)
+            else:
+                self.keyFrames = [x for x in keyframes.frames
+                                  if isFrameInTimeList(x, timeList)]
+                self.keyValues = keyframes.sampleValues(self.keyFrames)
+            self.frameValues = keyframes.sampleValues(frames)
+
+
+class CameraSamples(object):
+    """The values of the animated curves of a camera, looked up once
+    for the frames exported, so every writer can share them.
+
+    Curves must not be changed (for example with simplifyData())
+    after the samples are made.
+
+    cam - A TDECameraData object.
+    timeList - The frames to export, see parseTimeString().
+    """
+    def __init__(self, cam, timeList):
+        frameRange = (0, 0, 24)
+        if cam.sequences != None and len(cam.sequences) > 0:
+            frameRange = cam.sequences[0].frameRange
+        numFrames = int(frameRange[1]-frameRange[0])
+
+        # Every frame exported, from 1 to the number of frames.
+        self.frames = list(getFramesInTimeList(1, numFrames, timeList))
+
+        self.focalLength = CurveSamples(cam.focalLength, timeList,
+                                        self.frames)
+        self.distortion = CurveSamples(cam.distortion, timeList,
+                                       self.frames)
+
+
 class CameraData(object):
     """Camera Data base class."""
     def __init__(self):
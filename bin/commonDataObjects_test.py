@@ -8,7 +8,7 @@ import sys
 import math
 import os
 import os.path as p
-
+import tempfile
 
 import commonDataObjects as cdo
 import mmFileReader
@@ -91,6 +91,59 @@ def main(filePath):
     values = keyData.getValues()
     assert len(values) == 1
 
+    # Test KeyframeData, keys set out of order are sorted.
+    keyData = cdo.KeyframeData()
+    keyData.setValue(3.0, 30)
+    keyData.setValue(1.0, 10)
+    keyData.setValue(2.0, 20)
+    keyData.setValue(2.5, 20)
+    assert keyData.length == 3
+    assert keyData.startFrame == 10
+    assert keyData.endFrame == 30
+    assert keyData.getTimeValues() == [10, 20, 30]
+    assert keyData.getValues() == [1.0, 2.5, 3.0]
+
+    # Test KeyframeData, closest key lookup.
+    assert keyData.isContiguous() == False
+    assert keyData.getValue(0) == 1.0
+    assert keyData.getValue(14) == 1.0
+    assert keyData.getValue(15) == 1.0
+    assert keyData.getValue(16) == 2.5
+    assert keyData.getValue(26) == 3.0
+    assert keyData.getValue(100) == 3.0
+
+    # Test KeyframeData, contiguous keys.
+    keyData = cdo.KeyframeData()
+    for frame in range(5, 15):
+        keyData.setValue(float(frame), frame)
+    assert keyData.isContiguous() == True
+    assert keyData.getValue(0) == 5.0
+    assert keyData.getValue(9) == 9.0
+    assert keyData.getValue(20) == 14.0
+
+    # Test KeyframeData, sampling and setting many values.
+    assert keyData.sampleValues([6, 7, 8]) == [6.0, 7.0, 8.0]
+    assert keyData.sampleValues([0, 9, 20]) == [5.0, 9.0, 14.0]
+    keyData = cdo.KeyframeData()
+    keyData.setKeyValues([1, 2, 4], [1.0, 2.0, 4.0])
+    assert keyData.length == 3
+    assert keyData.getValue(3) == 2.0
+    keyData.setKeyValues([0, 3], [0.0, 3.0])
+    assert keyData.getTimeValues() == [0, 1, 2, 3, 4]
+    assert keyData.isContiguous() == True
+    keyData = cdo.KeyframeData(static=True, initialValue=1.0)
+    assert keyData.sampleValues([1, 2]) == [1.0, 1.0]
+
+    # Test KeyframeData, values averaging to the first value
+    # are still animated.
+    keyData = cdo.KeyframeData()
+    keyData.setValue(1.0, 0)
+    keyData.setValue(0.0, 1)
+    keyData.setValue(2.0, 2)
+    keyData.simplifyData()
+    assert keyData.static == False
+    assert keyData.length == 3
+
     # Test getClosestFrame
     value = {'10':0.0,
              '12':0.0,
@@ -112,5 +165,135 @@ def main(filePath):
     assert cdo.getClosestFrame(43, value) == 44
     assert cdo.getClosestFrame(30, value) == 44
     assert cdo.getClosestFrame(-1, value) == 10
-    
+
+    # Test curve key reduction.
+    frames = range(1, 21)
+    values = [1.0]*5+[1.0+(0.1*i) for i in range(1, 6)]+[1.5]*10
+    for useRdp in [False, True]:
+        keys = cdo.reduceKeys(frames, values, useRdp=useRdp)
+        assert keys[0] == [1, 5, 10, 20]
+        assert keys[1] == [1.0, 1.0, 1.5, 1.5]
+    values = [0.0, 0.1, -0.1, 0.05, 0.0, 1.0]
+    keys = cdo.reduceKeys(range(6), values)
+    assert keys[0] == range(6)
+    keys = cdo.reduceKeys(range(6), values, tolerance=0.11)
+    assert keys[0] == [0, 1, 2, 4, 5]
+    keys = cdo.reduceKeys(range(6), values, tolerance=0.11, useRdp=True)
+    assert keys[0] == [0, 4, 5]
+    assert cdo.reduceKeys([3], [1.0]) == ([3], [1.0])
+    assert cdo.reduceKeys([], []) == ([], [])
+
+    # Test time strings.
+    assert cdo.parseTimeString('<all>') == None
+    assert cdo.parseTimeString('') == None
+    assert cdo.parseTimeString('-5') == None
+    timeList = cdo.parseTimeString('12,1-3,2-5,7,20-10,8-9')
+    assert timeList.getRanges() == [(1, 5), (7, 9), (12, 12)]
+    assert len(timeList) == 9
+    assert list(timeList) == [1, 2, 3, 4, 5, 7, 8, 9, 12]
+    assert list(timeList.getFrames(4, 8)) == [4, 5, 7, 8]
+    assert list(timeList.getFrames(13, 20)) == []
+    for frame in range(-2, 15):
+        inList = frame in [1, 2, 3, 4, 5, 7, 8, 9, 12]
+        assert cdo.isFrameInTimeList(frame, timeList) == inList
+    assert cdo.isFrameInTimeList(2.5, timeList) == False
+    assert cdo.isFrameInTimeList(2.0, timeList) == True
+    assert cdo.isFrameInTimeList(6, None) == True
+    assert list(cdo.getFramesInTimeList(3, 6, None)) == [3, 4, 5, 6]
+    assert list(cdo.getFramesInTimeList(3, 6, [4, 9])) == [4]
+
+    # Large selections do not keep every frame.
+    timeList = cdo.parseTimeString('1-1000000,2000000')
+    assert timeList.frameSet == None
+    assert len(timeList) == 1000001
+    assert 500000 in timeList and 2000000 in timeList
+    assert 0 not in timeList and 1000001 not in timeList
+    assert 2.5 not in timeList
+    assert list(timeList.getFrames(999999, 2000005)) == [999999, 1000000,
+                                                          2000000]
+    try:
+        cdo.parseTimeString('1-2-3')
+        assert False
+    except ValueError:
+        pass
+
+    # Test image sequence index.
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    for name in ['plate.0001.png', 'plate.0002.png', 'plate.0005.png',
+                 'plate.001.png', 'plate.00010.png', 'plate.abcd.png',
+                 'other.0003.png', 'plate.0004.png.bak']:
+        open(p.join(tmpDir, name), 'w').close()
+    for seqPath in ['plate.####.png', 'plate.@.png']:
+        seqPath = p.join(tmpDir, seqPath)
+        index = cdo.getImageSequenceIndex(seqPath)
+        assert index.padding == 4
+        assert index.startFrame == 1
+        assert index.endFrame == 5
+        assert index.frames == [1, 2, 5]
+        assert index.getMissingFrames() == [3, 4]
+        assert index.paths[5] == p.join(tmpDir, 'plate.0005.png')
+        assert cdo.getAllImageSequence(seqPath) == index.images
+        assert cdo.getImageSequenceStartFrame(seqPath) == 0
+        assert cdo.getImageSequenceIndex(seqPath) is index
+
+    # The index is updated when the directory changes.
+    seqPath = p.join(tmpDir, 'plate.####.png')
+    open(p.join(tmpDir, 'plate.0003.png'), 'w').close()
+    os.utime(tmpDir, (1000, 1000))
+    index = cdo.getImageSequenceIndex(seqPath)
+    assert index.frames == [1, 2, 3, 5]
+    assert index.getMissingFrames() == [4]
+    assert cdo.getImageSequenceIndex(p.join(tmpDir, 'plate.png')) == None
+    assert cdo.getAllImageSequence(p.join(tmpDir, 'none.####.png')) == []
+
+    # Frame number characters in the directory are part of the path.
+    shotDir = p.join(tmpDir, 'sh@010')
+    os.mkdir(shotDir)
+    for name in ['plate.0007.png', 'plate.0008.png', 'plate@.0009.png']:
+        open(p.join(shotDir, name), 'w').close()
+    for seqPath in ['plate.####.png', 'plate.@.png']:
+        seqPath = p.join(shotDir, seqPath)
+        index = cdo.getImageSequenceIndex(seqPath)
+        assert index.padding == 4
+        assert index.frames == [7, 8]
+        assert cdo.getAllImageSequence(seqPath) == index.images
+    index = cdo.getImageSequenceIndex(p.join(shotDir, 'plate@.####.png'))
+    assert index.frames == [9]
+    seqPath = p.join(shotDir, 'plate.####.png')
+    assert cdo.getImageSequenceStartFrame(seqPath) == 6
+
+    # Camera samples give the same values as looking up each frame.
+    readOptions = mmFileReader.Options()
+    readOptions.filePath = filePath
+    projData = mmFileReader.readRZML(readOptions)
+    for cam in projData.cameras:
+        tdeCam = converter.convertCamera(cam, cdo.softwareType.tde)
+        for timeString in ['<all>', '2-5,40', '26265']:
+            timeList = cdo.parseTimeString(timeString)
+            samples = cdo.CameraSamples(tdeCam, timeList)
+            for frame in samples.frames:
+                assert cdo.isFrameInTimeList(frame, timeList)
+            for keys, curve in [(tdeCam.focalLength, samples.focalLength),
+                                (tdeCam.distortion, samples.distortion)]:
+                assert curve.static == keys.static
+                assert curve.value == keys.getValue(0)
+                expected = [keys.getValue(x) for x in samples.frames]
+                assert curve.frameValues == expected
+                if keys.static:
+                    assert curve.keyFrames == []
+                    continue
+                expected = [x for x in keys.getTimeValues()
+                            if cdo.isFrameInTimeList(x, timeList)]
+                assert curve.keyFrames == expected
+                expected = [keys.getValue(x) for x in curve.keyFrames]
+                assert curve.keyValues == expected
+
+    # Frames are only run when the output is older than the input.
+    cmd = cdo.getUpToDateCommand('warp4 ', 'in.png', 'out.png',
+                                 opsys='linux')
+    assert cmd.find('[ ! "out.png" -nt "in.png" ]') != -1
+    assert cmd.find('    warp4'+os.linesep) != -1
+    cmd = cdo.getUpToDateCommand('warp4 ', 'in.png', 'out.png',
+                                 opsys='windows')
+    assert cmd == 'IF NOT EXIST "out.png" warp4'+os.linesep
     return True
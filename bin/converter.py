@@ -11,6 +11,13 @@ import os.path as p
 import commonDataObjects as cdo
 import mmFileReader
 
+# NumPy is optional, it is used to convert many values at once.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 def mmToTdeConvertDistortion(dst, fl, alpha,
                              fbw, fbh,
                              width, height):
@@ -48,6 +55,51 @@ def mmToTdeConvertDistortion(dst, fl, alpha,
     return ld
 
 
+def mmToTdeConvertDistortionArray(dst, fl, alpha,
+                                  fbw, fbh,
+                                  width, height):
+    """Converts many Matchmover lens distortion values into
+    3DE lens distortion values at once.
+
+    dst - A list of distortion values.
+    fl - A list of focal values, one for each distortion value.
+    alpha - The pixel aspect ratio.
+    fbw, fbh - Filmback Width/Height.
+    width, height - Image Width/Height.
+
+    Uses NumPy if it is available, otherwise falls back to calling
+    mmToTdeConvertDistortion() for each value.
+
+    Returns a list of 3DE distortion values."""
+    assert len(dst) == len(fl)
+    if np == None:
+        values = list()
+        for d, f in zip(dst, fl):
+            ld = mmToTdeConvertDistortion(d, f, alpha,
+                                          fbw, fbh,
+                                          width, height)
+            values.append(ld)
+        return values
+
+    # The same calculation as mmToTdeConvertDistortion(),
+    # over whole arrays.
+    dst = np.asarray(dst, dtype=np.float64)
+    fl = np.asarray(fl, dtype=np.float64)
+    hwidth = width/2.0
+    hheight = height/2.0
+    rr = (hwidth*hwidth)+(hheight*hheight)/(alpha*alpha)
+
+    k = dst/(fl*fl)
+    newr = 1.0+k*rr
+    newptx = hwidth*newr
+    newpty = hheight*newr
+
+    ld1 = (math.sqrt((hwidth*hwidth)+(hheight*hheight))/2)
+    ld2 = (np.sqrt((newptx*newptx)+(newpty*newpty))/2)
+    ld = (ld2/ld1)-1.0
+    return ld.tolist()
+
+
 def convertValue(inValue, inUnit, outUnit):
     assert (isinstance(inValue, int) or 
             isinstance(inValue, float) or 
@@ -103,15 +155,15 @@ def convertDistortion(cam, outType):
         if (cam.sequences != None) and (len(cam.sequences) > 0):
             frameRange = cam.sequences[0].frameRange
         if (frameRange[1]-frameRange[0]) > 0:
-            for i in range(frameRange[0], frameRange[1]):
-                dst = cam.distortion.getValue(i)
-                fl = cam.focal.getValue(i)
-                k = mmToTdeConvertDistortion(dst, fl,
-                                             cam.pixelAspectRatio,
-                                             cam.filmbackWidth,
-                                             cam.filmbackHeight,
-                                             cam.width, cam.height)
-                outValue.setValue(k, i)
+            frames = list(range(frameRange[0], frameRange[1]))
+            dst = cam.distortion.sampleValues(frames)
+            fl = cam.focal.sampleValues(frames)
+            values = mmToTdeConvertDistortionArray(dst, fl,
+                                                   cam.pixelAspectRatio,
+                                                   cam.filmbackWidth,
+                                                   cam.filmbackHeight,
+                                                   cam.width, cam.height)
+            outValue.setKeyValues(frames, values)
         else:
             outValue.setValue(0.0, 0)
         outValue.simplifyData()
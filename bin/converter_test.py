@@ -44,6 +44,23 @@ def main(filePath):
         distortion = converter.convertDistortion(cam, cdo.softwareType.tde)
         distortion = converter.convertDistortion(cam, cdo.softwareType.mm)
 
+        # Test the batch distortion converter gives the same values as
+        # the single value converter, with and without NumPy.
+        frames = cam.distortion.getTimeValues()
+        dst = cam.distortion.sampleValues(frames)
+        fl = cam.focal.sampleValues(frames)
+        args = (cam.pixelAspectRatio,
+                cam.filmbackWidth, cam.filmbackHeight,
+                cam.width, cam.height)
+        values = list()
+        for d, f in zip(dst, fl):
+            values.append(converter.mmToTdeConvertDistortion(d, f, *args))
+        assert converter.mmToTdeConvertDistortionArray(dst, fl, *args) == values
+        numpyModule = converter.np
+        converter.np = None
+        assert converter.mmToTdeConvertDistortionArray(dst, fl, *args) == values
+        converter.np = numpyModule
+
         # Test unit conversion, on float values and KeyframeData objects
         # (static and not static).
         assert converter.convertValue(1.0, cdo.units.cm, cdo.units.mm) == 10.0
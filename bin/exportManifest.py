@@ -0,0 +1,181 @@
+"""Remembers which files were exported from a Matchmover file, so
+exporting the same file again only writes the files that are out of date.
+
+The manifest is a JSON file written next to the exported files. For each
+camera and export type it stores a hash of the exporter options and the
+files written. The whole manifest is only valid for the Matchmover file
+(hashed byte for byte), the tool version and the version of the
+exporter output (see outputVersion) it was written with.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import hashlib
+import json
+import tempfile
+
+import commonDataObjects as cdo
+
+# Change this when the layout of the manifest file changes.
+manifestVersion = 1
+
+# Change this when the files written by any exporter change, so files
+# written by an earlier version are exported again.
+outputVersion = 1
+
+manifestFileSuffix = '_manifest.json'
+
+
+def getManifestPath(inputFile, outputDir):
+    """Get the manifest file path for a Matchmover file."""
+    outDir = cdo.getOutputDirectory(inputFile, outputDir)
+    fileName = p.splitext(p.split(p.abspath(inputFile))[1])[0]
+    return p.join(outDir, fileName+manifestFileSuffix)
+
+
+def hashFile(filePath, blockSize=1024*1024):
+    """Get the SHA1 hash of the contents of a file."""
+    sha = hashlib.sha1()
+    f = open(filePath, 'rb')
+    try:
+        data = f.read(blockSize)
+        while data:
+            sha.update(data)
+            data = f.read(blockSize)
+    finally:
+        f.close()
+    return sha.hexdigest()
+
+
+def hashOptions(options):
+    """Get the SHA1 hash of an exporter Options object's attributes."""
+    items = sorted(vars(options).items())
+    return hashlib.sha1(repr(items)).hexdigest()
+
+
+def hashImages(imagePath):
+    """Get the SHA1 hash of the image files found for a sequence path.
+
+    Returns None if imagePath is None."""
+    if imagePath == None:
+        return None
+    images = cdo.getAllImageSequence(imagePath)
+    return hashlib.sha1(repr(sorted(images))).hexdigest()
+
+
+class Manifest(object):
+    """The exports written from a single Matchmover file.
+
+    filePath - The manifest file path, see getManifestPath().
+    """
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.inputHash = None
+        self.toolVersion = cdo.projectVersion
+
+        # Names of the cameras in the Matchmover file, None if unknown.
+        self.cameras = None
+
+        # Maps getEntryKey() to a dict of the entry.
+        self.entries = dict()
+
+    def getEntryKey(self, cameraName, exportType):
+        return '%s|%s' % (cameraName, exportType)
+
+    def read(self):
+        """Read the manifest file, if it exists and is valid.
+
+        Returns True if the manifest was read."""
+        if not p.isfile(self.filePath):
+            return False
+        try:
+            f = open(self.filePath, 'r')
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            msg = "Warning: Could not read manifest file, '%s'."
+            print(msg % self.filePath)
+            return False
+        if (not isinstance(data, dict) or
+            data.get('manifestVersion') != manifestVersion or
+            data.get('outputVersion') != outputVersion or
+            data.get('toolVersion') != cdo.projectVersion):
+            return False
+        self.inputHash = data.get('inputHash')
+        self.cameras = data.get('cameras')
+        self.entries = data.get('entries', dict())
+        return True
+
+    def write(self):
+        """Write the manifest file."""
+        data = {
+            'manifestVersion': manifestVersion,
+            'outputVersion': outputVersion,
+            'toolVersion': self.toolVersion,
+            'inputHash': self.inputHash,
+            'cameras': self.cameras,
+            'entries': self.entries,
+        }
+        # Write to a temporary file first, so the manifest is never
+        # left half written.
+        fd, tmpPath = tempfile.mkstemp(suffix=manifestFileSuffix,
+                                       dir=p.dirname(self.filePath))
+        f = os.fdopen(fd, 'w')
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.close()
+        if os.name == 'nt' and p.isfile(self.filePath):
+            os.remove(self.filePath)
+        os.rename(tmpPath, self.filePath)
+        return True
+
+    def setInputHash(self, inputHash):
+        """Set the hash of the Matchmover file, forgetting all entries
+        if the file has changed."""
+        if inputHash != self.inputHash:
+            self.cameras = None
+            self.entries = dict()
+        self.inputHash = inputHash
+        return True
+
+    def isFresh(self, cameraName, exportType, optionsHash):
+        """Are the files exported for a camera and export type
+        up to date? An entry without any files is never up to date."""
+        key = self.getEntryKey(cameraName, exportType)
+        entry = self.entries.get(key)
+        if entry == None:
+            return False
+        if entry.get('optionsHash') != optionsHash:
+            return False
+        imagePath = entry.get('imagePath')
+        if (imagePath != None and
+            entry.get('imagesHash') != hashImages(imagePath)):
+            return False
+        outputs = entry.get('outputs')
+        if not outputs:
+            return False
+        for outPath in outputs:
+            if not p.isfile(outPath):
+                return False
+        return True
+
+    def setEntry(self, cameraName, exportType, optionsHash, outputs,
+                 imagePath=None):
+        """Remember the files exported for a camera and export type.
+
+        outputs - The files written, as returned by the exporter.
+        imagePath - The image sequence the export depends on, or None.
+        """
+        key = self.getEntryKey(cameraName, exportType)
+        self.entries[key] = {
+            'optionsHash': optionsHash,
+            'outputs': list(outputs),
+            'imagePath': imagePath,
+            'imagesHash': hashImages(imagePath),
+        }
+        return True
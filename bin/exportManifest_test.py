@@ -0,0 +1,148 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import re
+import shutil
+import tempfile
+
+import commonDataObjects as cdo
+import exportManifest
+import mmDistortionConverter as mdc
+
+
+def getOutputs(manifest):
+    outPaths = list()
+    for entry in manifest.entries.values():
+        outPaths += entry['outputs']
+    return sorted(outPaths)
+
+
+def setOld(outPaths):
+    for outPath in outPaths:
+        os.utime(outPath, (1000, 1000))
+    return True
+
+
+def getNewOutputs(outPaths):
+    return [x for x in outPaths if p.getmtime(x) != 1000]
+
+
+def main(filePath):
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    inputFile = p.join(tmpDir, p.split(filePath)[1])
+    shutil.copy(filePath, inputFile)
+
+    options = mdc.ConverterOptions()
+    options.inputFile = inputFile
+    options.inputTime = '<all>'
+    options.outputDir = '<same>'
+    options.incremental = True
+    mdc.setExportFlags(options)
+    assert mdc.exportData(options) == True
+
+    manifestPath = exportManifest.getManifestPath(inputFile, '<same>')
+    assert p.isfile(manifestPath)
+    manifest = exportManifest.Manifest(manifestPath)
+    assert manifest.read() == True
+    assert manifest.inputHash == exportManifest.hashFile(inputFile)
+
+    # A manifest written for other exporter output is not used.
+    exportManifest.outputVersion += 1
+    try:
+        assert exportManifest.Manifest(manifestPath).read() == False
+    finally:
+        exportManifest.outputVersion -= 1
+    outPaths = getOutputs(manifest)
+    assert len(outPaths) >= 3*len(manifest.cameras)
+    for outPath in outPaths:
+        assert p.isfile(outPath)
+
+    # Nothing has changed, nothing is written.
+    setOld(outPaths)
+    assert mdc.exportData(options) == True
+    assert getNewOutputs(outPaths) == []
+
+    # Only a missing file is written again.
+    lensPath = [x for x in outPaths if cdo.exportDesc.tdeLens in x][0]
+    os.remove(lensPath)
+    assert mdc.exportData(options) == True
+    assert getNewOutputs(outPaths) == [lensPath]
+
+    # Changing the options writes everything again.
+    setOld(outPaths)
+    options.inputTime = '1-10'
+    assert mdc.exportData(options) == True
+    assert getNewOutputs(outPaths) == outPaths
+
+    # Changing the input file writes everything again.
+    setOld(outPaths)
+    f = open(inputFile, 'a')
+    f.write('\n')
+    f.close()
+    assert mdc.exportData(options) == True
+    assert getNewOutputs(outPaths) == outPaths
+
+    # A full export always writes everything.
+    setOld(outPaths)
+    options.incremental = False
+    assert mdc.exportData(options) == True
+    assert getNewOutputs(outPaths) == outPaths
+
+    # Only the files the exporters wrote are remembered, not other
+    # files with similar names.
+    desc = cdo.exportDesc.tdeRawText
+    otherPath = cdo.createOutFileName(inputFile, str(manifest.cameras[0]),
+                                      desc+'_old', 'txt', '<same>')
+    open(otherPath, 'w').close()
+    options.incremental = True
+    assert mdc.exportData(options) == True
+    manifest = exportManifest.Manifest(manifestPath)
+    assert manifest.read() == True
+    assert getOutputs(manifest) == outPaths
+
+    # An entry without any files is not up to date.
+    camName = manifest.cameras[0]
+    manifest.setEntry(camName, 'rawText', 'hash', list())
+    assert manifest.isFresh(camName, 'rawText', 'hash') == False
+    manifest.setEntry(camName, 'rawText', 'hash', outPaths[:1])
+    assert manifest.isFresh(camName, 'rawText', 'hash') == True
+
+    # Renumbering the image sequence writes the Nuke node again, the
+    # node's frame offset comes from the first image.
+    imagePath = p.join(tmpDir, 'plate.####.png')
+    for frame in [1, 2, 3]:
+        open(p.join(tmpDir, 'plate.%04d.png' % frame), 'w').close()
+    data = open(filePath, 'r').read()
+    data, count = re.subn(r'img="[^"]*"', 'img="%s"' % imagePath, data)
+    if count > 0:
+        inputFile = p.join(tmpDir, 'plate_'+p.split(filePath)[1])
+        open(inputFile, 'w').write(data)
+        options.inputFile = inputFile
+        options.inputTime = '<all>'
+        assert mdc.exportData(options) == True
+        manifestPath = exportManifest.getManifestPath(inputFile, '<same>')
+        manifest = exportManifest.Manifest(manifestPath)
+        assert manifest.read() == True
+        outPaths = getOutputs(manifest)
+        nukePaths = list()
+        for key, entry in manifest.entries.items():
+            if (key.endswith('|nukeDistNode') and
+                entry['imagePath'] == imagePath):
+                nukePaths += entry['outputs']
+        assert len(nukePaths) > 0
+        setOld(outPaths)
+        assert mdc.exportData(options) == True
+        assert getNewOutputs(outPaths) == []
+        os.rename(p.join(tmpDir, 'plate.0001.png'),
+                  p.join(tmpDir, 'plate.0000.png'))
+        assert mdc.exportData(options) == True
+        newPaths = getNewOutputs(outPaths)
+        for nukePath in nukePaths:
+            assert nukePath in newPaths
+    shutil.rmtree(tmpDir)
+    return True
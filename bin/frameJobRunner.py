@@ -0,0 +1,431 @@
+"""Runs the Warp4 or DistoIma command of every frame from a queue of jobs.
+
+The batch scripts split the frames into one script per CPU before
+anything runs, so a slow chunk keeps its CPU busy while the others
+sit idle, and a failed frame stops the rest of its chunk. Here every
+frame is a job taken from a single queue by a number of workers. Failed
+jobs are retried, the time of each frame is printed, and finished frames
+are written to a journal file so a run can be started again and only
+the frames that have not finished are run.
+
+The journal remembers each output image with a key made from the input
+image path and the lens parameters. A frame is run again if its key has
+changed, or if it was started but never finished. Frames not in the
+journal (for example, written by the batch scripts) are skipped if the
+output image is newer than the input image.
+
+Usage:
+    python2 frameJobRunner.py [options] <Matchmover file>
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import os.path as p
+import time
+import json
+import traceback
+import hashlib
+import threading
+import subprocess
+import optparse
+import Queue
+import multiprocessing as mp
+
+import commonDataObjects as cdo
+import converter
+import mmFileReader
+import tdeWriteWarpBatchScript
+import mmWriteDistoImaBatchScript
+
+warpSoftware = 'warp'
+distoSoftware = 'disto'
+softwares = [warpSoftware, distoSoftware]
+
+undistortAction = 'undistort'
+distortAction = 'distort'
+actions = [undistortAction, distortAction]
+
+# The action flags used by each software.
+softwareActions = {
+    warpSoftware: {undistortAction: 'remove_distortion',
+                   distortAction: 'apply_distortion'},
+    distoSoftware: {undistortAction: '-u',
+                    distortAction: '-d'},
+}
+
+
+class Options(object):
+    """Options that can be passed to the frame job runner."""
+    def __init__(self):
+        self.filePath = None
+        self.time = '<all>'
+        self.software = warpSoftware
+        self.action = undistortAction
+
+        # Number of commands run at once, None is one per CPU.
+        self.workers = None
+
+        # Number of times a failed command is run again.
+        self.retries = 2
+
+        # The file finished frames are written to, if None a file
+        # next to the Matchmover file is used.
+        self.journalPath = None
+
+        # Options passed to the Warp4 or DistoIma command writer.
+        self.useOverscan = 'none'
+
+
+class FrameJob(object):
+    """A single command to run, and the result of running it.
+
+    params - A dict of the lens parameters given to the command.
+    """
+    def __init__(self, frame=None, command=None,
+                 inPath=None, outPath=None, params=None):
+        self.frame = frame
+        self.command = command
+        self.inPath = inPath
+        self.outPath = outPath
+        self.params = params
+        self.key = getJobKey(inPath, params)
+
+        self.attempts = 0
+        self.seconds = 0.0
+        self.returnCode = None
+        self.success = False
+
+        # True if the job was finished by an earlier run.
+        self.skipped = False
+
+        # The output of the last attempt.
+        self.output = None
+
+
+def getJobKey(inPath, params):
+    """Get the key of a job, from the input image path and the
+    lens parameters, used to find it in the journal."""
+    if inPath != None:
+        inPath = p.abspath(inPath)
+    items = list()
+    if params != None:
+        items = sorted(params.items())
+    return hashlib.sha1(repr((inPath, items))).hexdigest()
+
+
+def isOutputNewer(inPath, outPath):
+    """Is the output image newer than the input image?"""
+    if outPath == None or not p.isfile(outPath):
+        return False
+    if inPath == None or not p.isfile(inPath):
+        return True
+    return p.getmtime(outPath) > p.getmtime(inPath)
+
+
+def getJournalPath(filePath, cameraName, software, action):
+    """Get the default journal file path for a Matchmover file."""
+    desc = '%s_%s_journal' % (software, action)
+    return cdo.createOutFileName(filePath, cameraName, desc,
+                                 'txt', '<same>')
+
+
+def readJournal(journalPath):
+    """Read the jobs started and finished in earlier runs.
+
+    Returns a dict mapping output image paths to a tuple of
+    (job key, finished), for the last entry of each output."""
+    entries = dict()
+    if journalPath == None or not p.isfile(journalPath):
+        return entries
+    f = open(journalPath, 'r')
+    try:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line may be half written, if a run was killed.
+                continue
+            if (isinstance(entry, dict) and entry.has_key('key') and
+                entry.has_key('outPath')):
+                entries[entry['outPath']] = (entry['key'],
+                                             entry.get('finished') == True)
+    finally:
+        f.close()
+    return entries
+
+
+def isJobFinished(job, entries):
+    """Was the job finished by an earlier run?
+
+    entries - The journal entries, as given by readJournal()."""
+    if not isOutputNewer(job.inPath, job.outPath):
+        return False
+    entry = entries.get(job.outPath)
+    if entry == None:
+        return True
+    key, finished = entry
+    return finished and key == job.key
+
+
+class Journal(object):
+    """Appends started and finished jobs to a journal file, one line
+    each, so that no job is lost if the run is stopped."""
+    def __init__(self, journalPath):
+        self.journalPath = journalPath
+        self.lock = threading.Lock()
+
+    def addJob(self, job, finished):
+        if self.journalPath == None or job.outPath == None:
+            return True
+        line = json.dumps({'key': job.key,
+                           'frame': job.frame,
+                           'inPath': job.inPath,
+                           'outPath': job.outPath,
+                           'finished': finished,
+                           'seconds': job.seconds})
+        self.lock.acquire()
+        try:
+            f = open(self.journalPath, 'a')
+            try:
+                f.write(line+'\n')
+                f.flush()
+            finally:
+                f.close()
+        finally:
+            self.lock.release()
+        return True
+
+
+def runJob(job, retries):
+    """Run the command of a job, running it again if it fails.
+
+    Returns True if the command was successful."""
+    startTime = time.time()
+    for attempt in range(max(retries, 0)+1):
+        job.attempts = job.attempts + 1
+        proc = subprocess.Popen(job.command, shell=True,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        job.output = proc.communicate()[0]
+        job.returnCode = proc.returncode
+        job.success = job.returnCode == 0
+        if job.success:
+            break
+    job.seconds = time.time()-startTime
+    return job.success
+
+
+def getWorkerCount(workers, numJobs):
+    """Get the number of workers to run numJobs with."""
+    if workers == None or workers <= 0:
+        workers = 1
+        try:
+            workers = mp.cpu_count()
+        except NotImplementedError:
+            pass
+    return max(min(int(workers), numJobs), 1)
+
+
+def printJob(job):
+    status = 'OK'
+    if job.skipped:
+        status = 'SKIPPED'
+    elif not job.success:
+        status = 'FAILED'
+    msg = 'Frame %s: %s (%.3f seconds, %d attempts)'
+    print(msg % (job.frame, status, job.seconds, job.attempts))
+    return True
+
+
+def runJobs(jobs, workers=None, retries=2, journalPath=None):
+    """Run a list of FrameJob objects, with a queue shared by the workers.
+
+    Jobs finished by an earlier run are not run again,
+    see isJobFinished().
+
+    Returns the list of jobs."""
+    entries = readJournal(journalPath)
+    journal = Journal(journalPath)
+    queue = Queue.Queue()
+    for job in jobs:
+        if isJobFinished(job, entries):
+            job.skipped = True
+            job.success = True
+            printJob(job)
+            continue
+        queue.put(job)
+
+    printLock = threading.Lock()
+    def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except Queue.Empty:
+                return
+            journal.addJob(job, False)
+            # An error in one job must not stop the worker, or the
+            # jobs left in the queue would never run.
+            try:
+                runJob(job, retries)
+            except Exception:
+                job.success = False
+                job.output = traceback.format_exc()
+            if job.success:
+                journal.addJob(job, True)
+            printLock.acquire()
+            try:
+                printJob(job)
+            finally:
+                printLock.release()
+
+    threads = list()
+    for i in range(getWorkerCount(workers, queue.qsize())):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return jobs
+
+
+def printSummary(jobs, seconds):
+    """Print the number of frames run, the slowest frames and failures."""
+    ran = [x for x in jobs if not x.skipped]
+    failed = [x for x in ran if not x.success]
+    numSkipped = len(jobs)-len(ran)
+    print('-----------------------')
+    print('Finished: %d, Failed: %d, Skipped: %d, Total: %d' %
+          (len(ran)-len(failed), len(failed), numSkipped, len(jobs)))
+    if len(ran) > 0:
+        frameSeconds = sum([x.seconds for x in ran])
+        print('Total Time: %.3f seconds (%.3f seconds/frame)' %
+              (seconds, frameSeconds/len(ran)))
+        slowest = sorted(ran, key=lambda x: x.seconds, reverse=True)
+        for job in slowest[:3]:
+            print('Slow Frame %s: %.3f seconds' % (job.frame, job.seconds))
+    for job in failed:
+        print('Failed Frame %s (return code %s): %s' %
+              (job.frame, job.returnCode, job.command))
+        if job.output:
+            print(job.output.rstrip())
+    return True
+
+
+def getCameraJobs(cam, options):
+    """Get the FrameJob objects of a Matchmover camera.
+
+    Returns a list of FrameJob objects."""
+    assert options.software in softwares
+    assert options.action in actions
+    action = softwareActions[options.software][options.action]
+    if options.software == warpSoftware:
+        writer = tdeWriteWarpBatchScript
+        writerCam = converter.convertCamera(cam, cdo.softwareType.tde)
+    else:
+        writer = mmWriteDistoImaBatchScript
+        writerCam = cam
+    # The writers do not change the camera, simplify its curve here.
+    writerCam.focalLength.simplifyData()
+    writerOptions = writer.Options()
+    writerOptions.filePath = options.filePath
+    writerOptions.time = options.time
+    writerOptions.useOverscan = options.useOverscan
+    jobs = list()
+    commands = writer.getFrameCommands(writerCam, writerOptions, action)
+    for frame, command, inPath, outPath, params in commands:
+        jobs.append(FrameJob(frame, command, inPath, outPath, params))
+    return jobs
+
+
+def main(options):
+    """Run the commands of every camera in options.filePath.
+
+    Returns a list of FrameJob objects."""
+    assert options.filePath != None
+    if not cdo.vaildInputFile(options.filePath):
+        msg = 'Incorrect file extension, must end with ".rzml", file path: %s.'
+        print(msg % repr(options.filePath))
+        return list()
+    readOptions = mmFileReader.Options()
+    readOptions.filePath = options.filePath
+    readOptions.time = options.time
+    projData = mmFileReader.readRZML(readOptions)
+
+    allJobs = list()
+    for cam in projData.cameras:
+        jobs = getCameraJobs(cam, options)
+        if len(jobs) == 0:
+            msg = "Warning: No frames to run for camera '%s'."
+            print(msg % cam.name)
+            continue
+        journalPath = options.journalPath
+        if journalPath == None:
+            journalPath = getJournalPath(options.filePath, cam.name,
+                                         options.software, options.action)
+        msg = "Running %d frames of camera '%s'."
+        print(msg % (len(jobs), cam.name))
+        startTime = time.time()
+        runJobs(jobs, workers=options.workers, retries=options.retries,
+                journalPath=journalPath)
+        printSummary(jobs, time.time()-startTime)
+        allJobs = allJobs + jobs
+    return allJobs
+
+
+def parseArguments(args):
+    """Parse the command line arguments into an Options object."""
+    usage = 'usage: %prog [options] <Matchmover file>'
+    parser = optparse.OptionParser(usage=usage, version=cdo.projectVersion)
+    defaults = Options()
+    parser.add_option('-s', '--software', dest='software',
+                      default=defaults.software,
+                      help='one of %s' % ', '.join(softwares))
+    parser.add_option('-a', '--action', dest='action',
+                      default=defaults.action,
+                      help='one of %s' % ', '.join(actions))
+    parser.add_option('-t', '--time', dest='time', default=defaults.time,
+                      help="frames to run, for example '1-36' or '2,34'")
+    parser.add_option('-j', '--workers', dest='workers', type='int',
+                      default=defaults.workers,
+                      help='number of commands run at once, '
+                           'default is one per CPU')
+    parser.add_option('-r', '--retries', dest='retries', type='int',
+                      default=defaults.retries,
+                      help='number of times a failed frame is run again')
+    parser.add_option('--journal', dest='journalPath', default=None,
+                      help='file to record finished frames in')
+    parser.add_option('--overscan', dest='useOverscan',
+                      default=defaults.useOverscan,
+                      help="overscan mode, 'none' or 'auto'")
+    opts, paths = parser.parse_args(args)
+    if len(paths) != 1:
+        parser.error('one Matchmover file must be given')
+    if opts.software not in softwares:
+        parser.error('unknown software %s' % repr(opts.software))
+    if opts.action not in actions:
+        parser.error('unknown action %s' % repr(opts.action))
+
+    options = Options()
+    options.filePath = paths[0]
+    options.software = opts.software
+    options.action = opts.action
+    options.time = opts.time
+    options.workers = opts.workers
+    options.retries = opts.retries
+    options.journalPath = opts.journalPath
+    options.useOverscan = opts.useOverscan
+    return options
+
+
+if __name__ == '__main__':
+    jobs = main(parseArguments(sys.argv[1:]))
+    failed = [x for x in jobs if not x.success]
+    if len(jobs) == 0 or len(failed) > 0:
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import os
+import os.path as p
+import time
+import tempfile
+
+import commonDataObjects as cdo
+import mmFileReader as mfr
+import frameJobRunner as fjr
+import test
+
+
+def getPythonCommand(code):
+    return '"%s" -c "%s"' % (sys.executable, code)
+
+
+def main(filePath):
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    journalPath = p.join(tmpDir, 'journal.txt')
+
+    # Every job is run, failed jobs are run again.
+    jobs = list()
+    for frame in range(5):
+        inPath = p.join(tmpDir, 'input.%d.txt' % frame)
+        open(inPath, 'w').write('input')
+        # Make sure the outputs are newer than the inputs.
+        os.utime(inPath, (time.time()-10, time.time()-10))
+        outPath = p.join(tmpDir, 'frame.%d.txt' % frame)
+        code = "open(r'%s', 'w').write('done')" % outPath
+        params = {'distortion': 0.1*frame}
+        jobs.append(fjr.FrameJob(frame, getPythonCommand(code),
+                                 inPath, outPath, params))
+    failJob = fjr.FrameJob(5, getPythonCommand('raise SystemExit(3)'))
+    jobs.append(failJob)
+    fjr.runJobs(jobs, workers=3, retries=2, journalPath=journalPath)
+    for job in jobs[:5]:
+        assert job.success == True
+        assert job.attempts == 1
+        assert p.isfile(job.outPath)
+    assert failJob.success == False
+    assert failJob.returnCode == 3
+    assert failJob.attempts == 3
+
+    # A job that fails the first time is successful when retried.
+    countPath = p.join(tmpDir, 'count.txt')
+    code = ("import os; c = os.path.isfile(r'%s'); "
+            "open(r'%s', 'w').write('1'); "
+            "raise SystemExit(0 if c else 1)") % (countPath, countPath)
+    retryJob = fjr.FrameJob(6, getPythonCommand(code))
+    fjr.runJobs([retryJob], workers=1, retries=1)
+    assert retryJob.success == True
+    assert retryJob.attempts == 2
+
+    # A job that raises an error fails, the other jobs still run.
+    badJob = fjr.FrameJob(8, None)
+    goodJob = fjr.FrameJob(9, getPythonCommand('pass'))
+    fjr.runJobs([badJob, goodJob], workers=1, retries=0)
+    assert badJob.success == False
+    assert badJob.output != None
+    assert goodJob.success == True
+
+    # Running again only runs the jobs not finished before.
+    entries = fjr.readJournal(journalPath)
+    assert len(entries) == 5
+    for job in jobs[:5]:
+        assert entries[job.outPath] == (job.key, True)
+    def copyJobs(jobs):
+        return [fjr.FrameJob(x.frame, x.command, x.inPath, x.outPath,
+                             x.params) for x in jobs]
+    jobs = copyJobs(jobs)
+    fjr.runJobs(jobs, workers=2, retries=0, journalPath=journalPath)
+    assert [x.skipped for x in jobs] == [True]*5+[False]
+    assert jobs[5].attempts == 1
+
+    # A finished job is run again if its output file is removed,
+    # its input image is changed, or its lens parameters are changed.
+    jobs = copyJobs(jobs[:3])
+    os.remove(jobs[0].outPath)
+    os.utime(jobs[1].inPath, (time.time()+10, time.time()+10))
+    jobs[2] = fjr.FrameJob(2, jobs[2].command, jobs[2].inPath,
+                           jobs[2].outPath, {'distortion': -1.0})
+    fjr.runJobs(jobs, workers=1, journalPath=journalPath)
+    for job in jobs:
+        assert job.skipped == False
+        assert job.success == True
+
+    # A job that was started but never finished is run again, jobs
+    # missing from the journal are skipped if the output is newer.
+    journal = fjr.Journal(journalPath)
+    jobs = copyJobs(jobs)
+    journal.addJob(jobs[0], False)
+    externalPath = p.join(tmpDir, 'external.txt')
+    open(externalPath, 'w').write('done')
+    otherJob = fjr.FrameJob(7, 'exit 1', jobs[0].inPath, externalPath)
+    fjr.runJobs(jobs[:1]+[otherJob], workers=1, journalPath=journalPath)
+    assert jobs[0].skipped == False
+    assert otherJob.skipped == True
+
+    # One job per selected frame of the image sequence.
+    imgSeq = test.getAllTestImageSequences()[0]
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    projData = mfr.readRZML(readOptions)
+    for cam in projData.cameras:
+        if len(cam.sequences) == 0:
+            continue
+        cam.sequences[0].imagePath = imgSeq
+        for software in fjr.softwares:
+            for action in fjr.actions:
+                options = fjr.Options()
+                options.filePath = filePath
+                options.software = software
+                options.action = action
+                options.time = '0-1'
+                cameraJobs = fjr.getCameraJobs(cam, options)
+                assert [x.frame for x in cameraJobs] == [0, 1]
+                for job in cameraJobs:
+                    assert job.outPath.find(action) != -1
+                    assert p.isfile(job.inPath)
+                    assert job.params['action'] == (
+                        fjr.softwareActions[software][action])
+    return True
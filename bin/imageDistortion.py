@@ -0,0 +1,738 @@
+"""Distorts and undistorts images, without any external programs.
+
+Applies the Matchmover lens model (see
+'docs/matchmoverDistortionExpression.txt') and the 3DE Classic lens
+model to images held in memory, using NumPy to calculate every pixel
+at once. This replaces running Warp4 or DistoIma once per frame.
+
+Images are read and written with the functions registered for each
+file extension, PNG is always supported and other formats are
+supported when Pillow is installed.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import math
+import struct
+import zlib
+
+import commonDataObjects as cdo
+import stMapCache
+
+# NumPy is required to warp images, the rest of the tool works without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Pillow is optional, it adds support for more image formats.
+try:
+    from PIL import Image as pilImage
+except ImportError:
+    pilImage = None
+
+removeDistortionAction = 'remove_distortion'
+applyDistortionAction = 'apply_distortion'
+
+# Methods to solve the Matchmover distorted radius with.
+mmCubicMethod = 'cubic'
+mmNewtonMethod = 'newton'
+
+# Newton steps are taken for each pixel until a step moves the radius
+# less than mmNewtonTolerance pixels. Close to the point where a lens
+# folds the image over itself the steps only halve the error, so up to
+# mmNewtonIterations steps are taken.
+mmNewtonTolerance = 1e-9
+mmNewtonIterations = 100
+
+pngSignature = '\x89PNG\r\n\x1a\n'
+
+# Number of channels for each PNG color type.
+pngColorTypeChannels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def requireNumpy():
+    """Raises an ImportError if NumPy is not available."""
+    if np == None:
+        msg = 'NumPy is required to distort and undistort images.'
+        raise ImportError(msg)
+    return True
+
+
+def unfilterPngRows(filtered, filterTypes):
+    """Reverse the PNG filter of each row of pixels.
+
+    filtered - An array of (height, width, bytesPerPixel) filtered bytes.
+    filterTypes - An array with the filter type of each row.
+
+    Every filter only depends on the pixels to the left and above, so
+    all pixels on the same diagonal are reconstructed at once.
+
+    Returns an array of (height, width, bytesPerPixel) bytes."""
+    height, width, bpp = filtered.shape
+    filtered = filtered.astype(np.int16)
+    filterTypes = np.asarray(filterTypes, dtype=np.int16)
+
+    # The reconstructed image, with a row and column of zeros
+    # before the first row and column.
+    recon = np.zeros((height+1, width+1, bpp), dtype=np.int16)
+    for diag in range(width+height-1):
+        startRow = max(0, diag-width+1)
+        endRow = min(height-1, diag)
+        rows = np.arange(startRow, endRow+1)
+        cols = diag-rows
+        a = recon[rows+1, cols]
+        b = recon[rows, cols+1]
+        c = recon[rows, cols]
+        ftype = filterTypes[rows][:, np.newaxis]
+
+        paethA = np.abs(b-c)
+        paethB = np.abs(a-c)
+        paethC = np.abs(a+b-c-c)
+        paeth = np.where((paethA <= paethB) & (paethA <= paethC), a,
+                         np.where(paethB <= paethC, b, c))
+
+        predict = np.zeros_like(a)
+        predict = np.where(ftype == 1, a, predict)
+        predict = np.where(ftype == 2, b, predict)
+        predict = np.where(ftype == 3, (a+b)//2, predict)
+        predict = np.where(ftype == 4, paeth, predict)
+        recon[rows+1, cols+1] = (filtered[rows, cols]+predict) & 0xff
+    return recon[1:, 1:, :].astype(np.uint8)
+
+
+def readPngImage(filePath):
+    """Read a PNG image file.
+
+    Supports 8 and 16 bit grey, grey-alpha, RGB, RGBA and
+    palette images, that are not interlaced.
+
+    Returns an array of (height, width, channels),
+    with the type uint8 or uint16."""
+    requireNumpy()
+    f = open(filePath, 'rb')
+    data = f.read()
+    f.close()
+    if data[:8] != pngSignature:
+        raise ValueError('Not a PNG file, %s' % repr(filePath))
+
+    header = None
+    palette = None
+    idat = list()
+    pos = 8
+    while pos < len(data):
+        length, = struct.unpack('>I', data[pos:pos+4])
+        tag = data[pos+4:pos+8]
+        chunk = data[pos+8:pos+8+length]
+        if tag == 'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif tag == 'PLTE':
+            palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+        elif tag == 'IDAT':
+            idat.append(chunk)
+        elif tag == 'IEND':
+            break
+        pos = pos+12+length
+    assert header != None
+
+    width, height, bitDepth, colorType, comp, filt, interlace = header
+    if colorType not in pngColorTypeChannels:
+        raise ValueError('Unknown PNG color type, %s' % repr(colorType))
+    if bitDepth not in [8, 16] or (colorType == 3 and bitDepth != 8):
+        msg = 'PNG bit depth is not supported, %s'
+        raise ValueError(msg % repr(bitDepth))
+    if interlace != 0:
+        raise ValueError('Interlaced PNG files are not supported.')
+    channels = pngColorTypeChannels[colorType]
+    bpp = channels*(bitDepth//8)
+
+    raw = zlib.decompress(''.join(idat))
+    raw = np.frombuffer(raw, dtype=np.uint8).reshape(height, width*bpp+1)
+    filterTypes = raw[:, 0]
+    filtered = raw[:, 1:].reshape(height, width, bpp)
+    image = unfilterPngRows(filtered, filterTypes)
+
+    if bitDepth == 16:
+        image = np.ascontiguousarray(image).view('>u2')
+        image = image.reshape(height, width, channels).astype(np.uint16)
+    if colorType == 3:
+        assert palette != None
+        image = palette[image[:, :, 0]]
+    return image
+
+
+def writePngImage(filePath, image):
+    """Write an image array to a PNG image file.
+
+    image - An array of (height, width) or (height, width, channels)
+    values, with the type uint8 or uint16.
+    """
+    requireNumpy()
+    image = np.asarray(image)
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width, channels = image.shape
+    colorTypes = {1: 0, 2: 4, 3: 2, 4: 6}
+    if channels not in colorTypes:
+        raise ValueError('Cannot write %d channels to PNG.' % channels)
+    if image.dtype == np.uint8:
+        bitDepth = 8
+    elif image.dtype == np.uint16:
+        bitDepth = 16
+        image = image.astype('>u2')
+    else:
+        raise ValueError('Cannot write %s to PNG.' % repr(image.dtype))
+
+    rows = np.ascontiguousarray(image).view(np.uint8).reshape(height, -1)
+    raw = np.zeros((height, rows.shape[1]+1), dtype=np.uint8)
+    raw[:, 1:] = rows
+
+    def chunk(tag, data):
+        crc = zlib.crc32(tag+data) & 0xffffffff
+        return struct.pack('>I', len(data))+tag+data+struct.pack('>I', crc)
+
+    header = struct.pack('>IIBBBBB', width, height, bitDepth,
+                         colorTypes[channels], 0, 0, 0)
+    f = open(filePath, 'wb')
+    f.write(pngSignature)
+    f.write(chunk('IHDR', header))
+    f.write(chunk('IDAT', zlib.compress(raw.tobytes(), 6)))
+    f.write(chunk('IEND', ''))
+    f.close()
+    return True
+
+
+def readPillowImage(filePath):
+    """Read an image file with Pillow, as a (height, width, channels) array."""
+    requireNumpy()
+    image = np.asarray(pilImage.open(filePath))
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    return image
+
+
+def writePillowImage(filePath, image):
+    """Write an image array to an image file with Pillow."""
+    requireNumpy()
+    image = np.asarray(image)
+    if image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
+    pilImage.fromarray(image).save(filePath)
+    return True
+
+
+# Functions used to read and write images, for each file extension.
+imageReaders = dict()
+imageWriters = dict()
+
+
+def registerImageReader(ext, func):
+    """Use func(filePath) to read images with the file extension ext."""
+    imageReaders[ext.lower().lstrip('.')] = func
+    return True
+
+
+def registerImageWriter(ext, func):
+    """Use func(filePath, image) to write images with the file extension ext."""
+    imageWriters[ext.lower().lstrip('.')] = func
+    return True
+
+
+registerImageReader('png', readPngImage)
+registerImageWriter('png', writePngImage)
+if pilImage != None:
+    for pilExt in ['jpg', 'jpeg', 'tif', 'tiff', 'bmp']:
+        registerImageReader(pilExt, readPillowImage)
+        registerImageWriter(pilExt, writePillowImage)
+
+
+def getImageExt(filePath):
+    return p.splitext(filePath)[1].lower().lstrip('.')
+
+
+def readImage(filePath):
+    """Read an image file, as a (height, width, channels) array."""
+    ext = getImageExt(filePath)
+    if ext not in imageReaders:
+        msg = 'No image reader for the file extension %s, %s'
+        raise ValueError(msg % (repr(ext), repr(filePath)))
+    return imageReaders[ext](filePath)
+
+
+def writeImage(filePath, image):
+    """Write a (height, width, channels) array to an image file."""
+    ext = getImageExt(filePath)
+    if ext not in imageWriters:
+        msg = 'No image writer for the file extension %s, %s'
+        raise ValueError(msg % (repr(ext), repr(filePath)))
+    return imageWriters[ext](filePath, image)
+
+
+def mmRemoveDistortion(x, y, width, height,
+                       distortion, focal, alpha,
+                       lensCentreX=0.5, lensCentreY=0.5):
+    """Move distorted pixel positions to undistorted positions,
+    using the Matchmover lens model.
+
+    x, y - Pixel positions, floats or arrays.
+    width, height - Image Width/Height.
+    distortion - The Matchmover distortion value.
+    focal - The focal, (focalLength*width)/filmbackWidth.
+    alpha - The pixel aspect ratio.
+    lensCentreX, lensCentreY - The lens centre, from 0.0 to 1.0.
+
+    Returns a tuple of the undistorted (x, y) positions."""
+    k = distortion/(focal*focal)
+    ppx = width*lensCentreX
+    ppy = height*lensCentreY
+    xc = x-ppx
+    yc = y-ppy
+    rr = xc*xc+(yc*yc)/(alpha*alpha)
+    newr = 1.0+k*rr
+    return (xc*newr+ppx, yc*newr+ppy)
+
+
+def mmApplyDistortionPixel(x, y, width, height,
+                           distortion, focal, alpha,
+                           lensCentreX=0.5, lensCentreY=0.5):
+    """Move an undistorted pixel position to the distorted position,
+    using the Matchmover lens model.
+
+    This is the 'Undistortion Expression' in
+    'docs/matchmoverDistortionExpression.txt', calculated for a single
+    pixel, and is kept as the reference for mmApplyDistortion().
+
+    Returns a tuple of the distorted (x, y) position."""
+    ppx = width*lensCentreX
+    ppy = height*lensCentreY
+    xc = x-ppx
+    yc = y-ppy
+    Ru = math.sqrt((xc*xc)+(yc*yc)/(alpha*alpha))
+    if Ru == 0.0 or distortion == 0.0:
+        return (x, y)
+    k = distortion/(focal*focal)
+    c = 1.0/k
+    d = (-c)*Ru
+    Q = c/3.0
+    R = (-d)/2.0
+    D = (Q*Q*Q)+(R*R)
+    if D >= 0.0:
+        D = math.sqrt(D)
+        if (R+D) < 0.0:
+            S = -((-R-D)**(1.0/3.0))
+        else:
+            S = (R+D)**(1.0/3.0)
+        if R < D:
+            T = -((D-R)**(1.0/3.0))
+        else:
+            T = (R-D)**(1.0/3.0)
+        Rd = S+T
+    else:
+        D = math.sqrt(-D)
+        S = math.sqrt((R*R)+(D*D))**(1.0/3.0)
+        T = math.atan2(D, R)/3.0
+        Rd = (-S*math.cos(T))+(math.sqrt(3.0)*S*math.sin(T))
+    lam = Rd/Ru
+    return (xc*lam+ppx, yc*lam+ppy)
+
+
+def mmDistortedRadiusCubic(Ru, k):
+    """Solve k*Rd^3 + Rd - Ru = 0 for the distorted radius Rd,
+    with the closed-form cubic root, for every element at once.
+
+    Ru - An array of undistorted radii.
+    k - The Matchmover distortion divided by the focal squared, not zero.
+
+    Returns an array of distorted radii."""
+    requireNumpy()
+    c = 1.0/k
+    Q = c/3.0
+    R = (c*Ru)/2.0
+    D = (Q*Q*Q)+(R*R)
+
+    # One real root.
+    Dp = np.sqrt(np.maximum(D, 0.0))
+    Rd = np.cbrt(R+Dp)+np.cbrt(R-Dp)
+
+    # Three real roots, only with barrel distortion (k < 0.0).
+    negative = D < 0.0
+    if negative.any():
+        Rn = R[negative]
+        Dn = np.sqrt(-D[negative])
+        S = np.cbrt(np.sqrt((Rn*Rn)+(Dn*Dn)))
+        T = np.arctan2(Dn, Rn)/3.0
+        Rd[negative] = (-S*np.cos(T))+(math.sqrt(3.0)*S*np.sin(T))
+    return Rd
+
+
+def mmDistortedRadiusNewton(Ru, k, tolerance=mmNewtonTolerance,
+                            iterations=mmNewtonIterations):
+    """Solve k*Rd^3 + Rd - Ru = 0 for the distorted radius Rd,
+    with Newton steps, for every element at once.
+
+    Starting from Ru the steps converge without overshooting the root.
+    Each element stops once a step is smaller than tolerance, or after
+    the given number of iterations.
+    With barrel distortion (k < 0.0) radii past the point where the lens
+    folds the image over itself have no root, and are kept at that point.
+
+    Ru - An array of undistorted radii.
+    k - The Matchmover distortion divided by the focal squared.
+
+    Returns an array of distorted radii."""
+    requireNumpy()
+    Ru = np.asarray(Ru, dtype=np.float64)
+    if k < 0.0:
+        maxRd = math.sqrt(-1.0/(3.0*k))
+        Ru = np.minimum(Ru, (2.0/3.0)*maxRd)
+    shape = Ru.shape
+    Ru = Ru.ravel()
+    Rd = Ru.copy()
+
+    # Only step the radii that have not converged yet.
+    index = np.arange(Ru.size)
+    for i in range(iterations):
+        r = Rd[index]
+        rr = r*r
+        step = ((k*rr*r)+r-Ru[index])/((3.0*k*rr)+1.0)
+        Rd[index] = r-step
+        index = index[np.abs(step) >= tolerance]
+        if index.size == 0:
+            break
+    return Rd.reshape(shape)
+
+
+def mmApplyDistortion(x, y, width, height,
+                      distortion, focal, alpha,
+                      lensCentreX=0.5, lensCentreY=0.5,
+                      method=mmNewtonMethod):
+    """Move undistorted pixel positions to distorted positions,
+    using the Matchmover lens model, the inverse of mmRemoveDistortion().
+
+    The Matchmover model scales each position by newr = 1 + k*rr, so the
+    distorted radius is the root of a cubic, solved for every pixel at
+    once, see mmDistortedRadiusCubic() and mmDistortedRadiusNewton().
+
+    x, y - Pixel positions, arrays.
+    method - mmNewtonMethod or mmCubicMethod.
+
+    Returns a tuple of the distorted (x, y) positions."""
+    requireNumpy()
+    ppx = width*lensCentreX
+    ppy = height*lensCentreY
+    xc = np.asarray(x, dtype=np.float64)-ppx
+    yc = np.asarray(y, dtype=np.float64)-ppy
+    if distortion == 0.0:
+        return (xc+ppx, yc+ppy)
+    k = distortion/(focal*focal)
+    Ru = np.sqrt((xc*xc)+(yc*yc)/(alpha*alpha))
+    if method == mmCubicMethod:
+        Rd = mmDistortedRadiusCubic(Ru, k)
+    elif method == mmNewtonMethod:
+        Rd = mmDistortedRadiusNewton(Ru, k)
+    else:
+        raise ValueError('Unknown solve method, %s' % repr(method))
+
+    # The centre of the lens does not move.
+    lam = np.ones_like(Ru)
+    moved = Ru > 0.0
+    lam[moved] = Rd[moved]/Ru[moved]
+    return (xc*lam+ppx, yc*lam+ppy)
+
+
+def tdeRemoveDistortion(x, y, width, height,
+                        distortion, filmbackWidth, filmbackHeight,
+                        lensCentreX=0.0, lensCentreY=0.0,
+                        squeeze=1.0, curvatureX=0.0, curvatureY=0.0,
+                        quarticDistortion=0.0):
+    """Move distorted pixel positions to undistorted positions,
+    using the 3DE Classic lens model.
+
+    x, y - Pixel positions, floats or arrays.
+    width, height - Image Width/Height.
+    distortion - The 3DE distortion value.
+    filmbackWidth, filmbackHeight - Filmback Width/Height, in cm.
+    lensCentreX, lensCentreY - Lens centre offset, in cm.
+    squeeze, curvatureX, curvatureY, quarticDistortion - The other
+    parameters of the 3DE Classic model.
+
+    Returns a tuple of the undistorted (x, y) positions."""
+    # Pixels to normalised filmback coordinates.
+    rfb = ((filmbackWidth*filmbackWidth)+
+           (filmbackHeight*filmbackHeight))**0.5/2.0
+    px = ((((x/float(width))-0.5)*filmbackWidth)-lensCentreX)/rfb
+    py = ((((y/float(height))-0.5)*filmbackHeight)-lensCentreY)/rfb
+
+    ld = distortion
+    sq = squeeze
+    qd = quarticDistortion
+    cxx = ld/sq
+    cxy = (ld+curvatureX)/sq
+    cyx = ld+curvatureY
+    cyy = ld
+    cxxx = qd/sq
+    cxxy = 2.0*qd/sq
+    cxyy = qd/sq
+    cyxx = qd
+    cyyx = 2.0*qd
+    cyyy = qd
+
+    px2 = px*px
+    py2 = py*py
+    qx = px*(1.0+(cxx*px2)+(cxy*py2)+
+             (cxxx*px2*px2)+(cxxy*px2*py2)+(cxyy*py2*py2))
+    qy = py*(1.0+(cyx*px2)+(cyy*py2)+
+             (cyxx*px2*px2)+(cyyx*px2*py2)+(cyyy*py2*py2))
+
+    # Back to pixels.
+    outX = ((((qx*rfb)+lensCentreX)/filmbackWidth)+0.5)*width
+    outY = ((((qy*rfb)+lensCentreY)/filmbackHeight)+0.5)*height
+    return (outX, outY)
+
+
+# The function to remove distortion for each lens model.
+removeDistortionFuncs = {
+    cdo.softwareType.mm: mmRemoveDistortion,
+    cdo.softwareType.tde: tdeRemoveDistortion,
+}
+
+
+# Lens models with a function to apply distortion directly, others
+# are inverted with invertDistortion().
+applyDistortionFuncs = {
+    cdo.softwareType.mm: mmApplyDistortion,
+}
+
+
+def invertDistortion(func, x, y, iterations=20):
+    """Find the positions that func moves onto x and y.
+
+    Uses fixed point iteration, which converges for any lens
+    distortion that does not fold the image over itself.
+
+    func - A function taking and returning (x, y) positions.
+
+    Returns a tuple of (x, y) positions."""
+    srcX = x
+    srcY = y
+    for i in range(iterations):
+        outX, outY = func(srcX, srcY)
+        srcX = srcX+(x-outX)
+        srcY = srcY+(y-outY)
+    return (srcX, srcY)
+
+
+def applyDistortion(model, x, y, width, height, params):
+    """Move undistorted pixel positions to distorted positions.
+
+    model - The lens model, a cdo.softwareType value.
+    params - A dict of keyword arguments for the lens model.
+
+    Returns a tuple of the distorted (x, y) positions."""
+    if model in applyDistortionFuncs:
+        func = applyDistortionFuncs[model]
+        return func(x, y, width, height, **params)
+    func = removeDistortionFuncs[model]
+    def removeFunc(srcX, srcY):
+        return func(srcX, srcY, width, height, **params)
+    return invertDistortion(removeFunc, x, y)
+
+
+def removeDistortion(model, x, y, width, height, params):
+    """Move distorted pixel positions to undistorted positions.
+
+    model - The lens model, a cdo.softwareType value.
+    params - A dict of keyword arguments for the lens model.
+
+    Returns a tuple of the undistorted (x, y) positions."""
+    func = removeDistortionFuncs[model]
+    return func(x, y, width, height, **params)
+
+
+def getWarpMap(model, action, width, height, params):
+    """Get the position to read each pixel of the output image from.
+
+    model - The lens model, a cdo.softwareType value.
+    action - removeDistortionAction or applyDistortionAction.
+    params - A dict of keyword arguments for the lens model.
+
+    Returns a tuple of two (height, width) arrays, the x and y positions."""
+    requireNumpy()
+    y, x = np.mgrid[0:height, 0:width].astype(np.float64)
+    if action == removeDistortionAction:
+        # Each undistorted pixel comes from a distorted position.
+        return applyDistortion(model, x, y, width, height, params)
+    elif action == applyDistortionAction:
+        # Each distorted pixel comes from an undistorted position.
+        return removeDistortion(model, x, y, width, height, params)
+    raise ValueError('Unknown distortion action, %s' % repr(action))
+
+
+def getCachedWarpMap(model, action, width, height, params, cache=None):
+    """Get the warp map from the cache, calculating it only if the
+    cache does not have it yet, see getWarpMap().
+
+    cache - A stMapCache.StMapCache object, if None the map is
+    always calculated.
+    """
+    if cache == None:
+        return getWarpMap(model, action, width, height, params)
+    key = stMapCache.getCacheKey(model, action, width, height, params)
+    def func():
+        return getWarpMap(model, action, width, height, params)
+    return cache.getMaps(key, func)
+
+
+def remapImage(image, srcX, srcY):
+    """Create a new image, reading each pixel from the positions given,
+    with bilinear filtering. Positions outside the image are black.
+
+    image - An array of (height, width, channels).
+    srcX, srcY - Arrays of (outHeight, outWidth) positions.
+
+    Returns an array of (outHeight, outWidth, channels),
+    the same type as image."""
+    requireNumpy()
+    image = np.asarray(image)
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width = image.shape[:2]
+
+    x0 = np.floor(srcX)
+    y0 = np.floor(srcY)
+    fx = (srcX-x0)[:, :, np.newaxis]
+    fy = (srcY-y0)[:, :, np.newaxis]
+    x0 = x0.astype(np.intp)
+    y0 = y0.astype(np.intp)
+    x1 = np.clip(x0+1, 0, width-1)
+    y1 = np.clip(y0+1, 0, height-1)
+    x0 = np.clip(x0, 0, width-1)
+    y0 = np.clip(y0, 0, height-1)
+
+    values = image.astype(np.float32)
+    top = values[y0, x0]*(1.0-fx)+values[y0, x1]*fx
+    bottom = values[y1, x0]*(1.0-fx)+values[y1, x1]*fx
+    out = top*(1.0-fy)+bottom*fy
+
+    outside = ((srcX < 0.0) | (srcX > (width-1)) |
+               (srcY < 0.0) | (srcY > (height-1)))
+    out[outside] = 0.0
+
+    if np.issubdtype(image.dtype, np.integer):
+        info = np.iinfo(image.dtype)
+        out = np.clip(np.round(out), info.min, info.max)
+    return out.astype(image.dtype)
+
+
+def warpImage(image, model, action, params, cache=None):
+    """Distort or undistort an image array.
+
+    model - The lens model, a cdo.softwareType value.
+    action - removeDistortionAction or applyDistortionAction.
+    params - A dict of keyword arguments for the lens model,
+    see getLensParameters().
+    cache - An optional stMapCache.StMapCache object.
+
+    Returns the new image array."""
+    height, width = image.shape[:2]
+    srcX, srcY = getCachedWarpMap(model, action, width, height,
+                                  params, cache=cache)
+    return remapImage(image, srcX, srcY)
+
+
+def getLensParameters(cam, frame):
+    """Get the lens model and parameters of a camera at a frame.
+
+    cam - A MMCameraData or TDECameraData object.
+
+    Returns a tuple of the lens model and a dict of the parameters."""
+    model = cam._software
+    params = dict()
+    if model == cdo.softwareType.mm:
+        params['distortion'] = cam.distortion.getValue(frame)
+        params['focal'] = cam.focal.getValue(frame)
+        params['alpha'] = cam.pixelAspectRatio
+        params['lensCentreX'] = cam.lensCentreX
+        params['lensCentreY'] = cam.lensCentreY
+    elif model == cdo.softwareType.tde:
+        params['distortion'] = cam.distortion.getValue(frame)
+        params['filmbackWidth'] = cam.filmbackWidth
+        params['filmbackHeight'] = cam.filmbackHeight
+        params['lensCentreX'] = cam.lensCentreX
+        params['lensCentreY'] = cam.lensCentreY
+    else:
+        msg = 'Cannot get lens parameters for camera type %s.'
+        raise ValueError(msg % repr(model))
+    return (model, params)
+
+
+class Options(object):
+    """Options that can be passed to the image distortion engine."""
+    def __init__(self):
+        self.time = None
+        self.action = removeDistortionAction
+
+        # appended to the image path output, before '(un)distort'.
+        self.fileSuffix = '_native'
+
+        # output image extension, if None use input image extension.
+        self.outImageExt = None
+
+        # directory to keep warp maps in, between runs.
+        # if None, warp maps are only kept in memory.
+        self.cacheDir = None
+
+
+def main(cam, options):
+    """Distort or undistort the image sequence of a camera.
+
+    cam - A MMCameraData (Matchmover lens model) or
+    TDECameraData (3DE Classic lens model) object.
+
+    Returns a list of the image files written."""
+    requireNumpy()
+    timeList = cdo.parseTimeString(options.time)
+    outPaths = list()
+
+    seq = cdo.SequenceData()
+    if len(cam.sequences) > 0:
+        seq = cam.sequences[0]
+
+    invalidImageMsg = ("Images could not be warped, "
+                       "image path given is invalid, '%s'.")
+    if seq.imagePath == None:
+        print(invalidImageMsg % seq.imagePath)
+        return outPaths
+    images = cdo.getAllImageSequence(seq.imagePath)
+    if len(images) <= 0:
+        print(invalidImageMsg % seq.imagePath)
+        return outPaths
+    seqPad = cdo.getImageSequencePadding(seq.imagePath)
+    seqStart, seqEnd = cdo.splitImageSequencePath(seq.imagePath)
+
+    suffix = options.fileSuffix+'_undistort'
+    if options.action == applyDistortionAction:
+        suffix = options.fileSuffix+'_distort'
+
+    # Frames with the same lens parameters share a warp map.
+    cache = stMapCache.StMapCache(cacheDir=options.cacheDir)
+    for imgPath in images:
+        frameNum = cdo.getImagePathFrameNumber(seq.imagePath, imgPath)
+        if not cdo.isFrameInTimeList(frameNum, timeList):
+            continue
+        outImgPath = cdo.getOutputImagePath(seqStart, seqEnd,
+                                            suffix, frameNum, seqPad,
+                                            ext=options.outImageExt)
+        msg = "Writing image '%s'."
+        print(msg % p.split(outImgPath)[1])
+
+        model, params = getLensParameters(cam, frameNum)
+        image = readImage(imgPath)
+        image = warpImage(image, model, options.action, params, cache=cache)
+        writeImage(outImgPath, image)
+        outPaths.append(outImgPath)
+    return outPaths
@@ -0,0 +1,132 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import tempfile
+
+import commonDataObjects as cdo
+import mmFileReader as mfr
+import converter
+import imageDistortion as idi
+
+
+def testImage(width, height, dtype):
+    """Create a small image with a gradient and a grid in it."""
+    y, x = idi.np.mgrid[0:height, 0:width]
+    image = idi.np.zeros((height, width, 3), dtype=dtype)
+    maxValue = idi.np.iinfo(dtype).max
+    image[:, :, 0] = (x*maxValue)//max(width-1, 1)
+    image[:, :, 1] = (y*maxValue)//max(height-1, 1)
+    image[:, :, 2] = ((x//4+y//4) % 2)*maxValue
+    return image
+
+
+def main(filePath):
+    if idi.np == None:
+        print('Skipping image distortion tests, NumPy is not available.')
+        return True
+    np = idi.np
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+
+    # Test PNG reading and writing, 8 and 16 bit.
+    for dtype in [np.uint8, np.uint16]:
+        image = testImage(33, 17, dtype)
+        pngPath = p.join(tmpDir, 'test.png')
+        idi.writeImage(pngPath, image)
+        readImage = idi.readImage(pngPath)
+        assert readImage.dtype == dtype
+        assert (readImage == image).all()
+        idi.writePngImage(pngPath, image[:, :, 0])
+        assert (idi.readPngImage(pngPath)[:, :, 0] == image[:, :, 0]).all()
+
+    # Test unknown image formats.
+    try:
+        idi.readImage(p.join(tmpDir, 'test.unknown'))
+        assert False
+    except ValueError:
+        pass
+
+    # Test remapping onto the same positions gives the same image.
+    image = testImage(16, 9, np.uint8)
+    y, x = np.mgrid[0:9, 0:16].astype(np.float64)
+    assert (idi.remapImage(image, x, y) == image).all()
+    outImage = idi.remapImage(image, x-100.0, y)
+    assert (outImage == 0).all()
+
+    # Test the vectorized Matchmover solvers agree with the
+    # per-pixel expression, for barrel and pincushion distortion.
+    y, x = np.mgrid[0:360:7, 0:640:7].astype(np.float64)
+    for distortion in [-0.2, -0.05, 0.0, 0.1, 0.5]:
+        params = {'distortion': distortion, 'focal': 800.0, 'alpha': 1.5}
+        refX = np.zeros(x.shape)
+        refY = np.zeros(y.shape)
+        for index in np.ndindex(x.shape):
+            refX[index], refY[index] = idi.mmApplyDistortionPixel(
+                x[index], y[index], 640, 360, **params)
+        for method in [idi.mmCubicMethod, idi.mmNewtonMethod]:
+            dx, dy = idi.mmApplyDistortion(x, y, 640, 360,
+                                           method=method, **params)
+            assert np.abs(dx-refX).max() < 1e-6
+            assert np.abs(dy-refY).max() < 1e-6
+            ux, uy = idi.mmRemoveDistortion(dx, dy, 640, 360, **params)
+            assert np.abs(ux-x).max() < 1e-6
+            assert np.abs(uy-y).max() < 1e-6
+
+    # Strong barrel distortion, where the image corners are close to
+    # the point the lens folds the image over itself.
+    params = {'distortion': -0.8117, 'focal': 800.0, 'alpha': 1.5}
+    y, x = np.mgrid[0:361:8, 0:641:8].astype(np.float64)
+    refX = np.zeros(x.shape)
+    refY = np.zeros(y.shape)
+    for index in np.ndindex(x.shape):
+        refX[index], refY[index] = idi.mmApplyDistortionPixel(
+            x[index], y[index], 640, 360, **params)
+    for method in [idi.mmCubicMethod, idi.mmNewtonMethod]:
+        dx, dy = idi.mmApplyDistortion(x, y, 640, 360,
+                                       method=method, **params)
+        assert np.abs(dx-refX).max() < 1e-6
+        assert np.abs(dy-refY).max() < 1e-6
+
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    proj = mfr.readRZML(readOptions)
+    for cam in proj.cameras:
+        tdeCam = converter.convertCamera(cam, cdo.softwareType.tde)
+        for lensCam in [cam, tdeCam]:
+            model, params = idi.getLensParameters(lensCam, 1)
+            assert model == lensCam._software
+
+            # Removing and then applying the distortion must give
+            # back the positions we started with.
+            width = cam.width
+            height = cam.height
+            y, x = np.mgrid[0:height:37, 0:width:37].astype(np.float64)
+            ux, uy = idi.removeDistortion(model, x, y, width, height, params)
+            dx, dy = idi.applyDistortion(model, ux, uy, width, height, params)
+            assert np.abs(dx-x).max() < 1e-6
+            assert np.abs(dy-y).max() < 1e-6
+
+            image = testImage(48, 27, np.uint8)
+            for action in [idi.removeDistortionAction,
+                           idi.applyDistortionAction]:
+                outImage = idi.warpImage(image, model, action, params)
+                assert outImage.shape == image.shape
+                assert outImage.dtype == image.dtype
+
+        # Warp a whole image sequence.
+        seq = cdo.MMSequenceData()
+        seq.imagePath = p.join(tmpDir, 'plate.####.png')
+        for frame in [1, 2]:
+            idi.writeImage(p.join(tmpDir, 'plate.%04d.png' % frame),
+                           testImage(24, 12, np.uint8))
+        cam.sequences = [seq]
+        options = idi.Options()
+        options.time = '2'
+        outPaths = idi.main(cam, options)
+        assert outPaths == [p.join(tmpDir, 'plate_native_undistort.0002.png')]
+        assert idi.readImage(outPaths[0]).shape == (12, 24, 3)
+    return True
@@ -0,0 +1,199 @@
+"""Measures where the time goes when exporting, with named spans.
+
+Code that should be measured is wrapped in a span:
+
+    with instrumentation.span('read', file=fileName):
+        projData = mmFileReader.readRZML(readOptions)
+
+Nothing is recorded until start() is called, so the spans cost one
+check when measuring is off. Once stop() is called, the Recorder
+returned can print a summary of the time spent in each span, or write
+a Chrome trace file, to be opened with 'chrome://tracing' or Perfetto.
+
+Python 2 can not measure the memory allocated by a span, so the
+increase of the process peak memory during the span is recorded
+instead, where it is available.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import time
+import json
+import platform
+import threading
+
+# Only available on Unix.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The Recorder that spans are added to, None if not measuring.
+recorder = None
+
+
+def getPeakMemory():
+    """Get the peak memory of this process, in kilobytes,
+    or None if it is unknown."""
+    if resource == None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Mac OS gives the size in bytes, Linux in kilobytes.
+    if str(platform.system()).lower() == 'darwin':
+        peak = peak/1024
+    return int(peak)
+
+
+class NullSpan(object):
+    """A span that records nothing, used when not measuring."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        return False
+
+
+nullSpan = NullSpan()
+
+
+class Span(object):
+    """A named length of time, recorded when the span is exited.
+
+    args - A dict of values shown with the span, such as the camera name.
+    """
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+        self.threadId = None
+        self.start = None
+        self.seconds = None
+
+        # Increase of the process peak memory, in kilobytes.
+        self.peakMemoryIncrease = None
+        self.startPeakMemory = None
+
+    def __enter__(self):
+        self.threadId = threading.current_thread().ident
+        self.startPeakMemory = getPeakMemory()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.seconds = time.time()-self.start
+        if self.startPeakMemory != None:
+            self.peakMemoryIncrease = getPeakMemory()-self.startPeakMemory
+        self.recorder.addSpan(self)
+        return False
+
+
+class Recorder(object):
+    """Keeps every span exited, from any thread."""
+    def __init__(self):
+        self.spans = list()
+        self.lock = threading.Lock()
+        self.start = time.time()
+
+    def span(self, name, args):
+        return Span(self, name, args)
+
+    def addSpan(self, span):
+        self.lock.acquire()
+        try:
+            self.spans.append(span)
+        finally:
+            self.lock.release()
+        return True
+
+    def getSummary(self):
+        """Get the total time of the spans with each name.
+
+        Returns a list of (name, count, total seconds, largest seconds,
+        largest peak memory increase) tuples, slowest first."""
+        names = dict()
+        for span in self.spans:
+            if not names.has_key(span.name):
+                names[span.name] = [0, 0.0, 0.0, None]
+            summary = names[span.name]
+            summary[0] = summary[0]+1
+            summary[1] = summary[1]+span.seconds
+            summary[2] = max(summary[2], span.seconds)
+            if span.peakMemoryIncrease != None:
+                summary[3] = max(summary[3], span.peakMemoryIncrease)
+        items = list()
+        for name, summary in names.items():
+            items.append(tuple([name]+summary))
+        items.sort(key=lambda x: x[2], reverse=True)
+        return items
+
+    def printSummary(self):
+        print('%-24s %6s %12s %12s %16s' %
+              ('Span', 'Count', 'Total (s)', 'Largest (s)',
+               'Peak Memory (KB)'))
+        for name, count, total, largest, memory in self.getSummary():
+            peak = '-'
+            if memory != None:
+                peak = '+%d' % memory
+            print('%-24s %6d %12.4f %12.4f %16s' %
+                  (name, count, total, largest, peak))
+        return True
+
+    def getChromeTrace(self):
+        """Get the spans in the Chrome trace event format,
+        as a dict ready to be written as JSON."""
+        events = list()
+        pid = os.getpid()
+        for span in self.spans:
+            args = dict(span.args)
+            if span.peakMemoryIncrease != None:
+                args['peakMemoryIncrease'] = span.peakMemoryIncrease
+            events.append({
+                'name': span.name,
+                'ph': 'X',
+                'ts': (span.start-self.start)*1000000.0,
+                'dur': span.seconds*1000000.0,
+                'pid': pid,
+                'tid': span.threadId,
+                'args': args,
+            })
+        events.sort(key=lambda x: x['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def writeChromeTrace(self, filePath):
+        f = open(filePath, 'w')
+        try:
+            json.dump(self.getChromeTrace(), f, indent=1, sort_keys=True)
+        finally:
+            f.close()
+        return True
+
+
+def start():
+    """Start recording spans.
+
+    Returns the Recorder spans are added to."""
+    global recorder
+    recorder = Recorder()
+    return recorder
+
+
+def stop():
+    """Stop recording spans.
+
+    Returns the Recorder the spans were added to, or None."""
+    global recorder
+    stopped = recorder
+    recorder = None
+    return stopped
+
+
+def span(name, **args):
+    """Get a span to measure the code inside a 'with' statement.
+
+    args - Values shown with the span, such as the camera name."""
+    if recorder == None:
+        return nullSpan
+    return recorder.span(name, args)
@@ -0,0 +1,63 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os.path as p
+import json
+import tempfile
+
+import mmFileReader as mfr
+import mmDistortionConverter as mdc
+import instrumentation
+
+
+def main(filePath):
+    # Nothing is recorded when not measuring.
+    assert instrumentation.recorder == None
+    assert instrumentation.span('read') is instrumentation.nullSpan
+
+    recorder = instrumentation.start()
+    with instrumentation.span('outer', camera='Camera 01'):
+        with instrumentation.span('inner'):
+            pass
+        with instrumentation.span('inner'):
+            pass
+    assert instrumentation.stop() is recorder
+    assert instrumentation.recorder == None
+    assert [x.name for x in recorder.spans] == ['inner', 'inner', 'outer']
+    summary = recorder.getSummary()
+    assert [(x[0], x[1]) for x in summary] == [('outer', 1), ('inner', 2)]
+    trace = recorder.getChromeTrace()
+    events = trace['traceEvents']
+    assert [x['name'] for x in events] == ['outer', 'inner', 'inner']
+    assert events[0]['args']['camera'] == 'Camera 01'
+    assert events[0]['ph'] == 'X'
+    assert events[0]['dur'] >= events[1]['dur']
+
+    # Spans are recorded for reading, converting and each exporter,
+    # for every camera.
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    options = mdc.ConverterOptions()
+    options.inputFile = filePath
+    options.inputTime = '<all>'
+    options.outputDir = tmpDir
+    options.timingReport = True
+    options.traceFile = p.join(tmpDir, 'trace.json')
+    mdc.setExportFlags(options, {'rawText': True, 'tdeLens': True})
+    assert mdc.exportData(options) == True
+    assert instrumentation.recorder == None
+    f = open(options.traceFile, 'r')
+    trace = json.load(f)
+    f.close()
+    names = [x['name'] for x in trace['traceEvents']]
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    numCams = len(mfr.readRZML(readOptions).cameras)
+    assert names.count('exportData') == 1
+    assert names.count('read') == 1
+    assert names.count('convert') == numCams
+    assert names.count('rawText') == numCams
+    assert names.count('tdeLens') == numCams
+    return True
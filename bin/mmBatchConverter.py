@@ -0,0 +1,270 @@
+"""Converts many Matchmover files at once, using a pool of processes.
+
+Usage:
+    python2 mmBatchConverter.py [options] <directory or glob> ...
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import os
+import os.path as p
+import glob
+import time
+import traceback
+import optparse
+import multiprocessing as mp
+
+import commonDataObjects as cdo
+import mmDistortionConverter as mdc
+
+# All export types that can be given in Options.export.
+exportTypes = mdc.exportTypes
+
+
+class Options(object):
+    """Options that can be passed to the batch converter."""
+    def __init__(self):
+        # A list of directories, file paths or glob patterns.
+        self.inputPaths = list()
+        self.inputTime = '<all>'
+        self.outputDir = '<same>' # <same>, any path.
+
+        # A dict mapping of export types with booleans, see exportTypes.
+        # If None, every file format is exported.
+        self.export = None
+
+        # Number of processes to convert with, None is one per CPU.
+        self.workers = None
+
+        # Only write the files that are out of date.
+        self.incremental = False
+
+        # if not None, curve keys that linear interpolation recreates
+        # within this tolerance are not written.
+        self.curveTolerance = None
+        self.curveRdp = False
+
+
+class FileResult(object):
+    """The result of converting a single file."""
+    def __init__(self):
+        self.filePath = None
+        self.success = False
+        self.message = None
+        self.fileSize = 0
+        self.seconds = 0.0
+
+
+def findInputFiles(inputPaths):
+    """Find all Matchmover files from a list of directories,
+    file paths or glob patterns.
+
+    Returns a sorted list of absolute file paths."""
+    filePaths = list()
+    for inputPath in inputPaths:
+        if p.isdir(inputPath):
+            paths = glob.glob(p.join(inputPath, '*'))
+        else:
+            paths = glob.glob(inputPath)
+        for path in paths:
+            path = p.abspath(path)
+            if (p.isfile(path) and cdo.vaildInputFile(path) and
+                path not in filePaths):
+                filePaths.append(path)
+    filePaths.sort()
+    return filePaths
+
+
+def getWorkerCount(workers):
+    """Get the number of worker processes to use."""
+    if workers != None and workers > 0:
+        return int(workers)
+    count = 1
+    try:
+        count = mp.cpu_count()
+    except NotImplementedError:
+        pass
+    return count
+
+
+def convertFile(args):
+    """Convert a single file, used by each worker process.
+
+    args - A tuple of (filePath, inputTime, outputDir, export,
+    incremental, curveTolerance, curveRdp, workers), workers is
+    the number of threads each file is exported with.
+
+    Returns a FileResult, exceptions are caught and stored as the message."""
+    (filePath, inputTime, outputDir, export,
+     incremental, curveTolerance, curveRdp, workers) = args
+    result = FileResult()
+    result.filePath = filePath
+    startTime = time.time()
+    try:
+        result.fileSize = p.getsize(filePath)
+        options = mdc.ConverterOptions()
+        options.inputFile = filePath
+        options.inputTime = inputTime
+        options.outputDir = outputDir
+        options.incremental = incremental
+        options.curveTolerance = curveTolerance
+        options.curveRdp = curveRdp
+        options.workers = workers
+        mdc.setExportFlags(options, export)
+        result.success = mdc.exportData(options) == True
+        if not result.success:
+            result.message = 'Could not export file.'
+    except Exception:
+        result.success = False
+        result.message = traceback.format_exc()
+    result.seconds = time.time()-startTime
+    return result
+
+
+def printResult(result):
+    status = 'OK'
+    if not result.success:
+        status = 'FAILED'
+    msg = "%s: '%s' (%.3f seconds)"
+    print(msg % (status, result.filePath, result.seconds))
+    if result.message != None:
+        print(result.message)
+    return True
+
+
+def printSummary(results, seconds):
+    """Print the number of files converted and the throughput."""
+    numOk = 0
+    numBytes = 0
+    for result in results:
+        if result.success:
+            numOk = numOk + 1
+        numBytes = numBytes + result.fileSize
+    numFailed = len(results)-numOk
+    filesPerSec = 0.0
+    mbPerSec = 0.0
+    if seconds > 0.0:
+        filesPerSec = len(results)/seconds
+        mbPerSec = (numBytes/(1024.0*1024.0))/seconds
+    print('-----------------------')
+    print('Converted: %d, Failed: %d, Total: %d' %
+          (numOk, numFailed, len(results)))
+    print('Total Time: %.3f seconds (%.2f files/second, %.2f MB/second)' %
+          (seconds, filesPerSec, mbPerSec))
+    for result in results:
+        if not result.success:
+            print("Failed: '%s'" % result.filePath)
+    return True
+
+
+def main(options):
+    """Convert all files found with options.inputPaths.
+
+    Returns a list of FileResult objects, in the same order as the files."""
+    filePaths = findInputFiles(options.inputPaths)
+    if len(filePaths) == 0:
+        msg = 'Warning: No Matchmover files found with %s.'
+        print(msg % repr(options.inputPaths))
+        return list()
+
+    workers = min(getWorkerCount(options.workers), len(filePaths))
+
+    # Files converted in many processes each use a single thread,
+    # otherwise every process would start a thread per CPU.
+    fileWorkers = None
+    if workers > 1:
+        fileWorkers = 1
+    jobs = list()
+    for filePath in filePaths:
+        jobs.append((filePath, options.inputTime,
+                     options.outputDir, options.export,
+                     options.incremental, options.curveTolerance,
+                     options.curveRdp, fileWorkers))
+
+    msg = 'Converting %d files, with %d workers.'
+    print(msg % (len(jobs), workers))
+
+    startTime = time.time()
+    results = list()
+    if workers == 1:
+        for job in jobs:
+            result = convertFile(job)
+            printResult(result)
+            results.append(result)
+    else:
+        pool = mp.Pool(processes=workers)
+        try:
+            for result in pool.imap_unordered(convertFile, jobs):
+                printResult(result)
+                results.append(result)
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    seconds = time.time()-startTime
+
+    # Keep the results in a stable order.
+    results.sort(key=lambda x: filePaths.index(x.filePath))
+    printSummary(results, seconds)
+    return results
+
+
+def parseArguments(args):
+    """Parse the command line arguments into an Options object."""
+    usage = 'usage: %prog [options] <directory or glob> ...'
+    parser = optparse.OptionParser(usage=usage, version=cdo.projectVersion)
+    parser.add_option('-j', '--workers', dest='workers', type='int',
+                      default=None,
+                      help='number of processes, default is one per CPU')
+    parser.add_option('-t', '--time', dest='time', default='<all>',
+                      help="frames to export, for example '1-36' or '2,34'")
+    parser.add_option('-o', '--output-dir', dest='outputDir',
+                      default='<same>',
+                      help='directory to write files to')
+    parser.add_option('-e', '--export', dest='export', default=None,
+                      help=('comma separated export types, one of %s' %
+                            ', '.join(exportTypes)))
+    parser.add_option('-i', '--incremental', dest='incremental',
+                      action='store_true', default=False,
+                      help='only write files that are out of date')
+    parser.add_option('--curve-tolerance', dest='curveTolerance',
+                      type='float', default=None,
+                      help=('drop curve keys that linear interpolation '
+                            'recreates within this tolerance'))
+    parser.add_option('--rdp', dest='curveRdp', action='store_true',
+                      default=False,
+                      help=('also drop curve keys with the '
+                            'Ramer-Douglas-Peucker algorithm'))
+    opts, paths = parser.parse_args(args)
+    if len(paths) == 0:
+        parser.error('no input directory or glob given')
+
+    options = Options()
+    options.inputPaths = paths
+    options.inputTime = opts.time
+    options.outputDir = opts.outputDir
+    options.workers = opts.workers
+    options.incremental = opts.incremental
+    options.curveTolerance = opts.curveTolerance
+    options.curveRdp = opts.curveRdp
+    if opts.export != None:
+        options.export = dict()
+        for name in opts.export.split(','):
+            name = name.strip()
+            if name not in exportTypes:
+                parser.error('unknown export type %s' % repr(name))
+            options.export[name] = True
+    return options
+
+
+if __name__ == '__main__':
+    options = parseArguments(sys.argv[1:])
+    results = main(options)
+    failed = [x for x in results if not x.success]
+    if len(results) == 0 or len(failed) > 0:
+        sys.exit(1)
@@ -0,0 +1,62 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import tempfile
+
+import commonDataObjects as cdo
+import mmBatchConverter
+
+
+def main(filePath):
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+
+    # A broken file, which must be reported as failed.
+    badFilePath = p.join(tmpDir, 'broken.rzml')
+    f = open(badFilePath, 'w')
+    f.write('<RZML>\n')
+    f.close()
+
+    filePaths = mmBatchConverter.findInputFiles([filePath, tmpDir])
+    assert filePaths == sorted([p.abspath(filePath), badFilePath])
+    assert mmBatchConverter.findInputFiles([p.join(tmpDir, '*.txt')]) == []
+
+    for workers in [1, 2]:
+        options = mmBatchConverter.Options()
+        options.inputPaths = [filePath, p.join(tmpDir, '*.rzml')]
+        options.outputDir = tmpDir
+        options.export = {'nukeDistNode': True, 'tdeLens': True}
+        options.workers = workers
+        results = mmBatchConverter.main(options)
+        assert len(results) == 2
+        for result in results:
+            assert result.seconds >= 0.0
+            if result.filePath == badFilePath:
+                assert result.success == False
+                assert result.message != None
+            else:
+                assert result.success == True
+                assert result.fileSize == p.getsize(filePath)
+
+    outFiles = os.listdir(tmpDir)
+    assert len([x for x in outFiles if x.endswith('.nk')]) > 0
+    assert len([x for x in outFiles if x.endswith('.txt')]) > 0
+    assert len([x for x in outFiles if x.endswith('.sh')]) == 0
+
+    # A single file can be converted with a given number of threads.
+    job = (filePath, '<all>', tmpDir, {'rawText': True},
+           False, None, False, 1)
+    assert mmBatchConverter.convertFile(job).success == True
+
+    options = mmBatchConverter.parseArguments(['-j', '3', '-e', 'rawText',
+                                               '-t', '1-10', '-i', filePath])
+    assert options.workers == 3
+    assert options.incremental == True
+    assert options.export == {'rawText': True}
+    assert options.inputTime == '1-10'
+    assert options.inputPaths == [filePath]
+    return True
@@ -1,4 +1,14 @@
-"""Asks for a file using Tkinter GUI, then converts the file and exits."""
+"""Converts a Matchmover file into the file formats asked for.
+
+Usage:
+    python2 mmDistortionConverter.py [options] <Matchmover file>
+    python2 mmDistortionConverter.py --gui
+
+With no arguments the user interface is opened, asking for a file.
+Tkinter is only imported when the user interface is opened, see
+mmDistortionConverterGui.py, so files can be converted on computers
+without Tk or a display.
+"""
 
 # Copyright David Cattermole, 2013
 # Licensed under the GNU General Public License, 
@@ -6,17 +16,11 @@
 
 # base modules imports
 import sys
-import os 
 import os.path as p
-import platform
-import math as m
-
-# Tk GUI
-from Tkinter import *
-import tkFileDialog
-
-# # IDLE custom Tkinter (Tabs)
-# from idlelib.tabbedpages import TabbedPageSet
+import copy
+import optparse
+import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 
 import commonDataObjects as cdo
 import converter
@@ -26,10 +30,13 @@ import tdeWriteRawText
 import tdeWriteWarpBatchScript
 import mmWriteDistoImaBatchScript
 import tdeWriteWetaNukeDistortionNode
+import tdeWriteStMap
+import exportManifest
+import instrumentation
 
 
 class ConverterOptions(object):
-    """Options that can be passed to MMDistortionConverter.exportData()."""
+    """Options that can be passed to exportData()."""
     def __init__(self):
         self.inputFile = None
         self.inputTime = None
@@ -41,6 +48,41 @@ class ConverterOptions(object):
         self.exportTdeLens = None
         self.exportWarpBatch = None
         self.exportDistoBatch = None
+        self.exportStMap = None
+
+        # Only write the files that are out of date, see exportManifest.
+        self.incremental = False
+
+        # Number of threads to run exporters with, None is one per CPU.
+        self.workers = None
+
+        # if not None, curve keys that linear interpolation recreates
+        # within this tolerance are not written, see cdo.reduceKeys().
+        self.curveTolerance = None
+        self.curveRdp = False
+
+        # Directory to keep ST-map warp maps in between runs,
+        # see stMapCache. None only keeps them in memory.
+        self.stMapCacheDir = None
+
+        # Keep the parsed Matchmover file in a binary cache file,
+        # see sceneCache. None writes the cache next to the file.
+        self.sceneCache = False
+        self.sceneCacheDir = None
+
+        # Number of processes to parse the shots of the Matchmover
+        # file with, see mmFileReader.readRZMLParallel().
+        # None is one per CPU.
+        self.readProcesses = 1
+
+        # Only read the frames of the Matchmover file in inputTime,
+        # see mmFileReader.FrameWindow.
+        self.timeWindow = False
+
+        # Print the time spent reading, converting and in each exporter,
+        # and/or write it to a Chrome trace file, see instrumentation.
+        self.timingReport = False
+        self.traceFile = None
         
         self.nukeDistNodeOptions = None
         self.rawTextOptions = None
@@ -49,302 +91,400 @@ class ConverterOptions(object):
         self.distoBatchOptions = None
 
 
-class MMDistortionConverter(Frame):
-    """Class that asks for a file path using a GUI."""
-
-    def __init__ (self, master=None, path=None, export=None):
-        """Creates the user interface if no path is given, 
-        else uses export keyword to export file types or if export is not given, 
-        exports every file format.
-
-        master - Used by tkinter library.
-        path - An input file name to convert.
-        export - A dict mapping of export types with booleans, 
-        for example, nukeDistNode:True.
-
-        Returns nothing."""
-        self.os = str(platform.system()).lower()
-
-        # get the file path.
-        if path != None:
-            options = ConverterOptions()
-            options.inputFile = str(path)
-            options.inputTime = '<all>'
-            options.outputDir = '<same>'
-            if export == None:
-                options.exportNukeDistNode = True
-                options.exportRawText = True
-                options.exportTdeLens = True
-                options.exportWarpBatch = True
-                options.exportDistoBatch = True
-            else:
-                options.exportNukeDistNode = False
-                options.exportRawText = False
-                options.exportTdeLens = False
-                options.exportWarpBatch = False
-                options.exportDistoBatch = False
-                if export.has_key('nukeDistNode') and export['nukeDistNode'] == True:
-                    options.exportNukeDistNode = True
-                if export.has_key('rawText') and export['rawText'] == True:
-                    options.exportRawText = True
-                if export.has_key('tdeLens') and export['tdeLens'] == True:
-                    options.exportTdeLens = True
-                if export.has_key('warpBatch') and export['warpBatch'] == True:
-                    options.exportWarpBatch = True
-                if export.has_key('distoBatch') and export['distoBatch'] == True:
-                    options.exportDistoBatch = True
-
-            self.exportData(options)
-            return
-
-        # Start Options GUI 
-        Frame.__init__(self, master)
-        Pack.config(self)
-
-        # The main Frame
-        mainFrame = Frame(self)
-        mainFrame.pack(fill=BOTH, expand=1, padx=5, pady=5)
-
-        # Input/Output
-        self.inputFile = StringVar()
-        self.inputTime = StringVar()
-        self.outputDir = StringVar()
-        self.outputDir.set('<same>')
-        self.inputTime.set('<all>')
-        inOutFrame = LabelFrame(mainFrame, text='File/Directories...', relief=GROOVE, borderwidth=2)
-        inOutFrame.pack(fill=BOTH,expand=1)
-
-        # Input File
-        inFileFrame = Frame(inOutFrame)
-        inFileLabel = Label(inFileFrame, text='Input File:')
-        inFileBtn = Button(inFileFrame, text='...', command=self.getFilePath)
-        self.inFileEntry = Entry(inFileFrame, textvariable=self.inputFile)
-        inFileFrame.pack(fill=BOTH,expand=1)
-        inFileLabel.pack(side=LEFT, padx=5, pady=2)
-        inFileBtn.pack(side=RIGHT, padx=5, pady=2)
-        self.inFileEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
-
-        # Input Time
-        inTimeFrame = Frame(inOutFrame)
-        inTimeLabel = Label(inTimeFrame, text='Input Time:')
-        self.inTimeEntry = Entry(inTimeFrame, textvariable=self.inputTime)
-        inTimeFrame.pack(fill=BOTH,expand=1)
-        inTimeLabel.pack(side=LEFT, padx=5, pady=2)
-        self.inTimeEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
-
-        # Output Directory
-        outDirFrame = Frame(inOutFrame)
-        outDirLabel = Label(outDirFrame, text='Output Directory:')
-        outDirBtn = Button(outDirFrame, text='...', command=self.getDirectoryPath)
-        self.outDirEntry = Entry(outDirFrame, textvariable=self.outputDir)
-        outDirFrame.pack(fill=BOTH,expand=1)
-        outDirLabel.pack(side=LEFT, padx=5, pady=2)
-        outDirBtn.pack(side=RIGHT, padx=5, pady=2)
-        self.outDirEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
-        
-        # Output Formats
-        outFormatsFrame = LabelFrame(mainFrame, text='Export File Formats...', relief=GROOVE, borderwidth=2)
-        outFormatsFrame.pack(fill=BOTH,expand=1)
-
-        # Export Nuke Distortion Node
-        self.exportNukeDistNode = BooleanVar()
-        nukeDistFrame = Frame(outFormatsFrame)
-        nukeDistChk = Checkbutton(nukeDistFrame, text='Nuke Distortion Node', variable=self.exportNukeDistNode)
-        # nukeDistBtn = Button(nukeDistFrame, text='Options...', state='disabled', command=self.exportNukeDistNodeOptions)
-        nukeDistFrame.pack(fill=BOTH,expand=1)
-        nukeDistChk.pack(side=LEFT, padx=5, pady=2)
-        # nukeDistBtn.pack(side=LEFT, fill=BOTH)
-
-        # Export 3DE Lens File
-        self.exportTdeLens = BooleanVar()
-        tdeLensFrame = Frame(outFormatsFrame)
-        tdeLensChk = Checkbutton(tdeLensFrame, text='3DE Lens File', variable=self.exportTdeLens)
-        tdeLensFrame.pack(fill=BOTH,expand=1)
-        tdeLensChk.pack(side=LEFT, padx=5, pady=2)
-
-        # Export 3DE Raw Text (Human readable)
-        self.exportRawText = BooleanVar()
-        rawTextFrame = Frame(outFormatsFrame)
-        rawTextChk = Checkbutton(rawTextFrame, text='3DE Human Readable Text', variable=self.exportRawText)
-        rawTextFrame.pack(fill=BOTH,expand=1)
-        rawTextChk.pack(side=LEFT, padx=5, pady=2)
-
-        # Export Warp4 Batch Script
-        self.exportWarpBatch = BooleanVar()
-        warpBatchFrame = Frame(outFormatsFrame)
-        warpBatchChk = Checkbutton(warpBatchFrame, text='Warp4 Batch Script', variable=self.exportWarpBatch)
-        warpBatchBtn = Button(warpBatchFrame, text='Options...', state='disabled', command=self.exportWarpBatchOptions)
-        warpBatchFrame.pack(fill=BOTH,expand=1)
-        warpBatchChk.pack(side=LEFT, padx=5, pady=2)
-        warpBatchBtn.pack(side=LEFT, fill=BOTH)
-
-        # Export DistoIma Batch Script
-        self.exportDistoBatch = BooleanVar()
-        distoBatchFrame = Frame(outFormatsFrame)
-        distoBatchChk = Checkbutton(distoBatchFrame, text='DistoIma Batch Script', variable=self.exportDistoBatch)
-        distoBatchBtn = Button(distoBatchFrame, text='Options...', state='disabled', command=self.exportDistoBatchOptions)
-        distoBatchFrame.pack(fill=BOTH,expand=1)
-        distoBatchChk.pack(side=LEFT, padx=5, pady=2)
-        distoBatchBtn.pack(side=LEFT, fill=BOTH)
-
-        # # Export Maya 3D Camera
-        # self.exportMayaCam = BooleanVar()
-        # mayaCamFrame = Frame(outFormatsFrame)
-        # mayaCamChk = Checkbutton(mayaCamFrame, text='Maya 3D Camera', variable=self.exportMayaCam)
-        # mayaCamFrame.pack(fill=BOTH,expand=1)
-        # mayaCamChk.pack(side=LEFT, padx=5, pady=2)
-
-        # # Export Maya 2.5D Points
-        # self.exportMaya25D = BooleanVar()
-        # maya25DFrame = Frame(outFormatsFrame)
-        # maya25DChk = Checkbutton(maya25DFrame, text='Maya 2.5D Points', variable=self.exportMaya25D)
-        # maya25DFrame.pack(fill=BOTH,expand=1)
-        # maya25DChk.pack(side=LEFT, padx=5, pady=2)
-
-        # End Frame
-        buttonsFrame = Frame(mainFrame, pady=2)
-        okBtn = Button(buttonsFrame, text='Ok',
-                       command=self.exportDataFromGui)
-        exitBtn = Button(buttonsFrame, text='Exit',
-                         command=self.quit,
-                         padx=6, pady=3)
-        buttonsFrame.pack(side=BOTTOM, fill=BOTH,expand=1)
-        okBtn.pack(side=LEFT, fill=BOTH, padx=20, pady=3)
-        exitBtn.pack(side=RIGHT, fill=BOTH, padx=20, pady=3)
-        return
-
-    def exportDataFromGui(self):
-        options = ConverterOptions()
-        options.inputFile = self.inputFile.get()
-        options.inputTime = self.inputTime.get()
-        options.outputDir = self.outputDir.get()
-        options.exportNukeDistNode = self.exportNukeDistNode.get()
-        options.exportRawText = self.exportRawText.get()
-        options.exportTdeLens = self.exportTdeLens.get()
-        options.exportWarpBatch = self.exportWarpBatch.get()
-        options.exportDistoBatch = self.exportDistoBatch.get()
-        self.exportData(options)
-        return
-
-    def exportData(self, options):
-        """Exports data.
-
-        options - A ConverterOptions class that has all options 
-        filled out correctly.
-
-        Returns True or False."""
-        assert options.inputFile != None
-        assert options.inputTime != None
-        assert options.outputDir != None
-        assert options.exportNukeDistNode != None
-        assert options.exportRawText != None
-        assert options.exportTdeLens != None
-        assert options.exportWarpBatch != None
-        assert options.exportDistoBatch != None
-        
-        if not cdo.vaildInputFile(options.inputFile):
-            msg = 'Incorrect file extension, must end with ".rzml", file path: %s.'
-            print msg % repr(options.inputFile)
-            return
-
-        # read the file, get camera data.
-        fileName = p.split(options.inputFile)[1]
-        print("Reading Matchmover File: '%s'" % fileName)
-        readOptions = mmFileReader.Options()
-        readOptions.filePath = options.inputFile
-        readOptions.time = options.inputTime
+# All export types that can be given to setExportFlags().
+exportTypes = ['nukeDistNode',
+               'rawText',
+               'tdeLens',
+               'warpBatch',
+               'distoBatch',
+               'stMap']
+
+
+def setExportFlags(options, export=None):
+    """Set which file formats are exported on the ConverterOptions given.
+
+    export - A dict mapping of export types with booleans,
+    for example, nukeDistNode:True. If None, every file format is exported,
+    except ST-maps, which are large and must be asked for.
+    """
+    options.exportStMap = False
+    if export == None:
+        options.exportNukeDistNode = True
+        options.exportRawText = True
+        options.exportTdeLens = True
+        options.exportWarpBatch = True
+        options.exportDistoBatch = True
+    else:
+        options.exportNukeDistNode = False
+        options.exportRawText = False
+        options.exportTdeLens = False
+        options.exportWarpBatch = False
+        options.exportDistoBatch = False
+        if export.has_key('nukeDistNode') and export['nukeDistNode'] == True:
+            options.exportNukeDistNode = True
+        if export.has_key('rawText') and export['rawText'] == True:
+            options.exportRawText = True
+        if export.has_key('tdeLens') and export['tdeLens'] == True:
+            options.exportTdeLens = True
+        if export.has_key('warpBatch') and export['warpBatch'] == True:
+            options.exportWarpBatch = True
+        if export.has_key('distoBatch') and export['distoBatch'] == True:
+            options.exportDistoBatch = True
+        if export.has_key('stMap') and export['stMap'] == True:
+            options.exportStMap = True
+    return options
+
+
+# Export types written from the Matchmover camera, others are
+# written from the 3DE camera.
+mmCameraExports = ['distoBatch']
+
+# Export types that read the image sequence of the camera, so also
+# depend on the image files found on disk.
+sequenceExports = ['nukeDistNode', 'warpBatch', 'distoBatch', 'stMap']
+
+# Export types that write the curves of the camera from a shared
+# cdo.CameraSamples object.
+sampleExports = ['nukeDistNode', 'rawText', 'tdeLens']
+
+
+def getWorkerCount(workers, numJobs):
+    """Get the number of threads to run numJobs export jobs with."""
+    count = 1
+    if workers != None and workers > 0:
+        count = int(workers)
+    else:
+        try:
+            count = mp.cpu_count()
+        except NotImplementedError:
+            pass
+    return max(min(count, numJobs), 1)
+
+
+def runExportJob(job):
+    """Run a single (exportType, writer module, camera, writer options)
+    export job, used by each worker thread.
+
+    Returns a list of the files written."""
+    exportType, writer, writerCam, writerOptions = job
+    with instrumentation.span(exportType, camera=writerCam.name):
+        outPaths = writer.main(writerCam, writerOptions)
+    return outPaths
+
+
+def getExportJobs(options):
+    """Get the exporters to run for the ConverterOptions given.
+
+    Returns a list of (exportType, writer module, writer options) tuples."""
+    jobs = list()
+    if options.exportNukeDistNode:
+        nukeOptions = tdeWriteWetaNukeDistortionNode.Options()
+        jobs.append(('nukeDistNode', tdeWriteWetaNukeDistortionNode,
+                     nukeOptions))
+    if options.exportRawText:
+        rawOptions = tdeWriteRawText.Options()
+        jobs.append(('rawText', tdeWriteRawText, rawOptions))
+    if options.exportTdeLens:
+        lensOptions = tdeWriteLensFile.Options()
+        jobs.append(('tdeLens', tdeWriteLensFile, lensOptions))
+    if options.exportWarpBatch:
+        warpOptions = tdeWriteWarpBatchScript.Options()
+        # warpOptions.useOverscan = 'none'
+        # warpOptions.fileSuffix = '_warp4'
+        jobs.append(('warpBatch', tdeWriteWarpBatchScript, warpOptions))
+    if options.exportDistoBatch:
+        distoOptions = mmWriteDistoImaBatchScript.Options()
+        jobs.append(('distoBatch', mmWriteDistoImaBatchScript,
+                     distoOptions))
+    if options.exportStMap:
+        stMapOptions = tdeWriteStMap.Options()
+        stMapOptions.cacheDir = options.stMapCacheDir
+        jobs.append(('stMap', tdeWriteStMap, stMapOptions))
+    for exportType, writer, writerOptions in jobs:
+        writerOptions.filePath = options.inputFile
+        writerOptions.time = options.inputTime
+        writerOptions.outDir = options.outputDir
+        if hasattr(writerOptions, 'curveTolerance'):
+            writerOptions.curveTolerance = options.curveTolerance
+            writerOptions.curveRdp = options.curveRdp
+    return jobs
+
+
+def writeManifest(manifest, cams, camJobs, jobOutputs, optionsHashes):
+    """Remember the files written by each (camera, exporter) job.
+
+    jobOutputs - The list of files written by each job in camJobs,
+    as returned by runExportJob()."""
+    for (cam, job), outputs in zip(camJobs, jobOutputs):
+        exportType, writer, writerCam, writerOptions = job
+        imagePath = None
+        if exportType in sequenceExports and len(writerCam.sequences) > 0:
+            imagePath = writerCam.sequences[0].imagePath
+        manifest.setEntry(cam.name, exportType,
+                          optionsHashes[exportType],
+                          outputs, imagePath=imagePath)
+    manifest.cameras = [cam.name for cam in cams]
+    manifest.write()
+    return True
+
+
+def exportData(options):
+    """Exports data.
+
+    options - A ConverterOptions class that has all options 
+    filled out correctly.
+
+    Returns True or False."""
+    if not options.timingReport and options.traceFile == None:
+        return exportFileData(options)
+    recorder = instrumentation.start()
+    try:
+        with instrumentation.span('exportData',
+                                  file=p.split(options.inputFile)[1]):
+            result = exportFileData(options)
+    finally:
+        instrumentation.stop()
+    if options.timingReport:
+        recorder.printSummary()
+    if options.traceFile != None:
+        print("Writing Chrome Trace File: '%s'" % options.traceFile)
+        recorder.writeChromeTrace(options.traceFile)
+    return result
+
+
+def exportFileData(options):
+    """Exports data, see exportData()."""
+    assert options.inputFile != None
+    assert options.inputTime != None
+    assert options.outputDir != None
+    assert options.exportNukeDistNode != None
+    assert options.exportRawText != None
+    assert options.exportTdeLens != None
+    assert options.exportWarpBatch != None
+    assert options.exportDistoBatch != None
+    
+    if not cdo.vaildInputFile(options.inputFile):
+        msg = 'Incorrect file extension, must end with ".rzml", file path: %s.'
+        print msg % repr(options.inputFile)
+        return False
+
+    jobs = getExportJobs(options)
+    optionsHashes = dict()
+    for exportType, writer, writerOptions in jobs:
+        optionsHashes[exportType] = exportManifest.hashOptions(writerOptions)
+
+    # Skip reading the file when every export is up to date.
+    fileName = p.split(options.inputFile)[1]
+    manifest = None
+    if options.incremental:
+        manifestPath = exportManifest.getManifestPath(options.inputFile,
+                                                      options.outputDir)
+        manifest = exportManifest.Manifest(manifestPath)
+        with instrumentation.span('manifest'):
+            manifest.read()
+            manifest.setInputHash(exportManifest.hashFile(options.inputFile))
+        if manifest.cameras != None:
+            upToDate = True
+            for camName in manifest.cameras:
+                for exportType, writer, writerOptions in jobs:
+                    if not manifest.isFresh(camName, exportType,
+                                            optionsHashes[exportType]):
+                        upToDate = False
+            if upToDate:
+                print("Matchmover File Is Up To Date: '%s'" % fileName)
+                return True
+
+    # read the file, get camera data.
+    print("Reading Matchmover File: '%s'" % fileName)
+    readOptions = mmFileReader.Options()
+    readOptions.filePath = options.inputFile
+    readOptions.time = options.inputTime
+    readOptions.streaming = True
+    readOptions.cache = options.sceneCache
+    readOptions.cacheDir = options.sceneCacheDir
+    readOptions.processes = options.readProcesses
+    readOptions.timeWindow = options.timeWindow
+    timeList = cdo.parseTimeString(options.inputTime)
+    with instrumentation.span('read', file=fileName):
         projData = mmFileReader.readRZML(readOptions)
 
-        cams = projData.cameras
-        for cam in projData.cameras:
-            print("Converting Camera: '%s'" % cam.name)
+    # Prepare the inputs shared by the exporters of each camera once,
+    # so the (camera, exporter) jobs are independent of each other.
+    cams = projData.cameras
+    camJobs = list()
+    for cam in projData.cameras:
+        print("Converting Camera: '%s'" % cam.name)
+        with instrumentation.span('convert', camera=cam.name):
             tdeCam = converter.convertCamera(cam, cdo.softwareType.tde)
-            if options.exportNukeDistNode:
-                nukeOptions = tdeWriteWetaNukeDistortionNode.Options()
-                nukeOptions.filePath = options.inputFile
-                nukeOptions.time = options.inputTime
-                nukeOptions.outDir = options.outputDir
-                tdeWriteWetaNukeDistortionNode.main(tdeCam, nukeOptions)
-            if options.exportRawText:
-                rawOptions = tdeWriteRawText.Options()
-                rawOptions.filePath = options.inputFile
-                rawOptions.time = options.inputTime
-                rawOptions.outDir = options.outputDir
-                tdeWriteRawText.main(tdeCam, rawOptions)
-            if options.exportTdeLens:
-                lensOptions = tdeWriteLensFile.Options()
-                lensOptions.filePath = options.inputFile
-                lensOptions.time = options.inputTime
-                lensOptions.outDir = options.outputDir
-                tdeWriteLensFile.main(tdeCam, lensOptions)
-            if options.exportWarpBatch:
-                warpOptions = tdeWriteWarpBatchScript.Options()
-                warpOptions.filePath = options.inputFile
-                warpOptions.time = options.inputTime
-                warpOptions.outDir = options.outputDir
-                # warpOptions.useOverscan = 'none'
-                # warpOptions.fileSuffix = '_warp4'
-                tdeWriteWarpBatchScript.main(tdeCam, warpOptions)
-            if options.exportDistoBatch:
-                distoOptions = mmWriteDistoImaBatchScript.Options()
-                distoOptions.filePath = options.inputFile
-                distoOptions.time = options.inputTime
-                distoOptions.outDir = options.outputDir
-                mmWriteDistoImaBatchScript.main(cam, distoOptions)
-        
-        print('Distortion Converter Finished!')
-        return
-
-    def exportNukeDistNodeOptions(self):
-        print 'get the Nuke Distortion Node options!'
-        return
-
-    def exportWarpBatchOptions(self):
-        print 'get the Warp4 options!'
-        return
-
-    def exportDistoBatchOptions(self):
-        print 'get the DistoIma options!'
-        return
-
-    def getFilePath(self):
-        """Asks the user for a file name."""
-        filePath = None
-        result = tkFileDialog.askopenfilename(filetypes=[('RZML', '*.rzml')],
-                                              multiple=False, 
-                                              title=cdo.projectTitle)
-        if len(result) == 0:
-            filePath = None
-        else:
-            filePath = result
-            self.inputFile.set(filePath)
-        # return filePath
-        return
-
-    def getDirectoryPath(self):
-        """Asks the user for a file name."""
-        dirPath = None
-        # NOTE: Perhaps we should use an environment variable
-        # to set the initial directory for this dialog?
-        result = tkFileDialog.askdirectory(initialdir=os.getcwd,
-                                           mustexist=False, 
-                                           title=cdo.projectTitle)
-        if len(result) == 0:
-            dirPath = None
-        else:
-            dirPath = result
-            self.outputDir.set(dirPath)
-        return
+            cam.focalLength.simplifyData()
+            tdeCam.focalLength.simplifyData()
+
+        images = None
+        samples = None
+        imagePath = None
+        if len(cam.sequences) > 0:
+            imagePath = cam.sequences[0].imagePath
+        for exportType, writer, writerOptions in jobs:
+            if (manifest != None and
+                manifest.isFresh(cam.name, exportType,
+                                 optionsHashes[exportType])):
+                msg = "Skipping Up To Date Export: '%s' (%s)"
+                print(msg % (cam.name, exportType))
+                continue
+            writerCam = tdeCam
+            if exportType in mmCameraExports:
+                writerCam = cam
+            writerOptions = copy.copy(writerOptions)
+            if exportType in sequenceExports and imagePath != None:
+                if images == None:
+                    with instrumentation.span('glob', camera=cam.name):
+                        images = cdo.getAllImageSequence(imagePath)
+                writerOptions.images = images
+            if exportType in sampleExports:
+                if samples == None:
+                    with instrumentation.span('samples', camera=cam.name):
+                        samples = cdo.CameraSamples(tdeCam, timeList)
+                writerOptions.samples = samples
+            camJobs.append((cam, (exportType, writer,
+                                  writerCam, writerOptions)))
+
+    workers = getWorkerCount(options.workers, len(camJobs))
+    if workers <= 1:
+        jobOutputs = map(runExportJob, [x[1] for x in camJobs])
+    else:
+        pool = ThreadPool(processes=workers)
+        try:
+            jobOutputs = pool.map(runExportJob, [x[1] for x in camJobs])
+        finally:
+            pool.close()
+            pool.join()
+
+    if manifest != None:
+        with instrumentation.span('manifest'):
+            writeManifest(manifest, cams, camJobs, jobOutputs,
+                          optionsHashes)
+    print('Distortion Converter Finished!')
+    return True
+
+
+def convertFile(path, export=None):
+    """Convert a file, with the default options.
+
+    export - A dict mapping of export types with booleans,
+    see setExportFlags().
+
+    Returns True or False."""
+    options = ConverterOptions()
+    options.inputFile = str(path)
+    options.inputTime = '<all>'
+    options.outputDir = '<same>'
+    setExportFlags(options, export)
+    return exportData(options)
 
 
-if __name__ == '__main__':
-    root = Tk()
-    gui = MMDistortionConverter(master=root)
-    gui.master.title(cdo.projectTitle)
-    gui.mainloop()
-
 def runWindow():
-    root = Tk()
-    gui = MMDistortionConverter(master=root)
-    gui.master.title(cdo.projectTitle)
-    gui.mainloop()
+    """Open the user interface, Tkinter is only imported now."""
+    import mmDistortionConverterGui
+    return mmDistortionConverterGui.runWindow()
+
+
+def parseArguments(args):
+    """Parse the command line arguments.
+
+    Returns a ConverterOptions object, or None if the user
+    interface was asked for."""
+    usage = ('usage: %prog [options] <Matchmover file>\n'
+             '       %prog --gui')
+    parser = optparse.OptionParser(usage=usage, version=cdo.projectVersion)
+    parser.add_option('-g', '--gui', dest='gui', action='store_true',
+                      default=False,
+                      help='open the user interface, the default '
+                           'when no arguments are given')
+    parser.add_option('-t', '--time', dest='time', default='<all>',
+                      help="frames to export, for example '1-36' or '2,34'")
+    parser.add_option('-o', '--output-dir', dest='outputDir',
+                      default='<same>',
+                      help='directory to write files to')
+    parser.add_option('-e', '--export', dest='export', default=None,
+                      help=('comma separated export types, one of %s' %
+                            ', '.join(exportTypes)))
+    parser.add_option('-j', '--workers', dest='workers', type='int',
+                      default=None,
+                      help='number of exporter threads, '
+                           'default is one per CPU')
+    parser.add_option('-i', '--incremental', dest='incremental',
+                      action='store_true', default=False,
+                      help='only write files that are out of date')
+    parser.add_option('--curve-tolerance', dest='curveTolerance',
+                      type='float', default=None,
+                      help=('drop curve keys that linear interpolation '
+                            'recreates within this tolerance'))
+    parser.add_option('--rdp', dest='curveRdp', action='store_true',
+                      default=False,
+                      help=('also drop curve keys with the '
+                            'Ramer-Douglas-Peucker algorithm'))
+    parser.add_option('--st-map-cache', dest='stMapCacheDir', default=None,
+                      help=('directory to keep ST-map warp maps in, '
+                            'to reuse them in later runs'))
+    parser.add_option('--read-processes', dest='readProcesses', type='int',
+                      default=1,
+                      help=('number of processes to parse the shots of '
+                            'the Matchmover file with, 0 is one per CPU'))
+    parser.add_option('--time-window', dest='timeWindow',
+                      action='store_true', default=False,
+                      help=('only read the frames of the Matchmover file '
+                            'in the time given with -t'))
+    parser.add_option('--cache', dest='sceneCache', action='store_true',
+                      default=False,
+                      help=('keep the parsed Matchmover file in a '
+                            'cache file, to read it faster next time'))
+    parser.add_option('--cache-dir', dest='sceneCacheDir', default=None,
+                      help=('directory to write cache files to, '
+                            'default is next to the Matchmover file'))
+    parser.add_option('--timing', dest='timingReport', action='store_true',
+                      default=False,
+                      help='print the time spent in each step')
+    parser.add_option('--trace', dest='traceFile', default=None,
+                      help='write the time spent in each step to a '
+                           'Chrome trace file')
+    opts, paths = parser.parse_args(args)
+    if opts.gui or len(args) == 0:
+        return None
+    if len(paths) != 1:
+        parser.error('one Matchmover file must be given')
+
+    options = ConverterOptions()
+    options.inputFile = paths[0]
+    options.inputTime = opts.time
+    options.outputDir = opts.outputDir
+    options.workers = opts.workers
+    options.incremental = opts.incremental
+    options.curveTolerance = opts.curveTolerance
+    options.curveRdp = opts.curveRdp
+    options.stMapCacheDir = opts.stMapCacheDir
+    options.readProcesses = opts.readProcesses
+    if options.readProcesses <= 0:
+        options.readProcesses = None
+    options.timeWindow = opts.timeWindow
+    options.sceneCache = opts.sceneCache or opts.sceneCacheDir != None
+    options.sceneCacheDir = opts.sceneCacheDir
+    options.timingReport = opts.timingReport
+    options.traceFile = opts.traceFile
+    export = None
+    if opts.export != None:
+        export = dict()
+        for name in opts.export.split(','):
+            name = name.strip()
+            if name not in exportTypes:
+                parser.error('unknown export type %s' % repr(name))
+            export[name] = True
+    setExportFlags(options, export)
+    return options
+
+
+if __name__ == '__main__':
+    options = parseArguments(sys.argv[1:])
+    if options == None:
+        runWindow()
+    elif not exportData(options):
+        sys.exit(1)
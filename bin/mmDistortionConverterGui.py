@@ -0,0 +1,230 @@
+"""The user interface of the distortion converter, asks for a file
+and the file formats to export, then converts the file.
+
+Tkinter is only imported with this module, so converting files from
+the command line (see mmDistortionConverter.py) does not need Tk.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import platform
+
+# Tk GUI
+from Tkinter import *
+import tkFileDialog
+
+# # IDLE custom Tkinter (Tabs)
+# from idlelib.tabbedpages import TabbedPageSet
+
+import commonDataObjects as cdo
+import mmDistortionConverter as mdc
+
+
+class MMDistortionConverter(Frame):
+    """Class that asks for a file path using a GUI."""
+
+    def __init__ (self, master=None, path=None, export=None):
+        """Creates the user interface if no path is given, 
+        else uses export keyword to export file types or if export is not given, 
+        exports every file format.
+
+        master - Used by tkinter library.
+        path - An input file name to convert.
+        export - A dict mapping of export types with booleans, 
+        for example, nukeDistNode:True.
+
+        Returns nothing."""
+        self.os = str(platform.system()).lower()
+
+        # get the file path.
+        if path != None:
+            mdc.convertFile(path, export)
+            return
+
+        # Start Options GUI 
+        Frame.__init__(self, master)
+        Pack.config(self)
+
+        # The main Frame
+        mainFrame = Frame(self)
+        mainFrame.pack(fill=BOTH, expand=1, padx=5, pady=5)
+
+        # Input/Output
+        self.inputFile = StringVar()
+        self.inputTime = StringVar()
+        self.outputDir = StringVar()
+        self.outputDir.set('<same>')
+        self.inputTime.set('<all>')
+        inOutFrame = LabelFrame(mainFrame, text='File/Directories...', relief=GROOVE, borderwidth=2)
+        inOutFrame.pack(fill=BOTH,expand=1)
+
+        # Input File
+        inFileFrame = Frame(inOutFrame)
+        inFileLabel = Label(inFileFrame, text='Input File:')
+        inFileBtn = Button(inFileFrame, text='...', command=self.getFilePath)
+        self.inFileEntry = Entry(inFileFrame, textvariable=self.inputFile)
+        inFileFrame.pack(fill=BOTH,expand=1)
+        inFileLabel.pack(side=LEFT, padx=5, pady=2)
+        inFileBtn.pack(side=RIGHT, padx=5, pady=2)
+        self.inFileEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
+
+        # Input Time
+        inTimeFrame = Frame(inOutFrame)
+        inTimeLabel = Label(inTimeFrame, text='Input Time:')
+        self.inTimeEntry = Entry(inTimeFrame, textvariable=self.inputTime)
+        inTimeFrame.pack(fill=BOTH,expand=1)
+        inTimeLabel.pack(side=LEFT, padx=5, pady=2)
+        self.inTimeEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
+
+        # Output Directory
+        outDirFrame = Frame(inOutFrame)
+        outDirLabel = Label(outDirFrame, text='Output Directory:')
+        outDirBtn = Button(outDirFrame, text='...', command=self.getDirectoryPath)
+        self.outDirEntry = Entry(outDirFrame, textvariable=self.outputDir)
+        outDirFrame.pack(fill=BOTH,expand=1)
+        outDirLabel.pack(side=LEFT, padx=5, pady=2)
+        outDirBtn.pack(side=RIGHT, padx=5, pady=2)
+        self.outDirEntry.pack(side=RIGHT, fill=X, expand=1, padx=5, pady=2)
+        
+        # Output Formats
+        outFormatsFrame = LabelFrame(mainFrame, text='Export File Formats...', relief=GROOVE, borderwidth=2)
+        outFormatsFrame.pack(fill=BOTH,expand=1)
+
+        # Export Nuke Distortion Node
+        self.exportNukeDistNode = BooleanVar()
+        nukeDistFrame = Frame(outFormatsFrame)
+        nukeDistChk = Checkbutton(nukeDistFrame, text='Nuke Distortion Node', variable=self.exportNukeDistNode)
+        # nukeDistBtn = Button(nukeDistFrame, text='Options...', state='disabled', command=self.exportNukeDistNodeOptions)
+        nukeDistFrame.pack(fill=BOTH,expand=1)
+        nukeDistChk.pack(side=LEFT, padx=5, pady=2)
+        # nukeDistBtn.pack(side=LEFT, fill=BOTH)
+
+        # Export 3DE Lens File
+        self.exportTdeLens = BooleanVar()
+        tdeLensFrame = Frame(outFormatsFrame)
+        tdeLensChk = Checkbutton(tdeLensFrame, text='3DE Lens File', variable=self.exportTdeLens)
+        tdeLensFrame.pack(fill=BOTH,expand=1)
+        tdeLensChk.pack(side=LEFT, padx=5, pady=2)
+
+        # Export 3DE Raw Text (Human readable)
+        self.exportRawText = BooleanVar()
+        rawTextFrame = Frame(outFormatsFrame)
+        rawTextChk = Checkbutton(rawTextFrame, text='3DE Human Readable Text', variable=self.exportRawText)
+        rawTextFrame.pack(fill=BOTH,expand=1)
+        rawTextChk.pack(side=LEFT, padx=5, pady=2)
+
+        # Export Warp4 Batch Script
+        self.exportWarpBatch = BooleanVar()
+        warpBatchFrame = Frame(outFormatsFrame)
+        warpBatchChk = Checkbutton(warpBatchFrame, text='Warp4 Batch Script', variable=self.exportWarpBatch)
+        warpBatchBtn = Button(warpBatchFrame, text='Options...', state='disabled', command=self.exportWarpBatchOptions)
+        warpBatchFrame.pack(fill=BOTH,expand=1)
+        warpBatchChk.pack(side=LEFT, padx=5, pady=2)
+        warpBatchBtn.pack(side=LEFT, fill=BOTH)
+
+        # Export DistoIma Batch Script
+        self.exportDistoBatch = BooleanVar()
+        distoBatchFrame = Frame(outFormatsFrame)
+        distoBatchChk = Checkbutton(distoBatchFrame, text='DistoIma Batch Script', variable=self.exportDistoBatch)
+        distoBatchBtn = Button(distoBatchFrame, text='Options...', state='disabled', command=self.exportDistoBatchOptions)
+        distoBatchFrame.pack(fill=BOTH,expand=1)
+        distoBatchChk.pack(side=LEFT, padx=5, pady=2)
+        distoBatchBtn.pack(side=LEFT, fill=BOTH)
+
+        # # Export Maya 3D Camera
+        # self.exportMayaCam = BooleanVar()
+        # mayaCamFrame = Frame(outFormatsFrame)
+        # mayaCamChk = Checkbutton(mayaCamFrame, text='Maya 3D Camera', variable=self.exportMayaCam)
+        # mayaCamFrame.pack(fill=BOTH,expand=1)
+        # mayaCamChk.pack(side=LEFT, padx=5, pady=2)
+
+        # # Export Maya 2.5D Points
+        # self.exportMaya25D = BooleanVar()
+        # maya25DFrame = Frame(outFormatsFrame)
+        # maya25DChk = Checkbutton(maya25DFrame, text='Maya 2.5D Points', variable=self.exportMaya25D)
+        # maya25DFrame.pack(fill=BOTH,expand=1)
+        # maya25DChk.pack(side=LEFT, padx=5, pady=2)
+
+        # End Frame
+        buttonsFrame = Frame(mainFrame, pady=2)
+        okBtn = Button(buttonsFrame, text='Ok',
+                       command=self.exportDataFromGui)
+        exitBtn = Button(buttonsFrame, text='Exit',
+                         command=self.quit,
+                         padx=6, pady=3)
+        buttonsFrame.pack(side=BOTTOM, fill=BOTH,expand=1)
+        okBtn.pack(side=LEFT, fill=BOTH, padx=20, pady=3)
+        exitBtn.pack(side=RIGHT, fill=BOTH, padx=20, pady=3)
+        return
+
+    def exportDataFromGui(self):
+        options = mdc.ConverterOptions()
+        options.inputFile = self.inputFile.get()
+        options.inputTime = self.inputTime.get()
+        options.outputDir = self.outputDir.get()
+        options.exportNukeDistNode = self.exportNukeDistNode.get()
+        options.exportRawText = self.exportRawText.get()
+        options.exportTdeLens = self.exportTdeLens.get()
+        options.exportWarpBatch = self.exportWarpBatch.get()
+        options.exportDistoBatch = self.exportDistoBatch.get()
+        self.exportData(options)
+        return
+
+    def exportData(self, options):
+        """Exports data, see mmDistortionConverter.exportData()."""
+        return mdc.exportData(options)
+
+    def exportNukeDistNodeOptions(self):
+        print 'get the Nuke Distortion Node options!'
+        return
+
+    def exportWarpBatchOptions(self):
+        print 'get the Warp4 options!'
+        return
+
+    def exportDistoBatchOptions(self):
+        print 'get the DistoIma options!'
+        return
+
+    def getFilePath(self):
+        """Asks the user for a file name."""
+        filePath = None
+        result = tkFileDialog.askopenfilename(filetypes=[('RZML', '*.rzml')],
+                                              multiple=False, 
+                                              title=cdo.projectTitle)
+        if len(result) == 0:
+            filePath = None
+        else:
+            filePath = result
+            self.inputFile.set(filePath)
+        # return filePath
+        return
+
+    def getDirectoryPath(self):
+        """Asks the user for a file name."""
+        dirPath = None
+        # NOTE: Perhaps we should use an environment variable
+        # to set the initial directory for this dialog?
+        result = tkFileDialog.askdirectory(initialdir=os.getcwd,
+                                           mustexist=False, 
+                                           title=cdo.projectTitle)
+        if len(result) == 0:
+            dirPath = None
+        else:
+            dirPath = result
+            self.outputDir.set(dirPath)
+        return
+
+
+def runWindow():
+    root = Tk()
+    gui = MMDistortionConverter(master=root)
+    gui.master.title(cdo.projectTitle)
+    gui.mainloop()
+
+
+if __name__ == '__main__':
+    runWindow()
@@ -4,9 +4,12 @@
 # Licensed under the GNU General Public License, 
 # see "COPYING.txt" for more details.
 
+import sys
 import os
 import os.path as p
 import math
+import tempfile
+import subprocess
 
 import commonDataObjects as cdo
 import mmFileReader
@@ -17,6 +20,61 @@ import tdeWriteWetaNukeDistortionNode
 import mmDistortionConverter as mdc
 
 
+def readOutputFiles(outDir):
+    """Get a dict of file name to file contents, for every file."""
+    outFiles = dict()
+    for fileName in os.listdir(outDir):
+        f = open(p.join(outDir, fileName), 'r')
+        outFiles[fileName] = f.read()
+        f.close()
+    return outFiles
+
+
 def main(filePath):
-    gui = mdc.MMDistortionConverter(path=filePath)
+    assert mdc.convertFile(filePath) == True
+
+    # Converting from the command line does not import Tkinter.
+    code = ('import sys, mmDistortionConverter; '
+            'sys.exit(int(sys.modules.has_key("Tkinter")))')
+    assert subprocess.call([sys.executable, '-c', code]) == 0
+
+    # No arguments, or '--gui', opens the user interface.
+    assert mdc.parseArguments([]) == None
+    assert mdc.parseArguments(['--gui']) == None
+    options = mdc.parseArguments(['-t', '1-10', '-e', 'rawText,tdeLens',
+                                  '-o', '/tmp', '--timing', filePath])
+    assert options.inputFile == filePath
+    assert options.inputTime == '1-10'
+    assert options.outputDir == '/tmp'
+    assert options.timingReport == True
+    assert options.exportRawText == True
+    assert options.exportTdeLens == True
+    assert options.exportNukeDistNode == False
+    assert options.exportStMap == False
+    assert options.stMapCacheDir == None
+
+    # The ST-map cache directory is given to the ST-map exporter.
+    options = mdc.parseArguments(['-e', 'stMap', '--st-map-cache', '/tmp',
+                                  filePath])
+    assert options.stMapCacheDir == '/tmp'
+    jobs = mdc.getExportJobs(options)
+    assert [x[2].cacheDir for x in jobs] == ['/tmp']
+
+    # Exporting with many threads writes the same files as with one.
+    outFiles = list()
+    for workers in [1, 4]:
+        tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+        options = mdc.ConverterOptions()
+        options.inputFile = filePath
+        options.inputTime = '<all>'
+        options.outputDir = tmpDir
+        options.workers = workers
+        mdc.setExportFlags(options)
+        assert mdc.exportData(options) == True
+        outFiles.append(readOutputFiles(tmpDir))
+    assert len(outFiles[0]) > 0
+    assert outFiles[0] == outFiles[1]
+    assert mdc.getWorkerCount(None, 3) >= 1
+    assert mdc.getWorkerCount(8, 3) == 3
+    assert mdc.getWorkerCount(2, 0) == 1
     return True
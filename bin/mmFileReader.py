@@ -10,14 +10,31 @@ To calculate a focal length from a FOV like this
 # Licensed under the GNU General Public License,
 # see "COPYING.txt" for more details.
 
+import re
+import copy
 import math
+import array
 import os
 import os.path as p
+import mmap
 import platform
+import threading
+import multiprocessing as mp
 
 import commonDataObjects as cdo
+import sceneCache
+
+# NumPy is optional, it is used to convert the frames of a shot at once.
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import xml.dom.minidom as xdm
+try:
+    import xml.etree.cElementTree as etree
+except ImportError:
+    import xml.etree.ElementTree as etree
 
 
 class Options(object):
@@ -25,6 +42,29 @@ class Options(object):
         self.filePath = None
         self.time = None
 
+        # Read the file incrementally, rather than loading the whole
+        # document into memory, see readRZMLStream().
+        self.streaming = False
+
+        # Keep the parsed file in a binary cache file, read instead of
+        # the Matchmover file while it is unchanged, see sceneCache.
+        self.cache = False
+        # Directory for the cache files, None to write each cache
+        # file next to its Matchmover file.
+        self.cacheDir = None
+
+        # Parse the shots of the file in this many processes, see
+        # readRZMLParallel(). None is one per CPU.
+        self.processes = 1
+
+        # Read the frames of each camera when the camera is first
+        # used, see readRZMLLazy(). Not cached.
+        self.lazy = False
+
+        # Only read the frames in the time, and the frames either side
+        # of them, see FrameWindow. Not cached.
+        self.timeWindow = False
+
 
 currentPlatform = str(platform.system()).lower()
 def getKey(attrs, key, dataType, default=None):
@@ -67,6 +107,229 @@ def getAttrs(node):
     return attrs
 
 
+# The attributes of a CFRM tag, as (name, converter, default) tuples,
+# in the order readAttrs() returns them. Read once per frame, so the
+# converters are worked out here, rather than by getKey() each time.
+frameSchema = (('t', int, 0),
+               ('fovx', float, None),
+               ('pr', float, 1.0),
+               ('rd', float, 0.0))
+
+
+def readAttrs(schema, attrs):
+    """Get the values of the schema attributes from an ElementTree
+    element's attributes, the default if the attribute is missing."""
+    values = list()
+    for name, convert, default in schema:
+        value = attrs.get(name)
+        if value == None:
+            values.append(default)
+        else:
+            values.append(convert(value))
+    return values
+
+
+def readNodeAttrs(schema, node):
+    """The same as readAttrs(), for a minidom node."""
+    attrs = node.attributes
+    values = list()
+    for name, convert, default in schema:
+        at = attrs.get(name)
+        if at == None:
+            values.append(default)
+        else:
+            values.append(convert(at.value))
+    return values
+
+
+def readRawAttrs(schema, attrs):
+    """Get the schema attributes from an ElementTree element's
+    attributes as strings, None if the attribute is missing."""
+    return [attrs.get(x[0]) for x in schema]
+
+
+def readRawNodeAttrs(schema, node):
+    """The same as readRawAttrs(), for a minidom node."""
+    attrs = node.attributes
+    values = list()
+    for name, convert, default in schema:
+        at = attrs.get(name)
+        if at == None:
+            values.append(None)
+        else:
+            values.append(at.value)
+    return values
+
+
+def convertAttrs(schema, values):
+    """Convert the strings from readRawAttrs() the same as readAttrs()."""
+    converted = list()
+    for i, (name, convert, default) in enumerate(schema):
+        value = values[i]
+        if value == None:
+            converted.append(default)
+        else:
+            converted.append(convert(value))
+    return converted
+
+
+class FrameWindow(object):
+    """Picks the CFRM tags of a shot to read, for a time list.
+
+    The frames in the time list are read, and the nearest frame on
+    each side of them, so the curves have the same values inside the
+    time list as when every frame is read. Only the frame number of
+    the other frames is converted, the rest are never stored.
+
+    The frames must be added in increasing order, as they are in an
+    rzml file.
+    """
+    def __init__(self, timeList):
+        """timeList - A cdo.TimeSelection, see cdo.parseTimeString()."""
+        assert isinstance(timeList, cdo.TimeSelection)
+        self.timeList = timeList
+        self.starts = timeList.starts
+        self.ends = timeList.ends
+
+        # The range of the time list the last frame was in, or before.
+        self.rangeIndex = 0
+
+        # The frame number and attributes of the last frame added.
+        self.previousFrame = None
+        self.previous = None
+        self.previousRead = False
+        self.previousSelected = False
+        self.readCount = 0
+
+    def isSelected(self, frame):
+        """Is the frame in the time list? The frames increase, so
+        the ranges before the last frame are never looked at again."""
+        ends = self.ends
+        i = self.rangeIndex
+        while i < len(ends) and ends[i] < frame:
+            i += 1
+        self.rangeIndex = i
+        return i < len(ends) and self.starts[i] <= frame
+
+    def hasFramesBetween(self, start, end):
+        """Are any frames selected from start to end, inclusive?"""
+        if start > end:
+            return False
+        return next(self.timeList.getFrames(start, end), None) != None
+
+    def addFrame(self, attrs):
+        """Add the next frame, attrs are the strings of frameSchema,
+        see readRawAttrs().
+
+        Returns a list of the converted values of the frames to read,
+        which can include the frame before."""
+        frame = attrs[0]
+        if frame == None:
+            frame = frameSchema[0][2]
+        else:
+            frame = int(frame)
+        read = list()
+        selected = self.isSelected(frame)
+        previous = self.previous
+        if selected:
+            if previous != None and not self.previousRead:
+                read.append(previous)
+            read.append(attrs)
+        elif previous == None:
+            # The first frame, some frames are selected before it.
+            if len(self.starts) > 0 and self.starts[0] < frame:
+                read.append(attrs)
+        elif self.previousSelected:
+            read.append(attrs)
+        elif self.hasFramesBetween(self.previousFrame+1, frame-1):
+            # Frames are selected between the two frames, but the
+            # shot has no keys for them, so both frames are needed.
+            if not self.previousRead:
+                read.append(previous)
+            read.append(attrs)
+        self.previousFrame = frame
+        self.previous = attrs
+        self.previousRead = len(read) > 0 and read[-1] is attrs
+        self.previousSelected = selected
+        self.readCount += len(read)
+        return [convertAttrs(frameSchema, x) for x in read]
+
+    def finish(self):
+        """Returns a list of the converted values of the frames to
+        read, once all frames are added."""
+        if self.previous == None or self.previousRead:
+            return []
+        if ((len(self.ends) > 0 and self.ends[-1] > self.previousFrame)
+                or self.readCount == 0):
+            # Some frames are selected after the last frame, or no
+            # frames were read, a curve needs at least one key.
+            self.readCount += 1
+            return [convertAttrs(frameSchema, self.previous)]
+        return []
+
+
+def getTimeWindow(options):
+    """Get the time list to read the frames of, or None to read every
+    frame, see FrameWindow."""
+    if not options.timeWindow:
+        return None
+    return cdo.parseTimeString(options.time)
+
+
+class ShotFrames(object):
+    """Collects the fovx and distortion of each CFRM tag of a shot,
+    so the curves of the shot camera are worked out from all of the
+    frames at once, by finishShot().
+    """
+    def __init__(self, timeList=None):
+        """timeList - Only the frames in the time list are added, all
+        frames if None, see FrameWindow."""
+        self.frames = array.array('i')
+        self.fovx = array.array('d')
+        self.distortion = array.array('d')
+        self.window = None
+        if timeList != None:
+            self.window = FrameWindow(timeList)
+
+    def addFrame(self, values):
+        """Add the values of a CFRM tag, read with frameSchema."""
+        frame, fovx, pixelRatio, dst = values
+        assert frame >= 0
+        self.frames.append(frame)
+        self.fovx.append(fovx)
+        self.distortion.append(dst)
+        return True
+
+    def addRawFrame(self, attrs):
+        """Add the strings of a CFRM tag, read with readRawAttrs(),
+        if the frame is needed by the time list."""
+        for values in self.window.addFrame(attrs):
+            self.addFrame(values)
+        return True
+
+    def finish(self):
+        """Add the last frames needed by the time list, if any."""
+        if self.window != None:
+            for values in self.window.finish():
+                self.addFrame(values)
+        return True
+
+
+def getFrameRange(attrs, fpsType='int'):
+    """Return the time range of TRNG attributes as a tuple (start, end, fps)."""
+    trim = getKey(attrs, 't', 'int')
+    length = getKey(attrs, 'd', 'int')
+
+    startFrame = int()
+    endFrame = int()
+    startFrame = trim
+    if length != None:
+        endFrame = trim+(length-1)
+
+    fps = getKey(attrs, 'f', fpsType)
+    return (startFrame, endFrame, fps)
+
+
 def getGlobalFrameRange(dom, options):
     """Return the global time range of the file as a tuple (start, end, fps)."""
     trng = dom.getElementsByTagName("TRNG")
@@ -78,146 +341,167 @@ def getGlobalFrameRange(dom, options):
         if parNode != None and parNode.nodeName == 'RZML':
             attrs = getAttrs(node)
 
-    trim = getKey(attrs, 't', 'int')
-    length = getKey(attrs, 'd', 'int')
-
-    startFrame = int()
-    endFrame = int()
-    startFrame = trim
-    if length != None:
-        endFrame = trim+(length-1)
-
-    fps = getKey(attrs, 'f', 'int')
+    startFrame, endFrame, fps = getFrameRange(attrs)
     assert startFrame < endFrame
     assert fps >= 0
     return (startFrame, endFrame, fps)
 
 
+def createCamera(attrs):
+    """Create a camera object from the attributes of a CINF tag."""
+    cam = cdo.MMCameraData()
+
+    cam.name = getKey(attrs, 'n', 'str')
+    cam.index = getKey(attrs, 'i', 'int')
+
+    cam.width = getKey(attrs, 'sw', 'int', default=512)
+    cam.height = getKey(attrs, 'sh', 'int', default=512)
+    cam.imageAspectRatio = float(cam.width)/float(cam.height)
+
+    cam.filmbackHeight = getKey(attrs, 'fbh', 'float', default=24.0)
+    cam.pixelAspectRatio = getKey(attrs, 'a', 'float', default=1.0)
+    cam.filmbackWidth = float(cam.filmbackHeight*cam.imageAspectRatio)
+    cam.filmAspectRatio = float(cam.filmbackWidth/cam.filmbackHeight)
+
+    cam.lensCentreX = getKey(attrs, 'ppx', 'float', default=0.5)
+    cam.lensCentreY = getKey(attrs, 'ppy', 'float', default=0.5)
+
+    cam.focalLength = cdo.KeyframeData(static=True)
+    cam.focalLength.setValue(30.0, 0)
+    assert cam.focalLength.length == 1
+
+    cam.focal = cdo.KeyframeData(static=True)
+    cam.focal.setValue(1550.0, 0)
+    assert cam.focal.length == 1
+
+    cam.distortion = cdo.KeyframeData(static=True)
+    cam.distortion.setValue(0.0, 0)
+    assert cam.distortion.length == 1
+    return cam
+
+
 def getCameras(dom, options):
     cams = list()
     cinfs = dom.getElementsByTagName("CINF")
     for node in cinfs:
         attrs = getAttrs(node)
+        cam = createCamera(attrs)
+        cams.append(cam)
+    return cams
 
-        # create camera object and fill in information.
-        cam = cdo.MMCameraData()
 
-        cam.name = getKey(attrs, 'n', 'str')
-        cam.index = getKey(attrs, 'i', 'int')
+def getShotCamera(attrs, cams):
+    """Get the camera a SHOT tag links to, or None."""
+    # Get cam index from shot, loop over cams
+    # and get the camera that this shot links to.
+    shotCam = None
+    camIndex = getKey(attrs, 'ci', 'int', default=1)
+    if camIndex != 0:
+        for cam in cams:
+            if cam.index == camIndex:
+                shotCam = cam
+    return shotCam
 
-        cam.width = getKey(attrs, 'sw', 'int', default=512)
-        cam.height = getKey(attrs, 'sh', 'int', default=512)
-        cam.imageAspectRatio = float(cam.width)/float(cam.height)
 
-        cam.filmbackHeight = getKey(attrs, 'fbh', 'float', default=24.0)
-        cam.pixelAspectRatio = getKey(attrs, 'a', 'float', default=1.0)
-        cam.filmbackWidth = float(cam.filmbackHeight*cam.imageAspectRatio)
-        cam.filmAspectRatio = float(cam.filmbackWidth/cam.filmbackHeight)
+def createShot(attrs, cams):
+    """Create a sequence object from the attributes of a SHOT tag.
 
-        cam.lensCentreX = getKey(attrs, 'ppx', 'float', default=0.5)
-        cam.lensCentreY = getKey(attrs, 'ppy', 'float', default=0.5)
+    The camera the shot links to has its animated curves reset, ready
+    for the frames of the shot to be added with finishShot().
 
-        cam.focalLength = cdo.KeyframeData(static=True)
-        cam.focalLength.setValue(30.0, 0)
-        assert cam.focalLength.length == 1
+    Returns a tuple of the sequence and the linked camera."""
+    shot = cdo.MMSequenceData()
 
-        cam.focal = cdo.KeyframeData(static=True)
-        cam.focal.setValue(1550.0, 0)
-        assert cam.focal.length == 1
+    shotCam = getShotCamera(attrs, cams)
+    assert shotCam != None
+    shot.cameraIndex = int(shotCam.index)
+    shot.cameraName = str(shotCam.name)
 
-        cam.distortion = cdo.KeyframeData(static=True)
-        cam.distortion.setValue(0.0, 0)
-        assert cam.distortion.length == 1
+    # put shot data into shot object.
+    shot.name = str(getKey(attrs, 'n', 'str'))
+    shot.index = str(getKey(attrs, 'i', 'str'))
 
-        cams.append(cam)
-    return cams
+    shot.width = int(getKey(attrs, 'w', 'int'))
+    shot.height = int(getKey(attrs, 'h', 'int'))
+    shot.imageAspectRatio = float(shot.width)/float(shot.height)
 
+    shotCam.focalLength = cdo.KeyframeData()
+    shotCam.focal = cdo.KeyframeData()
+    shotCam.distortion = cdo.KeyframeData()
+    return shot, shotCam
 
-def getShots(dom, cams, options):
-    timeList = cdo.parseTimeString(options.time)
-    seqDataList = list()
-    shotTag = dom.getElementsByTagName("SHOT")
-    # constant used in the loop.
+
+def getFocalLengths(fovx, filmbackWidth):
+    """Calculate the focal length of each horizontal field of view.
+
+    Uses NumPy if it is available.
+
+    Returns a list of focal lengths, in the units of filmbackWidth."""
     piTwoRad = math.pi/360.0
-    for node in shotTag:
-        shotAttrs = getAttrs(node)
+    halfFbWidth = 0.5*filmbackWidth
+    if np == None:
+        tan = math.tan
+        return [halfFbWidth/tan(piTwoRad*x) for x in fovx]
+    fovx = np.frombuffer(fovx, dtype=np.float64)
+    return (halfFbWidth/np.tan(piTwoRad*fovx)).tolist()
 
-        shot = cdo.MMSequenceData()
 
-        # Get cam index from shot, loop over cams
-        # and get the camera that this shot links to.
-        shotCam = None
-        camIndex = getKey(shotAttrs, 'ci', 'int', default=1)
-        if camIndex != 0:
-            for cam in cams:
-                if cam.index == camIndex:
-                    shotCam = cam
-                    shot.cameraIndex = int(camIndex)
-        shot.cameraName = str(cam.name)
-        assert shotCam != None
+def finishShot(shot, shotCam, shotFrames):
+    """Set the curves of the shot camera from the frames of the shot,
+    once all frames are added, and simplify them.
 
-        # put shot data into shot object.
-        shot.name = str(getKey(shotAttrs, 'n', 'str'))
-        shot.index = str(getKey(shotAttrs, 'i', 'str'))
+    shotFrames - The ShotFrames the frames of the shot were added to."""
+    shotFrames.finish()
 
-        shot.width = int(getKey(shotAttrs, 'w', 'int'))
-        shot.height = int(getKey(shotAttrs, 'h', 'int'))
-        shot.imageAspectRatio = float(shot.width)/float(shot.height)
+    # calculate focal length (from the FOV) and the "focal" attribute.
+    assert isinstance(shotCam.filmbackWidth, float)
+    filmbackWidth = shotCam.filmbackWidth
+    focalLengths = getFocalLengths(shotFrames.fovx, filmbackWidth)
+    width = float(shot.width)
+    focals = [(x*width)/filmbackWidth for x in focalLengths]
 
-        shotCam.focalLength = cdo.KeyframeData()
-        shotCam.focal = cdo.KeyframeData()
-        shotCam.distortion = cdo.KeyframeData()
+    frames = shotFrames.frames
+    shotCam.focalLength.setKeyValues(frames, focalLengths)
+    shotCam.focal.setKeyValues(frames, focals)
+    shotCam.distortion.setKeyValues(frames, shotFrames.distortion)
+
+    shotCam.focalLength.simplifyData()
+    shotCam.focal.simplifyData()
+    shotCam.distortion.simplifyData()
+
+    shotCam.sequences.append(shot)
+    return True
+
+
+def getShots(dom, cams, options):
+    timeList = getTimeWindow(options)
+    seqDataList = list()
+    shotTag = dom.getElementsByTagName("SHOT")
+    for node in shotTag:
+        shotAttrs = getAttrs(node)
+        shot, shotCam = createShot(shotAttrs, cams)
+        shotFrames = ShotFrames(timeList)
 
         # # initialise list of sequences for camera.
         # shotCam.sequences = list()
 
         # loop over all frames in the shot.
-        halfFbWidth = 0.5*shotCam.filmbackWidth
         for childNode in node.childNodes:
             if childNode.nodeName == 'IPLN':
                 imgAttrs = getAttrs(childNode)
                 shot.imagePath = getKey(imgAttrs, 'img', 'path')
             elif childNode.nodeName == 'TRNG':
                 trngAttrs = getAttrs(childNode)
-                trim = getKey(trngAttrs, 't', 'int')
-                length = getKey(trngAttrs, 'd', 'int')
-                startFrame = int()
-                endFrame = int()
-                startFrame = trim
-                if length != None:
-                    endFrame = trim+(length-1)
-                fps = getKey(trngAttrs, 'f', 'float')
-                shot.frameRange = (startFrame, endFrame, fps)
+                shot.frameRange = getFrameRange(trngAttrs, fpsType='float')
+            elif childNode.nodeName == 'CFRM' and timeList == None:
+                frameValues = readNodeAttrs(frameSchema, childNode)
+                shotFrames.addFrame(frameValues)
             elif childNode.nodeName == 'CFRM':
-                frameAttrs = getAttrs(childNode)
-
-                frame = getKey(frameAttrs, 't', 'int')
-                if frame == None:
-                    frame = int(0)
-                assert frame >= 0
-
-                # ensure the frame is valid.
-                # if cdo.isFrameInTimeList(frame, timeList):
-                
-                fovx = getKey(frameAttrs, 'fovx', 'float')
-                pixelRatio = getKey(frameAttrs, 'pr', 'float', default=float(1))
-                dst = getKey(frameAttrs, 'rd', 'float', default=0.0)
-                fovy = float(fovx)/float(pixelRatio)
-
-                # calculate focal length (from the FOV) and the "focal" attribute.
-                assert isinstance(shotCam.filmbackWidth, float)
-                focalLength = (halfFbWidth)/(math.tan(piTwoRad*fovx))
-                focal = (focalLength*float(shot.width))/shotCam.filmbackWidth
-
-                shotCam.focal.setValue(focal, frame)
-                shotCam.focalLength.setValue(focalLength, frame)
-                shotCam.distortion.setValue(dst, frame)
-
-        shotCam.focalLength.simplifyData()
-        shotCam.focal.simplifyData()
-        shotCam.distortion.simplifyData()
+                # only read the frames in the time list.
+                frameAttrs = readRawNodeAttrs(frameSchema, childNode)
+                shotFrames.addRawFrame(frameAttrs)
 
-        shotCam.sequences.append(shot)
+        finishShot(shot, shotCam, shotFrames)
 
         seqDataList.append(shot)
 
@@ -225,8 +509,423 @@ def getShots(dom, cams, options):
     return seqDataList
 
 
+def readRZMLStream(options):
+    """Reads the rzml file incrementally, one tag at a time.
+
+    The document is never held in memory as a whole, each tag is
+    removed from the document as soon as it has been read, so the
+    memory used stays the same, no matter how many frames are in
+    the file.
+
+    Returns a MMSceneData object, the same as readRZML()."""
+    assert options.filePath != None
+    filePath = options.filePath
+    timeList = getTimeWindow(options)
+
+    globalFrameRange = None
+    cameras = list()
+    shots = list()
+    shot = None
+    shotCam = None
+    shotFrames = None
+
+    # The tags that are currently open, the last is the current parent.
+    parents = list()
+    events = etree.iterparse(filePath, events=('start', 'end'))
+    for event, elem in events:
+        if event == 'start':
+            if elem.tag == 'SHOT' and parents[-1].tag == 'RZML':
+                shot, shotCam = createShot(elem.attrib, cameras)
+                shotFrames = ShotFrames(timeList)
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if len(parents) == 0:
+            # The end of the document.
+            elem.clear()
+            break
+        parent = parents[-1]
+
+        if elem.tag == 'TRNG' and parent.tag == 'RZML':
+            globalFrameRange = getFrameRange(elem.attrib)
+        elif elem.tag == 'CINF' and parent.tag == 'RZML':
+            cam = createCamera(elem.attrib)
+            cameras.append(cam)
+        elif elem.tag == 'SHOT' and parent.tag == 'RZML':
+            finishShot(shot, shotCam, shotFrames)
+            shots.append(shot)
+            shot = None
+            shotCam = None
+            shotFrames = None
+        elif elem.tag == 'TRNG' and parent.tag == 'SHOT':
+            shot.frameRange = getFrameRange(elem.attrib, fpsType='float')
+        elif elem.tag == 'IPLN' and parent.tag == 'SHOT':
+            shot.imagePath = getKey(elem.attrib, 'img', 'path')
+        elif elem.tag == 'CFRM' and parent.tag == 'SHOT':
+            if timeList == None:
+                shotFrames.addFrame(readAttrs(frameSchema, elem.attrib))
+            else:
+                shotFrames.addRawFrame(readRawAttrs(frameSchema, elem.attrib))
+
+        # We are finished with the tag, free it.
+        elem.clear()
+        parent.remove(elem)
+
+    assert globalFrameRange != None
+    assert globalFrameRange[0] < globalFrameRange[1]
+    assert globalFrameRange[2] >= 0
+
+    project = cdo.MMSceneData()
+    project.name = p.split(filePath)[1]
+    project.index = int()
+    project.path = filePath
+    project.cameras = cameras
+    project.sequences = shots
+    project.frameRange = globalFrameRange
+    return project
+
+
+# Matches the start of a SHOT tag, and the end of a SHOT tag.
+shotStartPattern = re.compile(r'<SHOT[\s/>]')
+shotEndPattern = re.compile(r'</SHOT\s*>')
+declarationPattern = re.compile(r'<\?xml[^>]*\?>')
+
+
+def getShotRanges(data):
+    """Get the (start, end) byte ranges of the SHOT tags in the
+    contents of an rzml file.
+
+    SHOT tags are only written as children of the RZML tag, so every
+    SHOT tag found is one shot."""
+    ranges = list()
+    pos = 0
+    while True:
+        match = shotStartPattern.search(data, pos)
+        if match == None:
+            break
+        start = match.start()
+        tagEnd = data.find('>', start)
+        assert tagEnd != -1
+        if data[tagEnd-1] == '/':
+            # A shot with no frames.
+            end = tagEnd+1
+        else:
+            endMatch = shotEndPattern.search(data, tagEnd)
+            assert endMatch != None
+            end = endMatch.end()
+        ranges.append((start, end))
+        pos = end
+    return ranges
+
+
+def readShot(elem, cams, timeList=None):
+    """Create a sequence from a SHOT element and its children.
+
+    timeList - Only the frames in the time list are read, all frames
+    if None, see FrameWindow.
+
+    Returns a tuple of the sequence and the linked camera."""
+    shot, shotCam = createShot(elem.attrib, cams)
+    shotFrames = ShotFrames(timeList)
+    for child in elem:
+        if child.tag == 'TRNG':
+            shot.frameRange = getFrameRange(child.attrib, fpsType='float')
+        elif child.tag == 'IPLN':
+            shot.imagePath = getKey(child.attrib, 'img', 'path')
+        elif child.tag == 'CFRM' and timeList == None:
+            shotFrames.addFrame(readAttrs(frameSchema, child.attrib))
+        elif child.tag == 'CFRM':
+            shotFrames.addRawFrame(readRawAttrs(frameSchema, child.attrib))
+    finishShot(shot, shotCam, shotFrames)
+    return shot, shotCam
+
+
+class FileIndex(object):
+    """The parts of an rzml file found by indexFile()."""
+    def __init__(self):
+        self.declaration = str()
+        # The (start, end) byte range of each SHOT tag.
+        self.shotRanges = list()
+        # The attributes of each SHOT tag.
+        self.shotAttrs = list()
+        self.frameRange = None
+        self.cameras = list()
+
+
+def indexFile(filePath):
+    """Find the SHOT tags of an rzml file, and read everything else.
+
+    Only the SHOT tags themselves are read, not their children (the
+    frames), so this is quick even when there are many frames.
+
+    Returns a FileIndex object."""
+    index = FileIndex()
+    f = open(filePath, 'rb')
+    data = None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index.shotRanges = getShotRanges(data)
+        match = declarationPattern.match(data)
+        if match != None:
+            index.declaration = match.group(0)
+        header = list()
+        pos = 0
+        for start, end in index.shotRanges:
+            header.append(data[pos:start])
+            pos = end
+            tag = data[start:data.find('>', start)+1]
+            if not tag.endswith('/>'):
+                tag = tag[:-1]+'/>'
+            elem = etree.fromstring(index.declaration+tag)
+            index.shotAttrs.append(elem.attrib)
+        header.append(data[pos:])
+    finally:
+        if data != None:
+            data.close()
+        f.close()
+
+    root = etree.fromstring(str().join(header))
+    for elem in root:
+        if elem.tag == 'TRNG':
+            index.frameRange = getFrameRange(elem.attrib)
+        elif elem.tag == 'CINF':
+            index.cameras.append(createCamera(elem.attrib))
+    assert index.frameRange != None
+    assert index.frameRange[0] < index.frameRange[1]
+    assert index.frameRange[2] >= 0
+    return index
+
+
+def readShotElement(filePath, declaration, start, end):
+    """Parse the SHOT tag in the byte range of an rzml file.
+
+    Returns the SHOT element, with all its children."""
+    f = open(filePath, 'rb')
+    try:
+        f.seek(start)
+        data = f.read(end-start)
+    finally:
+        f.close()
+    return etree.fromstring(declaration+data)
+
+
+def readShotRange(args):
+    """Parse one SHOT tag of an rzml file, used by each worker process.
+
+    args is a tuple of (file path, XML declaration, start, end, cameras,
+    time list), see readShot() for the time list.
+
+    Returns a tuple of the sequence, the index of the linked camera in
+    cameras, and the focal length, focal and distortion curves."""
+    filePath, declaration, start, end, cams, timeList = args
+    # Copy the cameras, so the caller's cameras are not changed
+    # when this is run in the same process.
+    cams = copy.deepcopy(cams)
+    elem = readShotElement(filePath, declaration, start, end)
+    shot, shotCam = readShot(elem, cams, timeList)
+    curves = (shotCam.focalLength, shotCam.focal, shotCam.distortion)
+    return (shot, cams.index(shotCam)) + curves
+
+
+def readRZMLParallel(options):
+    """Reads the rzml file, parsing each SHOT tag in a pool of processes.
+
+    The file is split into the byte range of each SHOT tag, and the
+    rest of the file. The rest of the file (the global time range and
+    cameras) is parsed first, then the shots are parsed at the same
+    time and added to their cameras in the order of the file.
+
+    Returns a MMSceneData object, the same as readRZML()."""
+    assert options.filePath != None
+    filePath = options.filePath
+    timeList = getTimeWindow(options)
+    index = indexFile(filePath)
+    cameras = index.cameras
+
+    jobs = list()
+    for start, end in index.shotRanges:
+        jobs.append((filePath, index.declaration, start, end, cameras,
+                     timeList))
+    processes = options.processes
+    if processes == None:
+        processes = 1
+        try:
+            processes = mp.cpu_count()
+        except NotImplementedError:
+            pass
+    processes = min(processes, len(jobs))
+    if processes <= 1:
+        results = map(readShotRange, jobs)
+    else:
+        pool = mp.Pool(processes=processes)
+        try:
+            # The results are in the same order as the jobs.
+            results = pool.map(readShotRange, jobs)
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    shots = list()
+    for shot, camIndex, focalLength, focal, distortion in results:
+        shotCam = cameras[camIndex]
+        shotCam.focalLength = focalLength
+        shotCam.focal = focal
+        shotCam.distortion = distortion
+        shotCam.sequences.append(shot)
+        shots.append(shot)
+
+    project = cdo.MMSceneData()
+    project.name = p.split(filePath)[1]
+    project.index = int()
+    project.path = filePath
+    project.cameras = cameras
+    project.sequences = shots
+    project.frameRange = index.frameRange
+    return project
+
+
+def lazyAttr(name):
+    """A camera attribute that is read from the file when first used."""
+    def getValue(self):
+        if not self._loaded:
+            self._scene.loadCamera(self)
+        return self.__dict__[name]
+    def setValue(self, value):
+        self.__dict__[name] = value
+    return property(getValue, setValue)
+
+
+class LazyCameraData(cdo.MMCameraData):
+    """A Matchmover camera that reads its shots and animated curves
+    from the file the first time they are used, see readRZMLLazy()."""
+    focalLength = lazyAttr('focalLength')
+    focal = lazyAttr('focal')
+    distortion = lazyAttr('distortion')
+    sequences = lazyAttr('sequences')
+
+    def __init__(self, cam, scene):
+        self._loaded = True
+        cdo.MMCameraData.__init__(self)
+        self.__dict__.update(vars(cam))
+        self._scene = scene
+        self._loaded = False
+        # True while the camera is read, so reading the shots can use
+        # the attributes without reading the camera again.
+        self._loading = False
+
+
+class LazySceneData(cdo.MMSceneData):
+    """A Matchmover scene that only reads the frames of a camera when
+    the camera's curves or sequences are first used.
+
+    The sequences of the scene are read as they are used, all cameras
+    are read when the scene's sequences are used. A camera can be used
+    from many threads, it is only read once."""
+    def __init__(self, filePath, index, timeList=None):
+        cdo.MMSceneData.__init__(self)
+        self.name = p.split(filePath)[1]
+        self.index = int()
+        self.path = filePath
+        self.frameRange = index.frameRange
+        self.cameras = [LazyCameraData(x, self) for x in index.cameras]
+        self._fileIndex = index
+        self._timeList = timeList
+        self._shots = [None]*len(index.shotRanges)
+        self._lock = threading.RLock()
+
+        # The camera of each shot.
+        self._shotCameras = list()
+        for attrs in index.shotAttrs:
+            shotCam = getShotCamera(attrs, self.cameras)
+            assert shotCam != None
+            self._shotCameras.append(shotCam)
+
+    def getSequences(self):
+        for cam in self.cameras:
+            if not cam._loaded:
+                self.loadCamera(cam)
+        return list(self._shots)
+
+    def setSequences(self, value):
+        self._shots = value
+
+    sequences = property(getSequences, setSequences)
+
+    def getCamera(self, name):
+        """Get the camera with the name given, or None."""
+        for cam in self.cameras:
+            if cam.name == name:
+                return cam
+        return None
+
+    def loadCamera(self, cam):
+        """Read the shots of the camera, and its animated curves.
+
+        The camera is only marked as loaded once every shot is read."""
+        assert cam in self.cameras
+        self._lock.acquire()
+        try:
+            if cam._loaded or cam._loading:
+                return True
+            cam._loading = True
+            try:
+                index = self._fileIndex
+                for i, shotCam in enumerate(self._shotCameras):
+                    if shotCam is not cam:
+                        continue
+                    start, end = index.shotRanges[i]
+                    elem = readShotElement(self.path, index.declaration,
+                                           start, end)
+                    shot, shotCam = readShot(elem, [cam], self._timeList)
+                    self._shots[i] = shot
+                cam._loaded = True
+            finally:
+                cam._loading = False
+        finally:
+            self._lock.release()
+        return True
+
+
+def readRZMLLazy(options):
+    """Reads the cameras of the rzml file, and finds its shots.
+
+    The shots and frames of each camera are read the first time the
+    camera's curves or sequences are used.
+
+    Returns a LazySceneData object."""
+    assert options.filePath != None
+    timeList = getTimeWindow(options)
+    index = indexFile(options.filePath)
+    return LazySceneData(options.filePath, index, timeList)
+
+
 def readRZML(options):
     assert options.filePath != None
+    if options.lazy:
+        return readRZMLLazy(options)
+    if not options.cache or options.timeWindow:
+        return readRZMLFile(options)
+
+    cachePath = sceneCache.getCachePath(options.filePath, options.cacheDir)
+    project = sceneCache.readCache(cachePath, options.filePath)
+    if project == None:
+        project = readRZMLFile(options)
+        sceneCache.writeCache(cachePath, options.filePath, project)
+    return project
+
+
+def readRZMLFile(options):
+    """Parses the rzml file, ignoring any cache file."""
+    assert options.filePath != None
+    if options.processes != 1:
+        return readRZMLParallel(options)
+    if options.streaming:
+        return readRZMLStream(options)
+
     filePath = options.filePath
     dom = xdm.parse(filePath)
 
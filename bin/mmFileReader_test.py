@@ -7,6 +7,8 @@
 import os
 import os.path as p
 import math
+import array
+import threading
 
 import commonDataObjects as cdo
 import mmFileReader as mfr
@@ -16,6 +18,29 @@ import tdeWriteWetaNukeDistortionNode
 import mmDistortionConverter as mdc
 import test
 
+def assertProjectsEqual(project, otherProject):
+    assert otherProject.name == project.name
+    assert otherProject.frameRange == project.frameRange
+    assert len(otherProject.cameras) == len(project.cameras)
+    assert len(otherProject.sequences) == len(project.sequences)
+    for cam, otherCam in zip(project.cameras, otherProject.cameras):
+        assert otherCam.name == cam.name
+        assert otherCam.index == cam.index
+        assert otherCam.filmbackWidth == cam.filmbackWidth
+        assert otherCam.pixelAspectRatio == cam.pixelAspectRatio
+        assert len(otherCam.sequences) == len(cam.sequences)
+        for attr in ['focalLength', 'focal', 'distortion']:
+            keys = getattr(cam, attr)
+            otherKeys = getattr(otherCam, attr)
+            assert otherKeys.static == keys.static
+            assert otherKeys.getKeyValues() == keys.getKeyValues()
+    for seq, otherSeq in zip(project.sequences, otherProject.sequences):
+        assert otherSeq.name == seq.name
+        assert otherSeq.cameraIndex == seq.cameraIndex
+        assert otherSeq.imagePath == seq.imagePath
+        assert otherSeq.frameRange == seq.frameRange
+
+
 def main(filePath):
     readOptions = mfr.Options()
     readOptions.filePath = filePath
@@ -91,4 +116,103 @@ def main(filePath):
             assert seq.frameRange != None
             assert len(seq.frameRange) == 3
 
+    # Test the streaming reader gives the same data as the DOM reader.
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    project = mfr.readRZML(readOptions)
+    readOptions.streaming = True
+    assertProjectsEqual(project, mfr.readRZML(readOptions))
+
+    # Shots parsed in other processes are added back in file order.
+    readOptions.streaming = False
+    for processes in [1, 2]:
+        readOptions.processes = processes
+        assertProjectsEqual(project, mfr.readRZMLParallel(readOptions))
+    ranges = mfr.getShotRanges(open(filePath, 'rb').read())
+    assert len(ranges) == len(project.sequences)
+
+    # A lazy scene reads a camera's frames when first used.
+    readOptions.processes = 1
+    readOptions.lazy = True
+    lazyProject = mfr.readRZML(readOptions)
+    for cam in lazyProject.cameras:
+        assert cam._loaded == False
+    cam = lazyProject.getCamera(project.cameras[-1].name)
+    assert cam.focalLength != None
+    assert cam._loaded == True
+    assert lazyProject.cameras[0]._loaded == (cam is lazyProject.cameras[0])
+    assertProjectsEqual(project, lazyProject)
+
+    # A camera used from many threads at once is read once.
+    lazyProject = mfr.readRZML(readOptions)
+    cam = lazyProject.cameras[-1]
+    results = list()
+    def useCamera():
+        results.append(len(cam.sequences))
+    threads = [threading.Thread(target=useCamera) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cam._loaded == True
+    assert results == [len(project.cameras[-1].sequences)]*len(threads)
+    assertProjectsEqual(project, lazyProject)
+
+    readOptions.lazy = False
+
+    # Reading only the frames in the time gives the same values for
+    # those frames, and keeps the frames either side of them, with
+    # every reader.
+    for time in ['2-5', '3,7,20-22', '600-610,700', '5000-6000']:
+        timeList = cdo.parseTimeString(time)
+        for reader in [mfr.readRZMLFile, mfr.readRZMLStream,
+                       mfr.readRZMLParallel, mfr.readRZMLLazy]:
+            windowOptions = mfr.Options()
+            windowOptions.filePath = filePath
+            windowOptions.time = time
+            windowOptions.timeWindow = True
+            windowProject = reader(windowOptions)
+            for cam, windowCam in zip(project.cameras,
+                                      windowProject.cameras):
+                for attr in ['focalLength', 'focal', 'distortion']:
+                    keys = getattr(cam, attr)
+                    windowKeys = getattr(windowCam, attr)
+                    assert windowKeys.length <= keys.length
+                    for frame in timeList:
+                        value = keys.getValue(frame)
+                        assert abs(windowKeys.getValue(frame)-value) < 1e-9
+
+    window = mfr.FrameWindow(cdo.parseTimeString('5-6,9'))
+    read = list()
+    for frame in [1, 2, 4, 5, 6, 7, 8, 10, 11]:
+        attrs = [str(frame), '40.0', None, None]
+        read += [x[0] for x in window.addFrame(attrs)]
+    read += [x[0] for x in window.finish()]
+    assert read == [4, 5, 6, 7, 8, 10]
+
+    # Focal lengths are the same with and without NumPy.
+    fovx = array.array('d', [10.0, 35.5, 90.0])
+    expected = [12.0/math.tan((math.pi/360.0)*x) for x in fovx]
+    assert mfr.getFocalLengths(fovx, 24.0) == expected
+    numpy = mfr.np
+    mfr.np = None
+    try:
+        assert mfr.getFocalLengths(fovx, 24.0) == expected
+    finally:
+        mfr.np = numpy
+
+    # The frame schema gives the same values as getKey(), for
+    # both ElementTree and minidom tags.
+    for attrs in [{'t': '3', 'fovx': '41.5', 'rd': '-0.01'},
+                  {'fovx': '30', 'pr': '2'}]:
+        values = [mfr.getKey(attrs, 't', 'int', default=0),
+                  mfr.getKey(attrs, 'fovx', 'float'),
+                  mfr.getKey(attrs, 'pr', 'float', default=1.0),
+                  mfr.getKey(attrs, 'rd', 'float', default=0.0)]
+        assert mfr.readAttrs(mfr.frameSchema, attrs) == values
+        node = mfr.xdm.Document().createElement('CFRM')
+        for name, value in attrs.items():
+            node.setAttribute(name, value)
+        assert mfr.readNodeAttrs(mfr.frameSchema, node) == values
+
     return True
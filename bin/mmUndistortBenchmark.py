@@ -0,0 +1,200 @@
+"""Compares the speed and accuracy of the ways to solve the Matchmover
+undistortion expression for every pixel of an image.
+
+The per-pixel (scalar) form of the expression in
+'docs/matchmoverDistortionExpression.txt' is the reference, every other
+method is compared to it.
+
+Usage:
+    python2 mmUndistortBenchmark.py [options]
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import time
+import optparse
+
+import commonDataObjects as cdo
+import imageDistortion as idi
+
+# The methods benchmarked, in the order printed.
+scalarMethod = 'scalar'
+fixedPointMethod = 'fixedPoint'
+methods = [scalarMethod,
+           fixedPointMethod,
+           idi.mmCubicMethod,
+           idi.mmNewtonMethod]
+
+
+class Options(object):
+    """Options that can be passed to the benchmark."""
+    def __init__(self):
+        self.width = 640
+        self.height = 360
+        self.distortion = -0.1
+        self.focal = 1000.0
+        self.alpha = 1.0
+
+        # Number of times each method is run, the fastest is reported.
+        self.repeat = 3
+
+
+class BenchmarkResult(object):
+    """The speed and accuracy of a single method."""
+    def __init__(self):
+        self.method = None
+        self.seconds = 0.0
+        self.pixelsPerSecond = 0.0
+
+        # The largest distance (in pixels) from the scalar form.
+        self.maxError = 0.0
+
+        # The largest distance (in pixels) from the starting position,
+        # after removing the distortion again.
+        self.maxRoundTripError = 0.0
+
+
+def applyScalar(x, y, width, height, params):
+    """Apply the distortion one pixel at a time."""
+    np = idi.np
+    outX = np.zeros(x.shape, dtype=np.float64)
+    outY = np.zeros(y.shape, dtype=np.float64)
+    flatX = x.ravel()
+    flatY = y.ravel()
+    flatOutX = outX.ravel()
+    flatOutY = outY.ravel()
+    func = idi.mmApplyDistortionPixel
+    for i in xrange(flatX.size):
+        flatOutX[i], flatOutY[i] = func(float(flatX[i]), float(flatY[i]),
+                                        width, height, **params)
+    return (outX, outY)
+
+
+def applyFixedPoint(x, y, width, height, params):
+    """Apply the distortion with the general inverse, used by lens
+    models without a function to apply distortion directly."""
+    def removeFunc(srcX, srcY):
+        return idi.mmRemoveDistortion(srcX, srcY, width, height, **params)
+    return idi.invertDistortion(removeFunc, x, y)
+
+
+def getApplyFunc(method):
+    """Get a function(x, y, width, height, params) for a method."""
+    if method == scalarMethod:
+        return applyScalar
+    elif method == fixedPointMethod:
+        return applyFixedPoint
+    def func(x, y, width, height, params):
+        return idi.mmApplyDistortion(x, y, width, height,
+                                     method=method, **params)
+    return func
+
+
+def getMaxDistance(x1, y1, x2, y2):
+    """The largest distance between two sets of positions."""
+    np = idi.np
+    dist = np.hypot(x1-x2, y1-y2)
+    if not np.isfinite(dist).all():
+        return float('inf')
+    return float(dist.max())
+
+
+def printResults(results, options):
+    print('Matchmover undistortion, %dx%d pixels, '
+          'distortion=%r, focal=%r, alpha=%r' %
+          (options.width, options.height, options.distortion,
+           options.focal, options.alpha))
+    scalarSeconds = None
+    for result in results:
+        if result.method == scalarMethod:
+            scalarSeconds = result.seconds
+    print('%-12s %10s %14s %9s %12s %12s' %
+          ('Method', 'Seconds', 'Pixels/Second', 'Speed-up',
+           'Max Error', 'Round Trip'))
+    for result in results:
+        speedUp = '-'
+        if scalarSeconds != None and result.seconds > 0.0:
+            speedUp = '%.1fx' % (scalarSeconds/result.seconds)
+        print('%-12s %10.4f %14.0f %9s %12.3e %12.3e' %
+              (result.method, result.seconds, result.pixelsPerSecond,
+               speedUp, result.maxError, result.maxRoundTripError))
+    return True
+
+
+def main(options):
+    """Benchmark every method.
+
+    Returns a list of BenchmarkResult objects, in the order of methods."""
+    idi.requireNumpy()
+    np = idi.np
+    width = options.width
+    height = options.height
+    params = {'distortion': options.distortion,
+              'focal': options.focal,
+              'alpha': options.alpha}
+    y, x = np.mgrid[0:height, 0:width].astype(np.float64)
+    numPixels = width*height
+
+    results = list()
+    refX = None
+    refY = None
+    for method in methods:
+        func = getApplyFunc(method)
+        best = None
+        for i in range(max(options.repeat, 1)):
+            startTime = time.time()
+            outX, outY = func(x, y, width, height, params)
+            seconds = time.time()-startTime
+            if best == None or seconds < best:
+                best = seconds
+        if method == scalarMethod:
+            refX, refY = outX, outY
+        undistX, undistY = idi.mmRemoveDistortion(outX, outY, width, height,
+                                                  **params)
+        result = BenchmarkResult()
+        result.method = method
+        result.seconds = best
+        if best > 0.0:
+            result.pixelsPerSecond = numPixels/best
+        result.maxError = getMaxDistance(outX, outY, refX, refY)
+        result.maxRoundTripError = getMaxDistance(undistX, undistY, x, y)
+        results.append(result)
+    printResults(results, options)
+    return results
+
+
+def parseArguments(args):
+    """Parse the command line arguments into an Options object."""
+    usage = 'usage: %prog [options]'
+    parser = optparse.OptionParser(usage=usage, version=cdo.projectVersion)
+    defaults = Options()
+    parser.add_option('-W', '--width', dest='width', type='int',
+                      default=defaults.width, help='image width')
+    parser.add_option('-H', '--height', dest='height', type='int',
+                      default=defaults.height, help='image height')
+    parser.add_option('-d', '--distortion', dest='distortion', type='float',
+                      default=defaults.distortion,
+                      help='Matchmover distortion value')
+    parser.add_option('-f', '--focal', dest='focal', type='float',
+                      default=defaults.focal, help='focal, in pixels')
+    parser.add_option('-a', '--alpha', dest='alpha', type='float',
+                      default=defaults.alpha, help='pixel aspect ratio')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                      default=defaults.repeat,
+                      help='number of runs of each method')
+    opts, args = parser.parse_args(args)
+    options = Options()
+    options.width = opts.width
+    options.height = opts.height
+    options.distortion = opts.distortion
+    options.focal = opts.focal
+    options.alpha = opts.alpha
+    options.repeat = opts.repeat
+    return options
+
+
+if __name__ == '__main__':
+    main(parseArguments(sys.argv[1:]))
@@ -0,0 +1,25 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import imageDistortion as idi
+import mmUndistortBenchmark as mub
+
+
+def main(filePath):
+    if idi.np == None:
+        print('Skipping undistortion benchmark tests, '
+              'NumPy is not available.')
+        return True
+    options = mub.parseArguments(['-W', '64', '-H', '36', '-r', '1',
+                                  '-d', '-0.05', '-f', '100'])
+    assert options.width == 64 and options.height == 36
+    results = mub.main(options)
+    assert [x.method for x in results] == mub.methods
+    for result in results:
+        assert result.seconds >= 0.0
+        assert result.maxError < 1e-6
+        assert result.maxRoundTripError < 1e-6
+    return True
@@ -116,8 +116,149 @@ class Options(object):
         # if None, use input image extension.
         self.outImageExt = 'jpg'
 
+        # image files of the sequence, if None the sequence path is searched.
+        self.images = None
+
+
+def getCommandTemplate(cam):
+    """Get the DistoIma command, with '!NAME!' place holders for
+    the values that change per frame."""
+    binPath = getDistoImaExec()
+    args = list()
+    args.append(binPath)
+    args.append('!ACTION FLAG!')
+    args.append('!DISTO!')
+    args.append('-v')
+    args.append('!OVERSCAN FLAG!')
+    args.append('-f')
+    args.append('!FOCAL!')
+    args.append('-k')
+    args.append('%.15f' % cam.filmbackWidth)
+    args.append('-a')
+    args.append('%.15f' % cam.pixelAspectRatio)
+    args.append('-p')
+    args.append('%.15f,%.15f' % (cam.lensCentreX*cam.width,
+                                 cam.lensCentreY*cam.height))
+    args.append('-q') # JPEG Quality, 100.
+    args.append('100')
+    args.append('-b')
+    args.append('!FRAME!')
+    args.append('-e')
+    args.append('!FRAME!')
+    args.append('"!IN!"')
+    args.append('"!OUT!"')
+
+    # create command string
+    cmdTemplate = str()
+    for arg in args:
+        cmdTemplate += '%s ' % arg
+    return cmdTemplate
+
+
+def getFrameCommand(cam, options, cmdTemplate, action, suffix,
+                    imgPath, timeList):
+    """Get the DistoIma command for a single image of the sequence.
+
+    The focal length curve of cam must already be simplified.
+
+    Returns a tuple of (frame number, command, input image path,
+    output image path, lens parameters), or None if the frame is not
+    inside the time list. The lens parameters are a dict of every
+    value given to DistoIma, other than the image paths."""
+    seq = cam.sequences[0]
+    seqPad = cdo.getImageSequencePadding(seq.imagePath)
+    seqStart, seqEnd = cdo.splitImageSequencePath(seq.imagePath)
+    focalData = cam.focalLength
+
+    overscan = lookupOverscanFlag(options.useOverscan)
+    cmd = str(cmdTemplate)
+    cmd = cmd.replace('!ACTION FLAG!', action)
+    cmd = cmd.replace('!OVERSCAN FLAG!', overscan)
+
+    # Get the frame number from image path.
+    frameNum = cdo.getImagePathFrameNumber(seq.imagePath, imgPath)
+    # print 'frameNum:', repr(frameNum)
+
+    # only output frames that are valid.
+    if not cdo.isFrameInTimeList(frameNum, timeList):
+        return None
+
+    # Set Distortion Parameter.
+    d = 0.0
+    if isinstance(cam.distortion, cdo.KeyframeData):
+        d = cam.distortion.getValue(frameNum)
+        assert d != None
+    cmd = cmd.replace('!DISTO!', str(d))
+
+    # Set Focal Length
+    fl = 0.0
+    if isinstance(focalData, cdo.KeyframeData):
+        fl = focalData.getValue(frameNum)
+        assert fl != None
+    cmd = cmd.replace('!FOCAL!', str(fl))
+
+    params = {'action': action,
+              'overscan': overscan,
+              'distortion': d,
+              'focal': fl,
+              'filmbackWidth': cam.filmbackWidth,
+              'pixelAspect': cam.pixelAspectRatio,
+              'lensCentre': (cam.lensCentreX*cam.width,
+                             cam.lensCentreY*cam.height)}
+
+    # Get image paths
+    frameStr = str(frameNum).zfill(seqPad)
+    inImgPath = seqStart+frameStr+seqEnd
+    outImgPath = cdo.getOutputImagePath(seqStart, seqEnd,
+                                        suffix, frameNum,
+                                        seqPad,
+                                        ext=options.outImageExt)
+
+    # Replace in/out paths.
+    cmd = cmd.replace('!FRAME!', str(frameNum))
+    cmd = cmd.replace('!IN!', cdo.convertUnixToWinePath(inImgPath))
+    cmd = cmd.replace('!OUT!', cdo.convertUnixToWinePath(outImgPath))
+    return (frameNum, cmd, inImgPath, outImgPath, params)
+
+
+def getFrameCommands(cam, options, action):
+    """Get the DistoIma commands for every image of the sequence,
+    to be run one at a time rather than written to scripts.
+
+    DistoIma is a Windows program, on other operating systems the
+    commands are run with Wine.
+
+    action - '-u' (undistort) or '-d' (distort).
+
+    Returns a list of tuples, as given by getFrameCommand()."""
+    timeList = cdo.parseTimeString(options.time)
+    assert isinstance(cam, cdo.MMCameraData)
+    commands = list()
+    if len(cam.sequences) == 0 or cam.sequences[0].imagePath == None:
+        return commands
+    images = options.images
+    if images == None:
+        images = cdo.getAllImageSequence(cam.sequences[0].imagePath)
+    suffix = options.fileSuffix+'_undistort'
+    if action == '-d':
+        suffix = options.fileSuffix+'_distort'
+    cmdTemplate = getCommandTemplate(cam)
+    prefix = ''
+    if str(platform.system()).lower() != 'windows':
+        prefix = 'wine '
+    for imgPath in images:
+        command = getFrameCommand(cam, options, cmdTemplate, action,
+                                  suffix, imgPath, timeList)
+        if command != None:
+            command = (command[0], prefix+command[1])+command[2:]
+            commands.append(command)
+    return commands
+
 
 def main(cam, options):
+    """Write the DistoIma batch scripts of a camera.
+
+    Returns a list of the files written."""
     filePath = options.filePath
     assert filePath != None
     outDir = options.outDir
@@ -132,52 +273,23 @@ def main(cam, options):
                        "image path given is invalid, '%s'.")
     if seq.imagePath == None:
         print(invalidImageMsg % seq.imagePath)
-        return True
+        return list()
 
     # Get Image Sequence variables.
-    imageSeq = seq.imagePath
-    images = cdo.getAllImageSequence(seq.imagePath)
+    images = options.images
+    if images == None:
+        images = cdo.getAllImageSequence(seq.imagePath)
     if len(images) <= 0:
         print(invalidImageMsg % seq.imagePath)
-        return True
-    seqPad = cdo.getImageSequencePadding(seq.imagePath)
-    seqStart, seqEnd = cdo.splitImageSequencePath(seq.imagePath)
-    offset = cdo.getImageSequenceStartFrame(seq.imagePath)
-    # print 'offset:', repr(offset)
+        return list()
 
     # get script file syntax, changes based on Operating System.
-    binPath = getDistoImaExec()
     scriptExt = getScriptFileExt(opsys='windows')
     comChar = getScriptCommentChar(opsys='windows')
     scriptHeader = getScriptHeader(opsys='windows')
     starterScriptExt = getScriptFileExt()
-    starterComChar = getScriptCommentChar()
-    starterScriptHeader = getScriptHeader()
     starterRunScript = getRunCommand()
-
-    args = list()
-    args.append(binPath)
-    args.append('!ACTION FLAG!')
-    args.append('!DISTO!')
-    args.append('-v')
-    args.append('!OVERSCAN FLAG!')
-    args.append('-f')
-    args.append('!FOCAL!')
-    args.append('-k')
-    args.append('%.15f' % cam.filmbackWidth)
-    args.append('-a')
-    args.append('%.15f' % cam.pixelAspectRatio)
-    args.append('-p')
-    args.append('%.15f,%.15f' % (cam.lensCentreX*cam.width,
-                                 cam.lensCentreY*cam.height))
-    args.append('-q') # JPEG Quality, 100.
-    args.append('100')
-    args.append('-b')
-    args.append('!FRAME!')
-    args.append('-e')
-    args.append('!FRAME!')
-    args.append('"!IN!"')
-    args.append('"!OUT!"')
+    cmdTemplate = getCommandTemplate(cam)
 
     actions = ['-u',
                '-d']
@@ -185,14 +297,13 @@ def main(cam, options):
                     cdo.exportDesc.mmDistortScript]
     suffixes = ['undistort',
                 'distort']
+    outPaths = list()
     for i in range(len(actions)):
         action = actions[i]
         desc = descriptions[i]
         suffix = options.fileSuffix+'_'+suffixes[i]
         preAction = getScriptPreActionCommand(action, opsys='windows')
         scriptFooter = getScriptFooter(action, opsys='windows')
-        starterPreAction = getScriptPreActionCommand(action)
-        starterScriptFooter = getScriptFooter(action)
 
         # Get the output file path
         outFilePath = cdo.createOutFileName(filePath, cam.name, desc, scriptExt, outDir)
@@ -200,11 +311,6 @@ def main(cam, options):
         msg = "Writing DistoIma Script file to '%s'."
         print(msg % outFileName)
 
-        # create command string
-        cmdTemplate = str()
-        for arg in args:
-            cmdTemplate += '%s ' % arg
-            
         # Write the start-up script.
         starterFilePath = str(outFilePath)
         assert starterFilePath.endswith('.'+scriptExt)
@@ -219,6 +325,7 @@ def main(cam, options):
                 cmdFilePath = p.abspath(outFilePath.replace('!CPU!', str(cpu)))
                 f.write(starterRunScript % cmdFilePath)
             f.close()
+        outPaths.append(cmdStarterFilePath)
 
         # loop over number of cores, to write multiple files out.
         imagePathsCutUp = list()
@@ -236,62 +343,21 @@ def main(cam, options):
                 f.write(comChar+' Camera Name: '+str(cam.name)+os.linesep)
                 f.write(preAction)
 
-                # write distortion parameters
-                focalData = cam.focalLength
-                focalData.simplifyData()
-
                 # write out per-frame commands.
                 for imgPath in imagePathsCutUp:
-                    overscan = lookupOverscanFlag(options.useOverscan)
-                    cmd = str(cmdTemplate)
-                    cmd = cmd.replace('!ACTION FLAG!', action)
-                    cmd = cmd.replace('!OVERSCAN FLAG!', overscan)
-
-                    # Get the frame number from image path.
-                    frameNum = cdo.getImagePathFrameNumber(imageSeq, imgPath)
-                    # print 'frameNum:', repr(frameNum)
-
-                    # only output frames that are valid.
-                    if cdo.isFrameInTimeList(frameNum, timeList):
-
-                        # Set Distortion Parameter.
-                        d = 0.0
-                        if isinstance(cam.distortion, cdo.KeyframeData):
-                            d = cam.distortion.getValue(frameNum)
-                            assert d != None
-                        cmd = cmd.replace('!DISTO!', str(d))
-
-                        # Set Focal Length
-                        fl = 0.0
-                        if isinstance(focalData, cdo.KeyframeData):
-                            fl = focalData.getValue(frameNum)
-                            assert fl != None
-                        cmd = cmd.replace('!FOCAL!', str(fl))
-
-                        # Get image paths
-                        outImgPath = str()
-                        inImgPath = str()
-                        padStr = '#'*seqPad
-                        frameStr = str(frameNum).zfill(seqPad)
-                        if seqStart.endswith('.'):
-                            outImgPath = seqStart[:-1]+suffix+'.'
-                        elif seqStart.endswith('_'):
-                            outImgPath = seqStart[:-1]+suffix+'_'
-                        elif seqStart.endswith('-'):
-                            outImgPath = seqStart[:-1]+suffix+'-'
-                        else:
-                            outImgPath = seqStart+suffix
-                        # inImgPath = seqStart+padStr+seqEnd
-                        # outImgPath = outImgPath+padStr+'.'+options.outImageExt
-                        inImgPath = seqStart+frameStr+seqEnd
-                        outImgPath = outImgPath+frameStr+'.'+options.outImageExt
-
-                        # Replace in/out paths.
-                        cmd = cmd.replace('!FRAME!', str(frameNum))
-                        cmd = cmd.replace('!IN!', cdo.convertUnixToWinePath(inImgPath))
-                        cmd = cmd.replace('!OUT!', cdo.convertUnixToWinePath(outImgPath))
-                        f.write(cmd+os.linesep+os.linesep)
+                    command = getFrameCommand(cam, options, cmdTemplate,
+                                              action, suffix, imgPath,
+                                              timeList)
+                    if command != None:
+                        frameNum, cmd, inImgPath, outImgPath, params = command
+                        inImgPath = cdo.convertUnixToWinePath(inImgPath)
+                        outImgPath = cdo.convertUnixToWinePath(outImgPath)
+                        f.write(cdo.getUpToDateCommand(cmd, inImgPath,
+                                                       outImgPath,
+                                                       opsys='windows'))
+                        f.write(os.linesep)
 
                 f.write(scriptFooter)
                 f.close()
-    return True
+            outPaths.append(cmdFilePath)
+    return outPaths
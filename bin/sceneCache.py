@@ -0,0 +1,257 @@
+"""Caches a parsed Matchmover file in a binary file, so reading the
+same file again does not need to parse the XML.
+
+The cache file starts with a JSON header, holding the camera and
+sequence attributes and the size, modification time and hash of the
+Matchmover file it was made from. After the header the frames and
+values of each animated curve are stored one after the other, as
+arrays of numbers. The cache file is memory mapped when read, and each
+curve is copied straight out of it.
+
+A cache is only used if the Matchmover file has the same size, and
+either the same modification time or (if the file was only touched)
+the same contents.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import sys
+import os
+import os.path as p
+import mmap
+import json
+import array
+import struct
+import hashlib
+import platform
+import tempfile
+
+import commonDataObjects as cdo
+import exportManifest
+
+# Change this when the layout of the cache file changes.
+cacheVersion = 1
+
+cacheFileExt = '.mmcache'
+cacheMagic = 'MMDTSCN1'
+
+# The magic string, then the size of the header in bytes.
+headerStart = struct.Struct('<8sQ')
+
+curveNames = ['focalLength', 'focal', 'distortion']
+
+# Attributes that are not stored as camera or sequence attributes.
+skipAttrs = ['_software', '_units', 'sequences'] + curveNames
+
+
+def getCachePath(filePath, cacheDir=None):
+    """Get the cache file path for a Matchmover file.
+
+    cacheDir - The directory to store cache files in, if None
+    the cache file is written next to the Matchmover file."""
+    filePath = p.abspath(filePath)
+    if cacheDir == None:
+        return filePath+cacheFileExt
+    key = hashlib.sha1(filePath).hexdigest()
+    return p.join(cacheDir, key+cacheFileExt)
+
+
+def getAttrs(obj):
+    """Get the attributes of a camera or sequence, to store as JSON."""
+    attrs = dict()
+    for name, value in vars(obj).items():
+        if name not in skipAttrs:
+            attrs[name] = value
+    return attrs
+
+
+def setAttrs(obj, attrs):
+    """Set the attributes of a camera or sequence, read from JSON."""
+    for name, value in attrs.items():
+        setattr(obj, str(name), fromJson(value))
+    return obj
+
+
+def fromJson(value):
+    """JSON gives unicode strings and lists, the data objects
+    use byte strings and tuples."""
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return tuple([fromJson(x) for x in value])
+    return value
+
+
+def getHeader(filePath, project, arrays):
+    """Get the JSON header of the cache, adding the arrays of each
+    animated curve to arrays."""
+    stat = os.stat(filePath)
+    offset = 0
+    cameras = list()
+    for cam in project.cameras:
+        curves = dict()
+        for name in curveNames:
+            keys = getattr(cam, name)
+            if keys == None:
+                curves[name] = None
+                continue
+            curve = {'static': keys.static,
+                     'value': keys.value,
+                     'length': keys.length,
+                     'startFrame': keys.startFrame,
+                     'endFrame': keys.endFrame,
+                     'offset': offset}
+            if not keys.static:
+                arrays.append(keys.frames)
+                arrays.append(keys.values)
+                offset = offset + len(keys.frames)*keys.frames.itemsize
+                offset = offset + len(keys.values)*keys.values.itemsize
+            curves[name] = curve
+        sequences = [project.sequences.index(x) for x in cam.sequences]
+        cameras.append({'attrs': getAttrs(cam),
+                        'curves': curves,
+                        'sequences': sequences})
+    header = {
+        'cacheVersion': cacheVersion,
+        'toolVersion': cdo.projectVersion,
+        'platform': str(platform.system()).lower(),
+        'byteOrder': sys.byteorder,
+        'frameItemSize': array.array('i').itemsize,
+        'sourceSize': stat.st_size,
+        'sourceMtime': stat.st_mtime,
+        'sourceHash': exportManifest.hashFile(filePath),
+        'frameRange': project.frameRange,
+        'cameras': cameras,
+        'sequences': [getAttrs(x) for x in project.sequences],
+    }
+    return header
+
+
+def writeCache(cachePath, filePath, project):
+    """Write a parsed Matchmover file to a cache file.
+
+    Returns True if the cache file was written."""
+    arrays = list()
+    header = getHeader(filePath, project, arrays)
+    headerData = json.dumps(header, sort_keys=True)
+    # Start the arrays at a multiple of 8 bytes.
+    padding = -(headerStart.size+len(headerData)) % 8
+    try:
+        cacheDir = p.dirname(cachePath)
+        if not p.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        # Write to a temporary file first, so other processes
+        # never read a half written file.
+        fd, tmpPath = tempfile.mkstemp(suffix=cacheFileExt, dir=cacheDir)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(headerStart.pack(cacheMagic, len(headerData)))
+            f.write(headerData)
+            f.write('\0'*padding)
+            for data in arrays:
+                data.tofile(f)
+        finally:
+            f.close()
+        if os.name == 'nt' and p.isfile(cachePath):
+            os.remove(cachePath)
+        os.rename(tmpPath, cachePath)
+    except (IOError, OSError), e:
+        msg = "Warning: Could not write cache file, '%s': %s"
+        print(msg % (cachePath, e))
+        return False
+    return True
+
+
+def isValid(header, filePath):
+    """Was the cache made from the Matchmover file, as it is now?"""
+    if (header.get('cacheVersion') != cacheVersion or
+        header.get('toolVersion') != cdo.projectVersion or
+        header.get('platform') != str(platform.system()).lower() or
+        header.get('frameItemSize') != array.array('i').itemsize):
+        return False
+    stat = os.stat(filePath)
+    if header.get('sourceSize') != stat.st_size:
+        return False
+    if header.get('sourceMtime') == stat.st_mtime:
+        return True
+    # The file was touched, check the contents are the same.
+    return header.get('sourceHash') == exportManifest.hashFile(filePath)
+
+
+def readArray(data, start, typeCode, length, swap):
+    values = array.array(typeCode)
+    end = start+length*values.itemsize
+    values.fromstring(data[start:end])
+    if swap:
+        values.byteswap()
+    return values, end
+
+
+def createKeyframes(curve, data, dataStart, swap):
+    if curve == None:
+        return None
+    keys = cdo.KeyframeData(static=curve['static'])
+    keys.value = curve['value']
+    keys.length = curve['length']
+    keys.startFrame = curve['startFrame']
+    keys.endFrame = curve['endFrame']
+    if not keys.static:
+        start = dataStart+curve['offset']
+        keys.frames, start = readArray(data, start, 'i', keys.length, swap)
+        keys.values, start = readArray(data, start, 'd', keys.length, swap)
+    return keys
+
+
+def readCache(cachePath, filePath):
+    """Read a parsed Matchmover file from a cache file.
+
+    Returns a MMSceneData object, or None if there is no cache
+    or the cache is out of date."""
+    if not p.isfile(cachePath) or not p.isfile(filePath):
+        return None
+    f = open(cachePath, 'rb')
+    data = None
+    try:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, headerSize = headerStart.unpack(data[:headerStart.size])
+            if magic != cacheMagic:
+                return None
+            headerEnd = headerStart.size+headerSize
+            header = json.loads(data[headerStart.size:headerEnd])
+            if not isValid(header, filePath):
+                return None
+            dataStart = headerEnd + (-headerEnd % 8)
+            swap = header['byteOrder'] != sys.byteorder
+
+            project = cdo.MMSceneData()
+            project.name = p.split(filePath)[1]
+            project.index = int()
+            project.path = filePath
+            project.frameRange = fromJson(header['frameRange'])
+            project.sequences = list()
+            for attrs in header['sequences']:
+                seq = setAttrs(cdo.MMSequenceData(), attrs)
+                project.sequences.append(seq)
+            project.cameras = list()
+            for camHeader in header['cameras']:
+                cam = setAttrs(cdo.MMCameraData(), camHeader['attrs'])
+                for name in curveNames:
+                    keys = createKeyframes(camHeader['curves'][name],
+                                           data, dataStart, swap)
+                    setattr(cam, name, keys)
+                for index in camHeader['sequences']:
+                    cam.sequences.append(project.sequences[index])
+                project.cameras.append(cam)
+        except (EnvironmentError, ValueError, KeyError, IndexError,
+                TypeError, struct.error), e:
+            msg = "Warning: Could not read cache file, '%s': %s"
+            print(msg % (cachePath, e))
+            return None
+    finally:
+        if data != None:
+            data.close()
+        f.close()
+    return project
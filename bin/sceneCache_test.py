@@ -0,0 +1,88 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import shutil
+import tempfile
+
+import mmFileReader as mfr
+import sceneCache
+
+
+def assertKeysEqual(keys, otherKeys):
+    if keys == None:
+        assert otherKeys == None
+        return
+    assert keys.static == otherKeys.static
+    assert keys.value == otherKeys.value
+    assert keys.length == otherKeys.length
+    assert keys.startFrame == otherKeys.startFrame
+    assert keys.endFrame == otherKeys.endFrame
+    if not keys.static:
+        assert keys.frames == otherKeys.frames
+        assert keys.values == otherKeys.values
+        assert keys.frames.typecode == otherKeys.frames.typecode
+        assert keys.values.typecode == otherKeys.values.typecode
+
+
+def assertSceneEqual(projData, cacheData):
+    assert projData.frameRange == cacheData.frameRange
+    assert projData.path == cacheData.path
+    assert len(projData.sequences) == len(cacheData.sequences)
+    for seq, cacheSeq in zip(projData.sequences, cacheData.sequences):
+        assert sceneCache.getAttrs(seq) == sceneCache.getAttrs(cacheSeq)
+        assert isinstance(cacheSeq.cameraName, str)
+    assert len(projData.cameras) == len(cacheData.cameras)
+    for cam, cacheCam in zip(projData.cameras, cacheData.cameras):
+        assert sceneCache.getAttrs(cam) == sceneCache.getAttrs(cacheCam)
+        assert isinstance(cacheCam.name, str)
+        for name in sceneCache.curveNames:
+            assertKeysEqual(getattr(cam, name), getattr(cacheCam, name))
+        assert len(cam.sequences) == len(cacheCam.sequences)
+        for seq in cacheCam.sequences:
+            assert seq in cacheData.sequences
+
+
+def main(filePath):
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    rzmlPath = p.join(tmpDir, p.basename(filePath))
+    shutil.copy2(filePath, rzmlPath)
+    cacheDir = p.join(tmpDir, 'cache')
+
+    readOptions = mfr.Options()
+    readOptions.filePath = rzmlPath
+    projData = mfr.readRZML(readOptions)
+
+    # The first read writes the cache, the next reads it.
+    cachePath = sceneCache.getCachePath(rzmlPath, cacheDir)
+    assert sceneCache.readCache(cachePath, rzmlPath) == None
+    readOptions.cache = True
+    readOptions.cacheDir = cacheDir
+    assertSceneEqual(projData, mfr.readRZML(readOptions))
+    assert p.isfile(cachePath)
+    cacheData = sceneCache.readCache(cachePath, rzmlPath)
+    assert cacheData != None
+    assertSceneEqual(projData, cacheData)
+    assert sceneCache.getCachePath(rzmlPath) == rzmlPath+'.mmcache'
+
+    # A touched file with the same contents keeps the cache.
+    stat = os.stat(rzmlPath)
+    os.utime(rzmlPath, (stat.st_atime, stat.st_mtime+10))
+    assert sceneCache.readCache(cachePath, rzmlPath) != None
+
+    # A changed file does not.
+    open(rzmlPath, 'a').write('\n')
+    assert sceneCache.readCache(cachePath, rzmlPath) == None
+    assertSceneEqual(projData, mfr.readRZML(readOptions))
+    assert sceneCache.readCache(cachePath, rzmlPath) != None
+
+    # A broken cache file is parsed again.
+    open(cachePath, 'wb').write('not a cache file')
+    assert sceneCache.readCache(cachePath, rzmlPath) == None
+    assertSceneEqual(projData, mfr.readRZML(readOptions))
+    shutil.rmtree(tmpDir)
+    return True
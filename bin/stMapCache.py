@@ -0,0 +1,162 @@
+"""Caches warp maps (ST-maps), so each is only calculated once.
+
+Every frame with the same lens model, lens parameters and image size
+uses the same warp map. Maps are kept in memory, and optionally in a
+directory on disk as NumPy (.npy) files so they can be reused by later
+runs. When the directory grows larger than the size allowed, the least
+recently used maps are removed.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import hashlib
+import tempfile
+
+# NumPy is required to store the maps.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Change this when the way maps are calculated changes,
+# so maps from older versions are not used.
+cacheVersion = 2
+
+cacheFileExt = '.npy'
+
+
+def getCacheKey(model, action, width, height, params):
+    """Get the key for a warp map.
+
+    model - The lens model, a cdo.softwareType value.
+    action - The distortion action, remove or apply.
+    width, height - Image Width/Height.
+    params - A dict of the lens model parameters.
+
+    Returns a string."""
+    items = ['v%d' % cacheVersion, str(model), str(action),
+             '%dx%d' % (width, height)]
+    for name in sorted(params.keys()):
+        items.append('%s=%r' % (name, params[name]))
+    return hashlib.sha1('|'.join(items)).hexdigest()
+
+
+class StMapCache(object):
+    """A least recently used cache of warp maps.
+
+    cacheDir - A directory to store maps in, if None maps
+    are only kept in memory.
+    maxBytes - The largest size the cache directory can grow to.
+    maxMemoryEntries - The number of maps to keep in memory.
+    """
+    def __init__(self, cacheDir=None, maxBytes=1024*1024*1024,
+                 maxMemoryEntries=4):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.maxMemoryEntries = maxMemoryEntries
+        self.memory = dict()
+        self.memoryOrder = list()
+        self.hits = 0
+        self.misses = 0
+        if self.cacheDir != None and not p.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    def getFilePath(self, key):
+        return p.join(self.cacheDir, key+cacheFileExt)
+
+    def remember(self, key, maps):
+        """Keep the maps in memory, forgetting the oldest."""
+        if key in self.memory:
+            self.memoryOrder.remove(key)
+        self.memory[key] = maps
+        self.memoryOrder.append(key)
+        while len(self.memoryOrder) > self.maxMemoryEntries:
+            oldKey = self.memoryOrder.pop(0)
+            del self.memory[oldKey]
+        return True
+
+    def get(self, key):
+        """Get the (x, y) maps stored with key, or None."""
+        if key in self.memory:
+            self.remember(key, self.memory[key])
+            return self.memory[key]
+        if self.cacheDir == None:
+            return None
+        filePath = self.getFilePath(key)
+        if not p.isfile(filePath):
+            return None
+        try:
+            data = np.load(filePath, mmap_mode='r')
+        except (IOError, ValueError):
+            return None
+        # Mark the file as recently used.
+        os.utime(filePath, None)
+        maps = (data[0], data[1])
+        self.remember(key, maps)
+        return maps
+
+    def put(self, key, mapX, mapY):
+        """Store the (x, y) maps with key.
+
+        Returns the maps, as stored."""
+        data = np.array([mapX, mapY], dtype=np.float32)
+        maps = (data[0], data[1])
+        self.remember(key, maps)
+        if self.cacheDir == None:
+            return maps
+
+        # Write to a temporary file first, so other processes
+        # never read a half written file.
+        fd, tmpPath = tempfile.mkstemp(suffix=cacheFileExt,
+                                       dir=self.cacheDir)
+        f = os.fdopen(fd, 'wb')
+        np.save(f, data)
+        f.close()
+        filePath = self.getFilePath(key)
+        if os.name == 'nt' and p.isfile(filePath):
+            os.remove(filePath)
+        os.rename(tmpPath, filePath)
+        self.evict()
+        return maps
+
+    def getMaps(self, key, func):
+        """Get the (x, y) maps stored with key, calling func() to
+        calculate the maps if they are not stored yet."""
+        maps = self.get(key)
+        if maps != None:
+            self.hits = self.hits + 1
+            return maps
+        self.misses = self.misses + 1
+        mapX, mapY = func()
+        return self.put(key, mapX, mapY)
+
+    def evict(self):
+        """Remove the least recently used files from the cache
+        directory, until it is smaller than maxBytes."""
+        if self.cacheDir == None:
+            return True
+        files = list()
+        totalBytes = 0
+        for fileName in os.listdir(self.cacheDir):
+            if not fileName.endswith(cacheFileExt):
+                continue
+            filePath = p.join(self.cacheDir, fileName)
+            try:
+                stat = os.stat(filePath)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, filePath))
+            totalBytes = totalBytes + stat.st_size
+        files.sort()
+        while totalBytes > self.maxBytes and len(files) > 1:
+            mtime, size, filePath = files.pop(0)
+            try:
+                os.remove(filePath)
+            except OSError:
+                pass
+            totalBytes = totalBytes - size
+        return True
@@ -0,0 +1,67 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import time
+import tempfile
+
+import commonDataObjects as cdo
+import stMapCache
+
+
+def main(filePath):
+    if stMapCache.np == None:
+        print('Skipping ST-map cache tests, NumPy is not available.')
+        return True
+    np = stMapCache.np
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+
+    # Test keys only change when the parameters change.
+    params = {'distortion': 0.1, 'focal': 1550.0}
+    key = stMapCache.getCacheKey(cdo.softwareType.mm, 'a', 10, 5, params)
+    assert key == stMapCache.getCacheKey(cdo.softwareType.mm, 'a', 10, 5,
+                                         {'focal': 1550.0, 'distortion': 0.1})
+    assert key != stMapCache.getCacheKey(cdo.softwareType.mm, 'a', 10, 6,
+                                         params)
+    assert key != stMapCache.getCacheKey(cdo.softwareType.mm, 'a', 10, 5,
+                                         {'distortion': 0.1000000001,
+                                          'focal': 1550.0})
+
+    calls = list()
+    def func():
+        calls.append(True)
+        return (np.ones((5, 10)), np.zeros((5, 10)))
+
+    # Test memory only caches.
+    cache = stMapCache.StMapCache()
+    mapX, mapY = cache.getMaps(key, func)
+    mapX, mapY = cache.getMaps(key, func)
+    assert len(calls) == 1
+    assert cache.hits == 1 and cache.misses == 1
+    assert mapX.dtype == np.float32
+    assert (mapX == 1.0).all() and (mapY == 0.0).all()
+
+    # Test maps are reused between caches, through the cache directory.
+    cache = stMapCache.StMapCache(cacheDir=tmpDir)
+    cache.getMaps(key, func)
+    assert len(calls) == 2
+    cache = stMapCache.StMapCache(cacheDir=tmpDir)
+    mapX, mapY = cache.getMaps(key, func)
+    assert len(calls) == 2
+    assert (mapX == 1.0).all() and (mapY == 0.0).all()
+
+    # Test the least recently used maps are removed.
+    fileSize = p.getsize(cache.getFilePath(key))
+    cache = stMapCache.StMapCache(cacheDir=tmpDir, maxBytes=fileSize*2)
+    otherKeys = ['a'*40, 'b'*40]
+    for otherKey in otherKeys:
+        os.utime(cache.getFilePath(key), (0, time.time()-100))
+        cache.put(otherKey, np.ones((5, 10)), np.ones((5, 10)))
+    assert not p.isfile(cache.getFilePath(key))
+    for otherKey in otherKeys:
+        assert p.isfile(cache.getFilePath(otherKey))
+    return True
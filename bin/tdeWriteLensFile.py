@@ -23,32 +23,56 @@ class Options(object):
         self.time = None
         self.outDir = None
 
+        # if not None, drop curve keys that linear interpolation
+        # recreates within this tolerance, see cdo.reduceKeys().
+        self.curveTolerance = None
+        self.curveRdp = False
+
+        # The curve values of the camera, shared with other writers,
+        # if None they are looked up, see cdo.CameraSamples.
+        self.samples = None
+
+
+def writeReducedCurve(f, samples, tolerance, useRdp=False):
+    """Write the keys of an animated curve, dropping the keys that
+    linear interpolation recreates, see cdo.reduceKeys()."""
+    frames, values = cdo.reduceKeys(samples.keyFrames, samples.keyValues,
+                                    tolerance=tolerance, useRdp=useRdp)
+    lines = ["%d\n" % len(frames)]
+    for time, value in zip(frames, values):
+        lines.append("%.15f %.15f 0.0 0.0 0.0 0.0 LINEAR\n" % (time, value))
+    f.write(''.join(lines))
+    return True
 
-def writeCurve(f, keyframes, timeList):
-    if isinstance(keyframes, cdo.KeyframeData):
-        if keyframes.static == False:
-            keysNum = keyframes.length
-            f.write("%d\n"%keysNum)
-            timeValues = keyframes.getTimeValues()
-            for i in range(keysNum):
-                time = timeValues[i]
-                if cdo.isFrameInTimeList(time, timeList):
-                    value = keyframes.getValue(time)
-                    f.write("%.15f %.15f "%(time,value))
-                    f.write("0.0 0.0 0.0 0.0 SMOOTH\n")
-        else:
-            f.write("0\n")
+
+def writeCurve(f, samples, tolerance=None, useRdp=False):
+    """Write the keys of a curve.
+
+    samples - A cdo.CurveSamples object, or None for a curve
+    with no keys."""
+    if samples == None or samples.static == True:
+        f.write("0\n")
+    elif tolerance != None:
+        writeReducedCurve(f, samples, tolerance, useRdp)
     else:
-        if keyframes == None:
-            f.write("0\n")
+        lines = ["%d\n" % samples.length]
+        for time, value in zip(samples.keyFrames, samples.keyValues):
+            lines.append("%.15f %.15f 0.0 0.0 0.0 0.0 SMOOTH\n" %
+                         (time, value))
+        f.write(''.join(lines))
     return True
 
 
 def main(cam, options):
+    """Write the 3DE lens file of a camera.
+
+    Returns a list of the files written."""
     filePath = options.filePath
     assert filePath != None
     outDir = options.outDir
-    timeList = cdo.parseTimeString(options.time)
+    samples = options.samples
+    if samples == None:
+        samples = cdo.CameraSamples(cam, cdo.parseTimeString(options.time))
 
     outFilePath = cdo.createOutFileName(filePath, cam.name, cdo.exportDesc.tdeLens, 'txt', outDir)
     outFileName = p.split(outFilePath)[1]
@@ -59,10 +83,8 @@ def main(cam, options):
         # write lens name
         f.write(cam.name+'_lens\n')
 
-        fl = float(3) # 30mm
-        if isinstance(cam.focalLength, cdo.KeyframeData):
-            fl = cam.focalLength.getValue(0)
-            assert fl != None
+        fl = samples.focalLength.value
+        assert fl != None
 
         # write lens data
         f.write("%.15f "%(cam.filmbackWidth))
@@ -84,13 +106,13 @@ def main(cam, options):
         f.write("%s\n"%lensModelName)
 
         # write the distortion value out
-        distValue = float(0)
-        if isinstance(cam.distortion, cdo.KeyframeData):
-            distValue = cam.distortion.getValue(0)
-            assert distValue != None
+        distValue = samples.distortion.value
+        assert distValue != None
         f.write("%s\n"%(distPara))
         f.write("%.15f\n"%(distValue))
-        writeCurve(f, cam.distortion, timeList)
+        writeCurve(f, samples.distortion,
+                   tolerance=options.curveTolerance,
+                   useRdp=options.curveRdp)
 
         # write out all other distortion default values
         for para in defParas:
@@ -99,9 +121,9 @@ def main(cam, options):
             if para == 'Anamorphic Squeeze':
                 d = 1.0
             f.write("%.15f\n"%(d))
-            writeCurve(f, None, timeList)
+            writeCurve(f, None)
 
         f.write("<end_of_file>\n")
         f.close()
         assert p.isfile(outFilePath) == True
-    return True
+    return [outFilePath]
@@ -33,4 +33,8 @@ def main(filePath):
             lensOptions.time = time
             lensOptions.outDir = outDir
             tdeWriteLensFile.main(tdeCam, lensOptions)
+
+            # Write again, with reduced curves.
+            lensOptions.curveTolerance = 0.0
+            tdeWriteLensFile.main(tdeCam, lensOptions)
     return True
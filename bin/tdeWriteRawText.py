@@ -23,29 +23,57 @@ class Options(object):
         self.time = None
         self.outDir = None
 
+        # if not None, drop curve keys that linear interpolation
+        # recreates within this tolerance, see cdo.reduceKeys().
+        self.curveTolerance = None
+        self.curveRdp = False
+
+        # The curve values of the camera, shared with other writers,
+        # if None they are looked up, see cdo.CameraSamples.
+        self.samples = None
+
+
+def writeReducedCurve(f, samples, tolerance, useRdp=False):
+    """Write the keys of an animated curve, dropping the keys that
+    linear interpolation recreates, see cdo.reduceKeys()."""
+    frames, values = cdo.reduceKeys(samples.keyFrames, samples.keyValues,
+                                    tolerance=tolerance, useRdp=useRdp)
+    lines = ["Number of Keys: %d\n" % len(frames),
+             "Interpolation: Linear\n",
+             "Time/Values:\n"]
+    for time, value in zip(frames, values):
+        lines.append("%.15f %.15f\n" % (time, value))
+    f.write(''.join(lines))
+    return True
+
 
-def writeCurve(f, keyframes, timeList):
-    assert keyframes != None
-    if isinstance(keyframes, cdo.KeyframeData):
-        if not keyframes.static:
-            keysNum = keyframes.length
-            assert keyframes.length >= 0
-            f.write("Number of Keys: %d\n"%keysNum)
-            f.write("Time/Values:\n")
-            timeValues = keyframes.getTimeValues()
-            for i in range(keysNum):
-                time = timeValues[i]
-                if cdo.isFrameInTimeList(time, timeList):
-                    value = keyframes.getValue(time)
-                    f.write("%.15f %.15f\n"%(time,value))
+def writeCurve(f, samples, tolerance=None, useRdp=False):
+    """Write the keys of an animated curve.
+
+    samples - A cdo.CurveSamples object."""
+    assert samples != None
+    if not samples.static and tolerance != None:
+        writeReducedCurve(f, samples, tolerance, useRdp)
+    elif not samples.static:
+        assert samples.length >= 0
+        lines = ["Number of Keys: %d\n" % samples.length,
+                 "Time/Values:\n"]
+        for time, value in zip(samples.keyFrames, samples.keyValues):
+            lines.append("%.15f %.15f\n" % (time, value))
+        f.write(''.join(lines))
     return True
 
 
 def main(cam, options):
+    """Write the 3DE raw text file of a camera.
+
+    Returns a list of the files written."""
     filePath = options.filePath
     assert filePath != None
     outDir = options.outDir
-    timeList = cdo.parseTimeString(options.time)
+    samples = options.samples
+    if samples == None:
+        samples = cdo.CameraSamples(cam, cdo.parseTimeString(options.time))
     
     outFilePath = cdo.createOutFileName(filePath, cam.name,
                                         cdo.exportDesc.tdeRawText, 'txt', outDir)
@@ -58,10 +86,8 @@ def main(cam, options):
         # write camera name
         f.write('Camera Name: '+str(cam.name)+"\n")
 
-        fl = 3.0 # 30mm
-        if isinstance(cam.focalLength, cdo.KeyframeData):
-            fl = cam.focalLength.getValue(0)
-            assert fl != None
+        fl = samples.focalLength.value
+        assert fl != None
 
         # write lens data
         f.write("Focal Length (%s): %.4f\n"%(cam._units, fl))
@@ -79,13 +105,13 @@ def main(cam, options):
             f.write("Animated Distortion\n\n")
 
         # write the distortion value out
-        distValue = 0.0
-        if isinstance(cam.distortion, cdo.KeyframeData):
-            distValue = cam.distortion.getValue(0)
-            assert distValue != None
+        distValue = samples.distortion.value
+        assert distValue != None
         f.write("%s\n"%(distPara))        
         f.write("%.15f\n"%(distValue))
-        writeCurve(f, cam.distortion, timeList)
+        writeCurve(f, samples.distortion,
+                   tolerance=options.curveTolerance,
+                   useRdp=options.curveRdp)
         f.write("\n")
 
         # write out all other distortion default values
@@ -95,9 +121,7 @@ def main(cam, options):
             if para == 'Anamorphic Squeeze':
                 d = 1.0
             f.write("%.15f\n"%(d))
-            keys = cdo.KeyframeData(static=True, initialValue=d)
-            writeCurve(f, keys, timeList)
             f.write("\n")
 
         f.close()
-    return True
+    return [outFilePath]
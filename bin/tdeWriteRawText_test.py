@@ -33,4 +33,8 @@ def main(filePath):
             rawOptions.time = time
             rawOptions.outDir = outDir
             tdeWriteRawText.main(tdeCam, rawOptions)
+
+            # Write again, with reduced curves.
+            rawOptions.curveTolerance = 0.0
+            tdeWriteRawText.main(tdeCam, rawOptions)
     return True
@@ -0,0 +1,126 @@
+"""Writes ST-map images from a TDECameraData object.
+
+An ST-map stores, for each pixel, the position (from 0.0 to 1.0) to
+read the input image from, and can be used by the Nuke STMap node to
+distort or undistort images. A map is only calculated once for each
+unique set of lens parameters; when the distortion is static a single
+ST-map is written for the whole shot, otherwise one is written per
+frame.
+"""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License,
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+
+import commonDataObjects as cdo
+import imageDistortion as idi
+import stMapCache
+
+
+class Options(object):
+    """Options that can be passed to the ST-map exporter."""
+    def __init__(self):
+        self.filePath = None
+        self.time = None
+        self.outDir = None
+        self.action = idi.removeDistortionAction
+
+        # ST-map image extension, must have a writer in imageDistortion.
+        self.outImageExt = 'png'
+
+        # directory to keep warp maps in, between runs.
+        # if None, warp maps are only kept in memory.
+        self.cacheDir = None
+
+        # image files of the sequence, if None the sequence path is searched.
+        self.images = None
+
+
+def getStMap(mapX, mapY):
+    """Convert a warp map of pixel positions into an ST-map image.
+
+    The red channel is the horizontal position, the green channel is the
+    vertical position, with 0.0 at the bottom of the image (as in Nuke).
+
+    Returns a (height, width, 3) uint16 array."""
+    np = idi.np
+    height, width = mapX.shape
+    stMap = np.zeros((height, width, 3), dtype=np.float64)
+    stMap[:, :, 0] = (mapX+0.5)/width
+    stMap[:, :, 1] = 1.0-((mapY+0.5)/height)
+    stMap = np.clip(np.round(stMap*65535.0), 0, 65535)
+    return stMap.astype(np.uint16)
+
+
+def main(cam, options):
+    """Write the ST-maps of a camera.
+
+    Returns a list of the files written."""
+    idi.requireNumpy()
+    filePath = options.filePath
+    assert filePath != None
+    outDir = options.outDir
+    timeList = cdo.parseTimeString(options.time)
+    assert isinstance(cam, cdo.TDECameraData)
+
+    # Get Image Sequence variables.
+    seq = cdo.TDESequenceData()
+    if len(cam.sequences) > 0:
+        seq = cam.sequences[0]
+    offset = cdo.getImageSequenceStartFrame(seq.imagePath,
+                                            images=options.images)
+
+    frameRange = (0, 0, 24)
+    if (cam.sequences != None) and (len(cam.sequences) > 0):
+        frameRange = cam.sequences[0].frameRange
+    nfr = int(frameRange[1]-frameRange[0])
+
+    suffix = cdo.exportDesc.tdeStMap+'_undistort'
+    if options.action == idi.applyDistortionAction:
+        suffix = cdo.exportDesc.tdeStMap+'_distort'
+    outFilePath = cdo.createOutFileName(filePath, cam.name, suffix,
+                                        options.outImageExt, outDir)
+
+    # Group the frames by the lens parameters used.
+    frames = list()
+    keys = list()
+    lenses = list()
+    for frame in cdo.getFramesInTimeList(1, nfr, timeList):
+        model, params = idi.getLensParameters(cam, frame)
+        key = stMapCache.getCacheKey(model, options.action,
+                                     cam.width, cam.height, params)
+        frames.append(frame)
+        keys.append(key)
+        lenses.append((model, params))
+    if len(frames) == 0:
+        model, params = idi.getLensParameters(cam, 0)
+        frames.append(0)
+        keys.append(stMapCache.getCacheKey(model, options.action,
+                                           cam.width, cam.height, params))
+        lenses.append((model, params))
+    isStatic = len(set(keys)) == 1
+
+    cache = stMapCache.StMapCache(cacheDir=options.cacheDir)
+    outPaths = list()
+    for frame, key, lens in zip(frames, keys, lenses):
+        path = outFilePath
+        if not isStatic:
+            # Insert the frame number before the file extension.
+            splitPath = p.splitext(outFilePath)
+            path = '%s.%04d%s' % (splitPath[0], offset+frame, splitPath[1])
+        model, params = lens
+        def func():
+            return idi.getWarpMap(model, options.action,
+                                  cam.width, cam.height, params)
+        mapX, mapY = cache.getMaps(key, func)
+
+        msg = "Writing ST-Map file to '%s'."
+        print(msg % p.split(path)[1])
+        idi.writeImage(path, getStMap(mapX, mapY))
+        outPaths.append(path)
+        if isStatic:
+            break
+    return outPaths
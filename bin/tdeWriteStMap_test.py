@@ -0,0 +1,56 @@
+"""Test the package, run unit tests."""
+
+# Copyright David Cattermole, 2013
+# Licensed under the GNU General Public License, 
+# see "COPYING.txt" for more details.
+
+import os
+import os.path as p
+import tempfile
+
+import commonDataObjects as cdo
+import mmFileReader as mfr
+import converter
+import imageDistortion as idi
+import tdeWriteStMap
+
+
+def main(filePath):
+    if idi.np == None:
+        print('Skipping ST-map tests, NumPy is not available.')
+        return True
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    projData = mfr.readRZML(readOptions)
+    for cam in projData.cameras:
+        tdeCam = converter.convertCamera(cam, cdo.softwareType.tde)
+
+        # Keep the maps small, so the test is fast.
+        tdeCam.width = 48
+        tdeCam.height = 27
+        for action in [idi.removeDistortionAction,
+                       idi.applyDistortionAction]:
+            options = tdeWriteStMap.Options()
+            options.filePath = filePath
+            options.time = '1-3'
+            options.outDir = tmpDir
+            options.action = action
+            outPaths = tdeWriteStMap.main(tdeCam, options)
+            # Frames that share lens parameters share a single ST-map.
+            assert 1 <= len(outPaths) <= 3
+            if tdeCam.distortion.static:
+                assert len(outPaths) == 1
+            for outPath in outPaths:
+                assert p.isfile(outPath)
+                stMap = idi.readImage(outPath)
+                assert stMap.shape == (27, 48, 3)
+                assert stMap.dtype == idi.np.uint16
+
+    # An undistorted ST-map with no distortion reads each pixel
+    # from the same position.
+    y, x = idi.np.mgrid[0:27, 0:48].astype(idi.np.float64)
+    stMap = tdeWriteStMap.getStMap(x, y)
+    assert abs(stMap[0, 0, 0]/65535.0-(0.5/48)) < 1e-4
+    assert abs(stMap[0, 0, 1]/65535.0-(1.0-0.5/27)) < 1e-4
+    return True
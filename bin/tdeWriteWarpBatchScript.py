@@ -110,9 +110,137 @@ class Options(object):
 
         # appended to the file path output, before '(un)distort'.
         self.fileSuffix = '_warp4'
+
+        # image files of the sequence, if None the sequence path is searched.
+        self.images = None
         
 
+def getCommandTemplate(cam):
+    """Get the Warp4 command, with '!NAME!' place holders for
+    the values that change per frame."""
+    binPath = getWarpExec()
+    args = list()
+    args.append(binPath)
+    args.append('-in')
+    args.append('"!IN!"')
+    args.append('-out')
+    args.append('"!OUT!"')
+    args.append('-action')
+    args.append('!ACTION!')
+    args.append('-model')
+    args.append('"%s"' % lensModelName)
+    args.append('-parameters')
+    args.append('!%s!' % distPara.upper())
+    for para in defParas:
+        args.append('!%s!' % para.upper())
+    args.append('-pixel_aspect')
+    args.append('%.15f' % cam.pixelAspectRatio)
+    args.append('-lco')
+    args.append('%.15f' % cam.lensCentreX)
+    args.append('%.15f' % cam.lensCentreY)
+    args.append('-filmback')
+    args.append('%.15f' % cam.filmbackWidth)
+    args.append('%.15f' % cam.filmbackHeight)
+    args.append('-overscan')
+    args.append('!OVERSCAN!')
+    args.append('-verbose')
+
+    # create command string
+    cmdTemplate = str()
+    for arg in args:
+        cmdTemplate += '%s ' % arg
+    return cmdTemplate
+
+
+def getFrameCommand(cam, options, cmdTemplate, action, suffix,
+                    imgPath, timeList):
+    """Get the Warp4 command for a single image of the sequence.
+
+    Returns a tuple of (frame number, command, input image path,
+    output image path, lens parameters), or None if the frame is not
+    inside the time list. The lens parameters are a dict of every
+    value given to Warp4, other than the image paths."""
+    seq = cam.sequences[0]
+    seqPad = cdo.getImageSequencePadding(seq.imagePath)
+    seqStart, seqEnd = cdo.splitImageSequencePath(seq.imagePath)
+
+    cmd = str(cmdTemplate)
+    cmd = cmd.replace('!ACTION!', action)
+    cmd = cmd.replace('!OVERSCAN!', options.useOverscan)
+
+    # Get the frame number from image path.
+    frameNum = cdo.getImagePathFrameNumber(seq.imagePath, imgPath)
+
+    # only output frames that are valid.
+    if not cdo.isFrameInTimeList(frameNum, timeList):
+        return None
+
+    params = {'action': action,
+              'overscan': options.useOverscan,
+              'pixelAspect': cam.pixelAspectRatio,
+              'lensCentre': (cam.lensCentreX, cam.lensCentreY),
+              'filmback': (cam.filmbackWidth, cam.filmbackHeight)}
+
+    # Set Distortion Parameter.
+    d = 0.0
+    if isinstance(cam.distortion, cdo.KeyframeData):
+        d = cam.distortion.getValue(frameNum)
+        assert d != None
+    paraStr = '!%s!' % distPara.upper()
+    cmd = cmd.replace(paraStr, str(d))
+    params[distPara] = d
+
+    # Set Default Parameters.
+    for para in defParas:
+        d = 0.0
+        if para == 'Anamorphic Squeeze':
+            d = 1.0
+        paraStr = '!%s!' % para.upper()
+        cmd = cmd.replace(paraStr, str(d))
+        params[para] = d
+
+    # Get image path
+    outImgPath = cdo.getOutputImagePath(seqStart, seqEnd,
+                                        suffix, frameNum,
+                                        seqPad)
+
+    # Replace in/out paths.
+    cmd = cmd.replace('!IN!', imgPath)
+    cmd = cmd.replace('!OUT!', outImgPath)
+    return (frameNum, cmd, imgPath, outImgPath, params)
+
+
+def getFrameCommands(cam, options, action):
+    """Get the Warp4 commands for every image of the sequence,
+    to be run one at a time rather than written to scripts.
+
+    action - 'remove_distortion' or 'apply_distortion'.
+
+    Returns a list of tuples, as given by getFrameCommand()."""
+    timeList = cdo.parseTimeString(options.time)
+    assert isinstance(cam, cdo.TDECameraData)
+    commands = list()
+    if len(cam.sequences) == 0 or cam.sequences[0].imagePath == None:
+        return commands
+    images = options.images
+    if images == None:
+        images = cdo.getAllImageSequence(cam.sequences[0].imagePath)
+    suffix = options.fileSuffix+'_undistort'
+    if action == 'apply_distortion':
+        suffix = options.fileSuffix+'_distort'
+    cmdTemplate = getCommandTemplate(cam)
+    for imgPath in images:
+        command = getFrameCommand(cam, options, cmdTemplate, action,
+                                  suffix, imgPath, timeList)
+        if command != None:
+            commands.append(command)
+    return commands
+
+
 def main(cam, options):
+    """Write the warp4 batch scripts of a camera.
+
+    Returns a list of the files written."""
     filePath = options.filePath
     # offset = options.offset
     outDir = options.outDir
@@ -130,48 +258,22 @@ def main(cam, options):
                        "image path given is invalid, '%s'.")
     if seq.imagePath == None:
         print(invalidImageMsg % seq.imagePath)
-        return True
+        return list()
 
     # Get Image Sequence variables.
-    images = cdo.getAllImageSequence(seq.imagePath)
+    images = options.images
+    if images == None:
+        images = cdo.getAllImageSequence(seq.imagePath)
     if len(images) <= 0:
         print(invalidImageMsg % repr(seq.imagePath))
-        return True
-    seqPad = cdo.getImageSequencePadding(seq.imagePath)
-    seqStart, seqEnd = cdo.splitImageSequencePath(seq.imagePath)
+        return list()
 
     # get script file syntax, changes based on Operating System.
-    binPath = getWarpExec()
     scriptExt = getScriptFileExt()
     comChar = getScriptCommentChar()
     scriptHeader = getScriptHeader()
     runScript = getRunCommand()
-
-    args = list()
-    args.append(binPath)
-    args.append('-in')
-    args.append('"!IN!"')
-    args.append('-out')
-    args.append('"!OUT!"')
-    args.append('-action')
-    args.append('!ACTION!')
-    args.append('-model')
-    args.append('"%s"' % lensModelName)
-    args.append('-parameters')
-    args.append('!%s!' % distPara.upper())
-    for para in defParas:
-        args.append('!%s!' % para.upper())
-    args.append('-pixel_aspect')
-    args.append('%.15f' % cam.pixelAspectRatio)
-    args.append('-lco')
-    args.append('%.15f' % cam.lensCentreX)
-    args.append('%.15f' % cam.lensCentreY)
-    args.append('-filmback')
-    args.append('%.15f' % cam.filmbackWidth)
-    args.append('%.15f' % cam.filmbackHeight)
-    args.append('-overscan')
-    args.append('!OVERSCAN!')
-    args.append('-verbose')
+    cmdTemplate = getCommandTemplate(cam)
 
     actions = ['remove_distortion',
                'apply_distortion']
@@ -179,6 +281,7 @@ def main(cam, options):
                     cdo.exportDesc.tdeDistortScript]
     suffixes = ['undistort',
                 'distort']
+    outPaths = list()
     for i in range(len(actions)):
         action = actions[i]
         desc = descriptions[i]
@@ -194,11 +297,6 @@ def main(cam, options):
         msg = "Writing Warp Script file to '%s'."
         print(msg % outFileName)
 
-        # create command string
-        cmdTemplate = str()
-        for arg in args:
-            cmdTemplate += '%s ' % arg
-
         # Write the start-up script.
         cmdStarterFilePath = p.abspath(outFilePath.replace('!CPU!', 'start'))
         f = open(cmdStarterFilePath, "w")
@@ -208,6 +306,7 @@ def main(cam, options):
                 cmdFilePath = p.abspath(outFilePath.replace('!CPU!', str(cpu)))
                 f.write(runScript % cmdFilePath)
             f.close()
+        outPaths.append(cmdStarterFilePath)
 
         # loop over number of cores, to write multiple files out.
         imagePathsCutUp = list()
@@ -225,56 +324,18 @@ def main(cam, options):
                 f.write(comChar+' Camera Name: '+str(cam.name)+os.linesep)
                 f.write(preAction)
 
-                # write distortion parameters
-                focalData = cam.focalLength
-                focalData.simplifyData()
-
                 # write out per-frame commands.
                 for imgPath in imagePathsCutUp:
-                    cmd = str(cmdTemplate)
-                    cmd = cmd.replace('!ACTION!', action)
-                    cmd = cmd.replace('!OVERSCAN!', options.useOverscan)
-
-                    # Get the frame number from image path.
-                    frameNum = cdo.getImagePathFrameNumber(seq.imagePath, imgPath)
-
-                    # only output frames that are valid.
-                    if cdo.isFrameInTimeList(frameNum, timeList):
-
-                        # Set Distortion Parameter.
-                        d = 0.0
-                        if isinstance(cam.distortion, cdo.KeyframeData):
-                            d = cam.distortion.getValue(frameNum)
-                            assert d != None
-                        paraStr = '!%s!' % distPara.upper()
-                        cmd = cmd.replace(paraStr, str(d))
-
-                        # Set Default Parameters.
-                        for para in defParas:
-                            d = 0.0
-                            if para == 'Anamorphic Squeeze':
-                                d = 1.0
-                            paraStr = '!%s!' % para.upper()
-                            cmd = cmd.replace(paraStr, str(d))
-
-                        # Get image path
-                        outImgPath = str()
-                        frameStr = str(frameNum).zfill(seqPad)
-                        if seqStart.endswith('.'):
-                            outImgPath = seqStart[:-1]+suffix+'.'
-                        elif seqStart.endswith('_'):
-                            outImgPath = seqStart[:-1]+suffix+'_'
-                        elif seqStart.endswith('-'):
-                            outImgPath = seqStart[:-1]+suffix+'-'
-                        else:
-                            outImgPath = seqStart+suffix
-                        outImgPath = outImgPath+frameStr+seqEnd
-
-                        # Replace in/out paths.
-                        cmd = cmd.replace('!IN!', imgPath)
-                        cmd = cmd.replace('!OUT!', outImgPath)
-                        f.write(cmd+os.linesep+os.linesep)
+                    command = getFrameCommand(cam, options, cmdTemplate,
+                                              action, suffix, imgPath,
+                                              timeList)
+                    if command != None:
+                        frameNum, cmd, inImgPath, outImgPath, params = command
+                        f.write(cdo.getUpToDateCommand(cmd, inImgPath,
+                                                       outImgPath))
+                        f.write(os.linesep)
 
                 f.write(scriptFooter)
                 f.close()
-    return True
+            outPaths.append(cmdFilePath)
+    return outPaths
@@ -22,6 +22,18 @@ class Options(object):
         self.outDir = None
         self.nodeName = None
 
+        # image files of the sequence, if None the sequence path is searched.
+        self.images = None
+
+        # if not None, drop curve keys that linear interpolation
+        # recreates within this tolerance, see cdo.reduceKeys().
+        self.curveTolerance = None
+        self.curveRdp = False
+
+        # The curve values of the camera, shared with other writers,
+        # if None they are looked up, see cdo.CameraSamples.
+        self.samples = None
+
 
 def getNukeParameterName(para):
     para = para.replace(' ', '_')
@@ -29,12 +41,58 @@ def getNukeParameterName(para):
     return para
 
 
+def getDefaultParameterValue(para):
+    d = 0.0
+    if para == 'Anamorphic Squeeze':
+        d = 1.0
+    return d
+
+
+def formatStaticKnob(name, value):
+    """Format a Nuke knob with a single value."""
+    return ' %s %.7f \n' % (name, value)
+
+
+def formatCurveKnob(name, frames, values, interpolation=None):
+    """Format a Nuke knob animated with a curve, in a single pass.
+
+    frames - A list of the Nuke frame numbers.
+    values - A list of the values at each frame.
+    interpolation - A Nuke curve interpolation flag for the keys,
+    for example 'L' (linear), if None Nuke's default is used.
+    """
+    keys = ['x %i %.7f ' % (frame, value)
+            for frame, value in zip(frames, values)]
+    if interpolation != None:
+        keys.insert(0, '%s ' % interpolation)
+    return ' %s {{curve %s}}\n' % (name, ''.join(keys))
+
+
+def formatReducedCurveKnob(name, frames, values, offset, options):
+    """Format a Nuke knob animated with a curve, dropping the keys that
+    linear interpolation recreates if options.curveTolerance is set.
+
+    frames - A list of the frame numbers.
+    offset - Added to each frame, to get the Nuke frame number.
+    """
+    interpolation = None
+    if options.curveTolerance != None:
+        frames, values = cdo.reduceKeys(frames, values,
+                                        tolerance=options.curveTolerance,
+                                        useRdp=options.curveRdp)
+        interpolation = 'L'
+    nukeFrames = [offset+frame for frame in frames]
+    return formatCurveKnob(name, nukeFrames, values,
+                           interpolation=interpolation)
+
+
 def main(cam, options):
+    """Write the Weta Nuke distortion node of a camera.
+
+    Returns a list of the files written."""
     filePath = options.filePath
     assert filePath != None
     outDir = options.outDir
-    timeList = cdo.parseTimeString(options.time)
-
     # Get Camera Sequence
     assert isinstance(cam, cdo.TDECameraData)
     seq = cdo.TDESequenceData()
@@ -42,13 +100,14 @@ def main(cam, options):
         seq = cam.sequences[0]
     
     # Get Image Sequence variables.
-    offset = cdo.getImageSequenceStartFrame(seq.imagePath)
+    offset = cdo.getImageSequenceStartFrame(seq.imagePath,
+                                            images=options.images)
     # print 'offset:', repr(offset)
 
-    frameRange = (0, 0, 24)
-    if (cam.sequences != None) and (len(cam.sequences) > 0):
-        frameRange = cam.sequences[0].frameRange
-    nfr = int(frameRange[1]-frameRange[0])
+    samples = options.samples
+    if samples == None:
+        cam.focalLength.simplifyData()
+        samples = cdo.CameraSamples(cam, cdo.parseTimeString(options.time))
     fbw = cam.filmbackWidth
     fbh = cam.filmbackHeight
     lcx = 0.0
@@ -65,64 +124,54 @@ def main(cam, options):
         f.write('%s {\n' % lensModel)
         f.write(' direction undistort\n')
 
+        # frames written for animated knobs.
+        frames = samples.frames
+
         # write Focal length
-        focalData = cam.focalLength
-        focalData.simplifyData()
+        focalData = samples.focalLength
         if focalData.static == False:
-            f.write(' tde4_focal_length_cm {{curve ')	
-            for frame in range(1,nfr+1):
-                if cdo.isFrameInTimeList(frame, timeList):
-                    f.write ('x %i'%(offset+frame))
-                    f.write(' %.7f '%focalData.getValue(frame))
-            f.write('}}\n')
+            f.write(formatReducedCurveKnob('tde4_focal_length_cm', frames,
+                                           focalData.frameValues,
+                                           offset, options))
         elif focalData.static == True:
-            f.write(' tde4_focal_length_cm %.7f \n'%focalData.getValue(0))
+            f.write(formatStaticKnob('tde4_focal_length_cm',
+                                     focalData.value))
 
         # write camera
-        f.write(' tde4_filmback_width_cm %.7f \n'%fbw)
-        f.write(' tde4_filmback_height_cm %.7f \n'%fbh)
-        f.write(' tde4_lens_center_offset_x_cm %.7f \n'%lcx)
-        f.write(' tde4_lens_center_offset_y_cm %.7f \n'%lcy)
-        f.write(' tde4_pixel_aspect %.7f \n'%pxa)
+        f.write(formatStaticKnob('tde4_filmback_width_cm', fbw))
+        f.write(formatStaticKnob('tde4_filmback_height_cm', fbh))
+        f.write(formatStaticKnob('tde4_lens_center_offset_x_cm', lcx))
+        f.write(formatStaticKnob('tde4_lens_center_offset_y_cm', lcy))
+        f.write(formatStaticKnob('tde4_pixel_aspect', pxa))
 
         # write distortion parameters
-        if cam.distortion.static == False:
+        if samples.distortion.static == False:
 
             # write distortion parameter
-            f.write(' Distortion {{curve ')
-            for frame in range(1,nfr+1):
-                if cdo.isFrameInTimeList(frame, timeList):
-                    f.write ('x %i'%(frame+offset))
-                    distValue = cam.distortion.getValue(frame)
-                    assert distValue != None
-                    f.write(' %.7f '% distValue)
-            f.write('}}\n')
-
-            # write default parameters.
+            distValues = samples.distortion.frameValues
+            assert None not in distValues
+            f.write(formatReducedCurveKnob(getNukeParameterName(distPara),
+                                           frames, distValues,
+                                           offset, options))
+
+            # write default parameters, these never change, so are
+            # written as single values.
             for para in defParas:
-                f.write(' '+getNukeParameterName(para)+' {{curve ')
-                for frame in range(1,nfr+1):
-                    if cdo.isFrameInTimeList(frame, timeList):
-                        f.write ('x %i'%(offset+frame))
-                        d = 0.0
-                        if para == 'Anamorphic Squeeze':
-                            d = 1.0
-                        f.write(' %.7f '%d)	
-                f.write('}}\n')
-
-        elif cam.distortion.static == True:
+                d = getDefaultParameterValue(para)
+                f.write(formatStaticKnob(getNukeParameterName(para), d))
+
+        elif samples.distortion.static == True:
 
             # write distortion parameter
-            distValue = cam.distortion.getValue(0)
+            distValue = samples.distortion.value
             assert distValue != None
-            f.write(' %s %.7f \n' % (getNukeParameterName(distPara), distValue))
+            f.write(formatStaticKnob(getNukeParameterName(distPara),
+                                     distValue))
 
             # Write static default parameters
             for para in defParas:
-                d = 0.0
-                if para == 'Anamorphic Squeeze':
-                    d = 1.0
-                f.write(' %s %.7f \n' % (getNukeParameterName(para), d))
+                d = getDefaultParameterValue(para)
+                f.write(formatStaticKnob(getNukeParameterName(para), d))
 
         nodeName = 'tde4_ldp_%s_%s'%(str(cam.name), str(cam.index))
         if options.nodeName != None:
@@ -135,4 +184,4 @@ def main(cam, options):
         f.write('}\n')
 
     f.close()
-    return True
+    return [outFilePath]
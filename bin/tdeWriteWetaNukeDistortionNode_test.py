@@ -7,6 +7,7 @@
 import os
 import os.path as p
 import math
+import tempfile
 
 import commonDataObjects as cdo
 import mmFileReader as mfr
@@ -18,6 +19,11 @@ import mmDistortionConverter as mdc
 import test
 
 def main(filePath):
+    nuke = tdeWriteWetaNukeDistortionNode
+    knob = nuke.formatCurveKnob('Distortion', [1, 2], [0.5, 0.25])
+    assert knob == ' Distortion {{curve x 1 0.5000000 x 2 0.2500000 }}\n'
+    assert nuke.formatStaticKnob('Curvature_X', 0.0) == ' Curvature_X 0.0000000 \n'
+
     outDirs = test.outDirTests()
     times = test.timeStringTests()
     for time, outDir in zip(times, outDirs):
@@ -33,6 +39,33 @@ def main(filePath):
             nukeOptions.time = time
             nukeOptions.outDir = outDir
             tdeWriteWetaNukeDistortionNode.main(tdeCam, nukeOptions)
+
+    # Test reduced curves are written with linear interpolation,
+    # and never have more keys.
+    tmpDir = tempfile.mkdtemp(prefix='mmDistortionTool_', suffix='_tmp')
+    readOptions = mfr.Options()
+    readOptions.filePath = filePath
+    projData = mfr.readRZML(readOptions)
+    for cam in projData.cameras:
+        tdeCam = converter.convertCamera(cam, cdo.softwareType.tde)
+        contents = list()
+        for tolerance in [None, 0.0]:
+            nukeOptions = tdeWriteWetaNukeDistortionNode.Options()
+            nukeOptions.filePath = filePath
+            nukeOptions.outDir = tmpDir
+            nukeOptions.curveTolerance = tolerance
+            tdeWriteWetaNukeDistortionNode.main(tdeCam, nukeOptions)
+            outFilePath = cdo.createOutFileName(filePath, tdeCam.name,
+                                                cdo.exportDesc.nukeWetaNode,
+                                                'nk', tmpDir)
+            f = open(outFilePath, 'r')
+            contents.append(f.read())
+            f.close()
+        assert contents[1].count(' x') <= contents[0].count(' x')
+        if tdeCam.distortion.static and tdeCam.focalLength.static:
+            assert contents[0] == contents[1]
+        elif not tdeCam.distortion.static:
+            assert contents[1].find('Distortion {{curve L x') != -1
     return True
 
 
@@ -28,6 +28,16 @@ import tdeWriteWetaNukeDistortionNode_test
 import tdeWriteWarpBatchScript_test
 import mmWriteDistoImaBatchScript_test
 import mmDistortionConverter_test
+import mmBatchConverter_test
+import frameJobRunner_test
+import benchmark_test
+import instrumentation_test
+import exportManifest_test
+import imageDistortion_test
+import mmUndistortBenchmark_test
+import sceneCache_test
+import stMapCache_test
+import tdeWriteStMap_test
 
 
 def timeStringTests():
@@ -112,6 +122,16 @@ def main():
         tdeWriteWarpBatchScript_test.main(filePath)
         mmWriteDistoImaBatchScript_test.main(filePath)
         mmDistortionConverter_test.main(filePath)
+        mmBatchConverter_test.main(filePath)
+        frameJobRunner_test.main(filePath)
+        benchmark_test.main(filePath)
+        instrumentation_test.main(filePath)
+        exportManifest_test.main(filePath)
+        imageDistortion_test.main(filePath)
+        mmUndistortBenchmark_test.main(filePath)
+        sceneCache_test.main(filePath)
+        stMapCache_test.main(filePath)
+        tdeWriteStMap_test.main(filePath)
 
     # Test Image Sequence Paths
     imgSeqs = getAllTestImageSequences()
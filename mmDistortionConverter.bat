@@ -52,7 +52,7 @@ if %py_exists%==0 (
 
 :: run the program
 if %py_exists%==1 (
-   %PY% ./bin/mmDistortionConverter.py
+   %PY% ./bin/mmDistortionConverter.py %*
 ) else (
    echo Python does not seem to be installed on this computer,
    echo I'm sorry, we can not run the program.
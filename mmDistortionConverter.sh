@@ -4,4 +4,4 @@
 # Licensed under the GNU General Public License, 
 # see "COPYING.txt" for more details.
 
-python2 bin/mmDistortionConverter.py
+python2 bin/mmDistortionConverter.py "$@"